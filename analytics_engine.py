@@ -0,0 +1,175 @@
+"""
+Analytics for the Expense Tracker
+Computes every insight on the analytics page from one ordered pass over the
+user's monthly rollups, looking category names up in Python. Top spending
+days need day resolution, so they come from one grouped query on
+transactions. That is two statements where there used to be six.
+
+The result is an AnalyticsResult, which both the template and
+/api/analytics consume.
+"""
+
+from dataclasses import asdict, dataclass, field, fields
+from datetime import timedelta
+
+from recurring import add_months
+
+# Window lengths, in months (rollup windows start on the 1st of the month)
+CATEGORY_WINDOW_MONTHS = 6
+TREND_WINDOW_MONTHS = 12
+SAVINGS_WINDOW_MONTHS = 6
+TOP_DAYS_WINDOW_MONTHS = 3
+TOP_CATEGORIES = 10
+TOP_DAYS = 10
+MIN_AVERAGE_COUNT = 3       # categories with fewer expenses get no average
+
+ROLLUPS_QUERY = '''
+    SELECT month, type, category_id, total_cents, count, min_amount, max_amount
+    FROM monthly_rollups
+    WHERE user_id = ?
+    ORDER BY month DESC
+'''
+
+TOP_DAYS_QUERY = '''
+    SELECT date, SUM(amount_cents) / 100.0 as daily_expense
+    FROM transactions
+    WHERE type = 'expense' AND user_id = ?
+    AND date >= ?
+    GROUP BY date
+    ORDER BY daily_expense DESC
+    LIMIT ?
+'''
+
+
+@dataclass
+class MonthTotals:
+    month: str
+    income: float
+    expense: float
+
+
+@dataclass
+class CategoryTotal:
+    name: str
+    total: float
+    count: int
+
+
+@dataclass
+class CategoryAverage:
+    name: str
+    avg_amount: float
+    min_amount: float
+    max_amount: float
+
+
+@dataclass
+class DaySpending:
+    date: str
+    daily_expense: float
+
+
+@dataclass
+class AnalyticsResult:
+    category_spending: list = field(default_factory=list)    # CategoryTotal, last 6 months
+    monthly_trends: list = field(default_factory=list)       # MonthTotals, last 12 months
+    top_spending_days: list = field(default_factory=list)    # DaySpending, last 3 months
+    avg_spending: list = field(default_factory=list)         # CategoryAverage, all time
+    savings_data: list = field(default_factory=list)         # MonthTotals, last 6 months
+    avg_savings_rate: float = 0
+    total_transactions: int = 0
+
+    def context(self):
+        """Top-level fields as template variables"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def to_dict(self):
+        """Plain nested dicts and lists, ready for JSON"""
+        return asdict(self)
+
+
+def months_before(today, months):
+    """date(today, '-N months') the way SQLite computes it: an overflowing
+    day rolls into the next month instead of being clamped"""
+    start = add_months(today.replace(day=1), -months)
+    return start + timedelta(days=today.day - 1)
+
+
+def savings_rate(months):
+    """Average savings rate (%) over the months that had income"""
+    rates = [(month.income - month.expense) / month.income * 100
+             for month in months if month.income > 0]
+    return sum(rates) / len(rates) if rates else 0
+
+
+def compute(conn, user_id, today, category_names):
+    """Build the AnalyticsResult for a user as of today.
+
+    category_names maps the user's category ids to names (see
+    category_directory.py); rollups of other ids count as uncategorized.
+    """
+    category_since = add_months(today, -CATEGORY_WINDOW_MONTHS).strftime('%Y-%m')
+    trend_since = add_months(today, -TREND_WINDOW_MONTHS).strftime('%Y-%m')
+    savings_since = add_months(today, -SAVINGS_WINDOW_MONTHS).strftime('%Y-%m')
+    top_days_since = months_before(today, TOP_DAYS_WINDOW_MONTHS).isoformat()
+
+    months = {}             # month -> [income cents, expense cents], newest first
+    recent = {}             # category id -> [name, cents, count] in the category window
+    all_time = {}           # category id -> [name, cents, count, min, max]
+    total_transactions = 0
+
+    for row in conn.execute(ROLLUPS_QUERY, (user_id,)):
+        total_transactions += row['count']
+        totals = months.setdefault(row['month'], [0, 0])
+        if row['type'] == 'income':
+            totals[0] += row['total_cents']
+            continue
+        totals[1] += row['total_cents']
+
+        # Uncategorized expenses count towards months but not categories
+        category_id = row['category_id']
+        name = category_names.get(category_id)
+        if name is None:
+            continue
+        if row['month'] >= category_since:
+            entry = recent.setdefault(category_id, [name, 0, 0])
+            entry[1] += row['total_cents']
+            entry[2] += row['count']
+        entry = all_time.get(category_id)
+        if entry is None:
+            all_time[category_id] = [name, row['total_cents'], row['count'],
+                                     row['min_amount'], row['max_amount']]
+        else:
+            entry[1] += row['total_cents']
+            entry[2] += row['count']
+            entry[3] = min(entry[3], row['min_amount'])
+            entry[4] = max(entry[4], row['max_amount'])
+
+    month_totals = [MonthTotals(month, income / 100, expense / 100)
+                    for month, (income, expense) in months.items()]
+    savings_data = [month for month in month_totals if month.month >= savings_since]
+
+    category_spending = sorted(
+        (CategoryTotal(name, cents / 100, count) for name, cents, count in recent.values()),
+        key=lambda category: category.total, reverse=True
+    )[:TOP_CATEGORIES]
+    avg_spending = sorted(
+        (CategoryAverage(name, cents / 100 / count, low, high)
+         for name, cents, count, low, high in all_time.values() if count >= MIN_AVERAGE_COUNT),
+        key=lambda category: category.avg_amount, reverse=True
+    )
+
+    top_spending_days = [
+        DaySpending(row['date'], row['daily_expense'])
+        for row in conn.execute(TOP_DAYS_QUERY, (user_id, top_days_since, TOP_DAYS))
+    ]
+
+    return AnalyticsResult(
+        category_spending=category_spending,
+        monthly_trends=[month for month in month_totals if month.month >= trend_since][:TREND_WINDOW_MONTHS],
+        top_spending_days=top_spending_days,
+        avg_spending=avg_spending,
+        savings_data=savings_data,
+        avg_savings_rate=savings_rate(savings_data),
+        total_transactions=total_transactions,
+    )
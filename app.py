@@ -1,11 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, make_response, session, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, make_response, session, flash, Response, stream_with_context, send_file
 import sqlite3
 import os
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, MINYEAR, MAXYEAR
 import csv
 from io import StringIO
 import hashlib
+import zlib
 from functools import wraps
+import db
+import rollups
+import budget_engine
+import analytics_engine
+import search_index
+import recurring
+import goals
+import balances
+import timeseries
+import migrate_database
+import importer
+import cache
+import columnar_store
+import category_directory
+import jobs
+import live_updates
+import instrumentation
+import profiling
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in production!
@@ -13,10 +32,61 @@ app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in p
 # Get the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+app.config['DATABASE'] = os.environ.get('EXPENSE_TRACKER_DATABASE', DATABASE_PATH)
+app.config['REPORTS_PAGE_SIZE'] = 50
+app.config['REPORTS_MAX_PAGE_SIZE'] = 500
+app.config['EXPORT_BATCH_SIZE'] = 1000
+app.config['EXPORT_GZIP'] = True
+app.config['SEARCH_PAGE_SIZE'] = 50
+app.config['IMPORT_BATCH_SIZE'] = 5000
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # largest accepted upload
+app.config['CACHE_BACKEND'] = 'memory'  # 'sqlite' to share entries between workers, None to disable
+app.config['CACHE_PATH'] = os.path.join(BASE_DIR, 'database', 'cache.db')
+app.config['CACHE_MAX_ENTRIES'] = 1024
+app.config['CACHE_TTL'] = 300
+app.config['COLUMNAR_STORE'] = False      # NumPy column store for heavy users' analytics
+app.config['COLUMNAR_MIN_ROWS'] = 20000   # users with fewer transactions use the rollups
+app.config['COLUMNAR_MEMORY_MB'] = 256    # per worker, shared by all loaded users
+app.config['CATEGORY_CACHE_MAX_USERS'] = 4096  # users whose categories each worker keeps
+app.config['JOBS_ENABLED'] = False        # queue exports and large imports for jobs.py workers
+app.config['JOBS_DIR'] = os.path.join(BASE_DIR, 'database', 'jobs')
+app.config['JOB_WORKERS'] = 2             # processes started by `python jobs.py`
+app.config['JOB_MAX_PER_USER'] = 1        # jobs of one user running at the same time
+app.config['JOB_MAX_ATTEMPTS'] = 3
+app.config['JOB_RETRY_DELAY'] = 30        # seconds before the first retry; doubles after
+app.config['JOB_RESULT_TTL'] = 24 * 3600  # seconds results are kept for download
+app.config['JOB_IMPORT_MIN_BYTES'] = 5 * 1024 * 1024  # smaller uploads are imported in the request
+app.config['LIVE_UPDATES'] = False        # push dashboard changes over /events (needs threaded workers)
+app.config['LIVE_POLL_INTERVAL'] = 1.0    # seconds between a stream's checks for other workers' events
+app.config['LIVE_STREAM_SECONDS'] = 300   # a stream then ends and the browser reconnects
+app.config['LIVE_EVENT_TTL'] = 3600       # seconds events are kept for reconnecting pages
+app.config['BALANCE_HISTORY_DAYS'] = 90   # default window of /api/balance/history
+app.config['BALANCE_HISTORY_MAX_DAYS'] = 3660
+app.config['SERIES_DEFAULT_BUCKETS'] = 12  # default window of /api/series, in buckets
+app.config['SERIES_MAX_BUCKETS'] = 1000
+app.config['INSTRUMENTATION'] = os.environ.get('EXPENSE_TRACKER_INSTRUMENTATION') == '1'
+app.config['SLOW_QUERY_MS'] = 100
+app.config['SLOW_QUERY_LOG'] = None  # file for the slow query log; None logs to stderr
+app.config['PROFILING'] = os.environ.get('EXPENSE_TRACKER_PROFILING') == '1'
+app.config['PROFILE_SAMPLE_RATE'] = 0.01  # fraction of requests run under cProfile
+app.config['PROFILE_SLOW_MS'] = 500       # stack samples are kept for requests slower than this
+app.config['PROFILE_DIR'] = os.path.join(BASE_DIR, 'profiles')
+db.init_app(app)
+instrumentation.init_app(app)
+profiling.init_app(app)
 
 def init_db():
     """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_db_connection()
+    
+    # A database already at the current schema version needs no DDL at all
+    if migrate_database.schema_version(conn) == migrate_database.SCHEMA_VERSION:
+        conn.close()
+        return
+    
+    # Older databases are migrated first; run migrate_database.py
+    # beforehand for large ones
+    migrate_database.migrate(conn)
     cursor = conn.cursor()
     
     # Create users table
@@ -41,16 +111,21 @@ def init_db():
         )
     ''')
     
-    # Create transactions table (now per user)
+    # Create transactions table (now per user). Amounts are stored as
+    # integer cents so sums are exact; amount, month and year are computed
+    # from the stored columns when read.
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             date TEXT NOT NULL,
-            amount REAL NOT NULL,
+            amount_cents INTEGER NOT NULL,
             type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
             category_id INTEGER,
             description TEXT,
             user_id INTEGER NOT NULL,
+            amount REAL GENERATED ALWAYS AS (amount_cents / 100.0) VIRTUAL,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+            year INTEGER GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER)) VIRTUAL,
             FOREIGN KEY (category_id) REFERENCES categories (id),
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
@@ -62,8 +137,9 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             month TEXT NOT NULL,
             category_id INTEGER,
-            amount_limit REAL NOT NULL,
+            amount_limit_cents INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
+            amount_limit REAL GENERATED ALWAYS AS (amount_limit_cents / 100.0) VIRTUAL,
             FOREIGN KEY (category_id) REFERENCES categories (id),
             FOREIGN KEY (user_id) REFERENCES users (id),
             UNIQUE(month, category_id, user_id)
@@ -76,10 +152,13 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
             description TEXT,
-            target_amount REAL NOT NULL,
+            target_cents INTEGER NOT NULL,
             target_date TEXT NOT NULL,
             user_id INTEGER NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            saved_cents INTEGER NOT NULL DEFAULT 0,
+            contribution_count INTEGER NOT NULL DEFAULT 0,
+            target_amount REAL GENERATED ALWAYS AS (target_cents / 100.0) VIRTUAL,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
@@ -104,13 +183,73 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    conn.commit()
+    
+    # Secondary indexes: every per-user query filters on user_id first, so
+    # these composite keys let date ranges, type and category filters seek
+    # instead of scanning the whole table. IF NOT EXISTS lets existing
+    # databases pick them up the next time init_db() runs.
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+        ON transactions (user_id, date, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_type_date
+        ON transactions (user_id, type, date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date
+        ON transactions (user_id, category_id, date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_categories_user_name
+        ON categories (user_id, name)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_amount
+        ON transactions (user_id, amount_cents)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recurring_user_next
+        ON recurring_transactions (user_id, next_date)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_recurring_active_next
+        ON recurring_transactions (active, next_date)
+    ''')
     
     conn.commit()
+    
+    # Monthly rollups (table, triggers and one-off backfill)
+    rollups.install(conn)
+    
+    # Full-text search index (FTS5 table, sync triggers and backfill)
+    search_index.install(conn)
+    
+    # Goal contributions (link table, goal totals, triggers and backfill)
+    goals.install(conn)
+    
+    # Running balance checkpoints (table, triggers and backfill)
+    balances.install(conn)
+    
+    # Daily and yearly rollups for /api/series (tables, triggers and backfill)
+    timeseries.install(conn)
+    
+    # Background job queue (see jobs.py)
+    jobs.install(conn)
+    
+    # Dashboard state and the live update event log (see live_updates.py)
+    live_updates.install(conn)
+    
+    # Per-user write versions the caches are keyed on (see cache.py)
+    cache.install(conn)
+    
+    migrate_database.set_schema_version(conn, migrate_database.SCHEMA_VERSION)
     conn.close()
 
 def create_default_categories(user_id):
     """Create default categories for a new user"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     default_categories = [
@@ -127,6 +266,7 @@ def create_default_categories(user_id):
         pass  # Categories already exist for this user
     
     conn.close()
+    invalidate_cache(user_id, categories_changed=True)
 
 def hash_password(password):
     """Hash a password using SHA-256"""
@@ -145,11 +285,114 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def invalidate_cache(user_id, new_transactions=None, categories_changed=False):
+    """Bump the user's write version so cached pages are recomputed in every worker.
+    
+    new_transactions, (date, amount_cents, type, category_id) tuples, lets the
+    column store append them instead of reloading the user. Pass
+    categories_changed for writes that add, rename or delete categories.
+    """
+    conn = get_db_connection()
+    version = cache.bump(conn, user_id)
+    store = columnar_store.get_store(app)
+    if store is not None:
+        store.written(user_id, version, new_transactions)
+    category_directory.get_directory(app).written(user_id, version, categories_changed)
+    
+    # With live updates, evaluate the dashboard (budget alerts included) once
+    # for this write and push what changed to the user's open dashboards.
+    # Otherwise the new version marks the stored state stale and the next
+    # dashboard view rebuilds it.
+    if app.config['LIVE_UPDATES']:
+        live_updates.refresh(conn, user_id, user_categories(conn, user_id).names,
+                             event_ttl=app.config['LIVE_EVENT_TTL'])
+
+def user_categories(conn, user_id):
+    """The user's categories (sorted by name) and id -> name map, from the category directory"""
+    return category_directory.get_directory(app).get(conn, user_id, cache.version(conn, user_id))
+
+def month_range(year, month):
+    """Return the half-open ISO date range [start, end) covering a month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+# A month filter without a year becomes one date range per year of data, up to this many years
+MONTH_FILTER_MAX_YEARS = 100
+
+def build_transaction_filters(conn, user_id, filter_type='', filter_category='',
+                              filter_month='', filter_year=''):
+    """Build the WHERE clause shared by reports and export.
+    
+    Month/year filters become half-open ranges on t.date so the
+    (user_id, date) indexes can be used instead of calling strftime()
+    on every row.
+    """
+    where = 't.user_id = ?'
+    params = [user_id]
+    
+    if filter_type:
+        where += ' AND t.type = ?'
+        params.append(filter_type)
+    
+    if filter_category:
+        where += ' AND t.category_id = ?'
+        params.append(filter_category)
+    
+    if not filter_month and not filter_year:
+        return where, params
+    
+    try:
+        month = int(filter_month) if filter_month else None
+        year = int(filter_year) if filter_year else None
+        if month is not None and not 1 <= month <= 12:
+            raise ValueError(filter_month)
+        # A range ends on the first day of the next year, which must be a date
+        if year is not None and not MINYEAR <= year < MAXYEAR:
+            raise ValueError(filter_year)
+        
+        if year is not None and month is not None:
+            ranges = [month_range(year, month)]
+        elif year is not None:
+            ranges = [(date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat())]
+        else:
+            # Same month in every year: one range per year the user has data for
+            bounds = conn.execute(
+                'SELECT MIN(date), MAX(date) FROM transactions WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+            if not bounds[0]:
+                return where + ' AND 0', params
+            first_year, last_year = max(int(bounds[0][:4]), MINYEAR), min(int(bounds[1][:4]), MAXYEAR - 1)
+            if last_year - first_year >= MONTH_FILTER_MAX_YEARS:
+                # Too many ranges for one expression; compare the month of each of the user's rows
+                return where + ' AND substr(t.date, 6, 2) = ?', params + [f'{month:02d}']
+            ranges = [month_range(y, month) for y in range(first_year, last_year + 1)]
+    except ValueError:
+        # An invalid month/year can't match any date
+        return where + ' AND 0', params
+    if not ranges:
+        return where + ' AND 0', params
+    
+    where += ' AND (' + ' OR '.join(['(t.date >= ? AND t.date < ?)'] * len(ranges)) + ')'
+    for start, end in ranges:
+        params.extend([start, end])
+    
+    return where, params
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the pooled database connection for the current request"""
+    return db.get_db()
+
+_schema_ready = False
+
+@app.before_request
+def ensure_schema():
+    """Run init_db() once per worker process so gunicorn workers get the schema too"""
+    global _schema_ready
+    if not _schema_ready:
+        init_db()
+        _schema_ready = True
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -240,106 +483,58 @@ def logout():
     flash('You have been logged out.', 'success')
     return redirect(url_for('login'))
 
+def dashboard_data(user_id):
+    """Everything the dashboard shows, as plain data that can be cached.
+    
+    Read from the user's dashboard state, which is re-evaluated (budget
+    alerts included) once per write; see live_updates.py.
+    """
+    conn = get_db_connection()
+    data = live_updates.current(conn, user_id, user_categories(conn, user_id).names,
+                                max_age=app.config['CACHE_TTL'], publish=app.config['LIVE_UPDATES'])
+    conn.close()
+    return data
+
 @app.route('/')
 @login_required
 def dashboard():
     """Dashboard page showing summary stats and recent transactions"""
     user_id = session['user_id']
-    conn = get_db_connection()
-    
-    # Get total income, expense, and balance for current user
-    income_result = conn.execute(
-        'SELECT SUM(amount) FROM transactions WHERE type = "income" AND user_id = ?', 
-        (user_id,)
-    ).fetchone()
-    expense_result = conn.execute(
-        'SELECT SUM(amount) FROM transactions WHERE type = "expense" AND user_id = ?', 
-        (user_id,)
-    ).fetchone()
-    
-    total_income = income_result[0] if income_result[0] else 0
-    total_expense = expense_result[0] if expense_result[0] else 0
-    balance = total_income - total_expense
-    
-    # Get recent transactions (last 10) for current user
-    recent_transactions = conn.execute('''
-        SELECT t.*, c.name as category_name 
-        FROM transactions t 
-        LEFT JOIN categories c ON t.category_id = c.id 
-        WHERE t.user_id = ?
-        ORDER BY t.date DESC, t.id DESC 
-        LIMIT 10
-    ''', (user_id,)).fetchall()
-    
-    # Get monthly data for chart for current user
-    monthly_data = conn.execute('''
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
-        FROM transactions 
-        WHERE user_id = ?
-        GROUP BY strftime('%Y-%m', date)
-        ORDER BY month DESC
-        LIMIT 6
-    ''', (user_id,)).fetchall()
-    
-    # Check for budget alerts (current month)
-    current_month = datetime.now().strftime('%Y-%m')
-    budget_alerts = []
-    
-    budgets = conn.execute('''
-        SELECT b.*, c.name as category_name
-        FROM budgets b 
-        LEFT JOIN categories c ON b.category_id = c.id 
-        WHERE b.user_id = ? AND b.month = ?
-    ''', (user_id, current_month)).fetchall()
-    
-    for budget in budgets:
-        spent = conn.execute('''
-            SELECT COALESCE(SUM(amount), 0) as total
-            FROM transactions 
-            WHERE user_id = ? AND type = 'expense' 
-            AND category_id = ? 
-            AND strftime('%Y-%m', date) = ?
-        ''', (user_id, budget['category_id'], current_month)).fetchone()['total']
-        
-        percentage = (spent / budget['amount_limit']) * 100 if budget['amount_limit'] > 0 else 0
-        
-        if percentage >= 100:
-            budget_alerts.append({
-                'type': 'danger',
-                'category': budget['category_name'],
-                'message': f'Over budget by €{spent - budget["amount_limit"]:.2f}',
-                'percentage': percentage
-            })
-        elif percentage >= 80:
-            budget_alerts.append({
-                'type': 'warning', 
-                'category': budget['category_name'],
-                'message': f'{percentage:.1f}% of budget used',
-                'percentage': percentage
-            })
-    
-    # Check for pending recurring transactions
-    pending_recurring = conn.execute('''
-        SELECT * FROM recurring_transactions 
-        WHERE user_id = ? AND active = 1 
-        AND next_date <= date('now')
-        ORDER BY next_date ASC
-        LIMIT 5
-    ''', (user_id,)).fetchall()
     
+    # Served from the result cache until the user changes something
+    conn = get_db_connection()
+    version = cache.version(conn, user_id)
     conn.close()
+    data = cache.get_cache(app).fetch('dashboard', user_id, version, date.today().isoformat(),
+                                      lambda: dashboard_data(user_id))
     
-    return render_template('index.html', 
-                         total_income=total_income,
-                         total_expense=total_expense,
-                         balance=balance,
-                         recent_transactions=recent_transactions,
-                         monthly_data=monthly_data,
-                         budget_alerts=budget_alerts,
-                         pending_recurring=pending_recurring)
+    return render_template('index.html', **data)
+
+@app.route('/events')
+@login_required
+def dashboard_events():
+    """Server-Sent Events stream of the user's dashboard changes"""
+    if not app.config['LIVE_UPDATES']:
+        return jsonify({'error': 'Live updates are disabled'}), 404
+    user_id = session['user_id']
+    
+    # A reconnecting EventSource sends the last id it saw; a fresh page
+    # passes the id its data was rendered at
+    since = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        since = int(since)
+    except ValueError:
+        since = 0
+
+    def category_names(conn):
+        return dict(conn.execute('SELECT id, name FROM categories WHERE user_id = ?', (user_id,)).fetchall())
+    
+    events = live_updates.stream(app.config['DATABASE'], user_id, since, category_names,
+                                 poll_interval=app.config['LIVE_POLL_INTERVAL'],
+                                 stream_seconds=app.config['LIVE_STREAM_SECONDS'],
+                                 max_age=app.config['CACHE_TTL'])
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -349,31 +544,33 @@ def add_transaction():
     
     if request.method == 'POST':
         date_str = request.form['date']
-        amount = float(request.form['amount'])
+        amount_cents = db.to_cents(float(request.form['amount']))
         transaction_type = request.form['type']
         category_id = int(request.form['category_id']) if request.form['category_id'] else None
         description = request.form['description']
+        goal_id = int(request.form['goal_id']) if request.form.get('goal_id') else None
         
         conn = get_db_connection()
-        conn.execute('''
-            INSERT INTO transactions (date, amount, type, category_id, description, user_id)
+        cursor = conn.execute('''
+            INSERT INTO transactions (date, amount_cents, type, category_id, description, user_id)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (date_str, amount, transaction_type, category_id, description, user_id))
+        ''', (date_str, amount_cents, transaction_type, category_id, description, user_id))
+        if goal_id is not None:
+            goals.link(conn, user_id, cursor.lastrowid, goal_id)
         conn.commit()
         conn.close()
+        invalidate_cache(user_id, [(date_str, amount_cents, transaction_type, category_id)])
         
         flash('Transaction added successfully!', 'success')
         return redirect(url_for('dashboard'))
     
     # GET request - show form with user's categories
     conn = get_db_connection()
-    categories = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    categories = user_categories(conn, user_id).categories
+    goal_choices = goals.goal_choices(conn, user_id)
     conn.close()
     
-    return render_template('add.html', categories=categories)
+    return render_template('add.html', categories=categories, goals=goal_choices)
 
 @app.route('/edit/<int:transaction_id>', methods=['GET', 'POST'])
 @login_required
@@ -388,34 +585,39 @@ def edit_transaction(transaction_id):
         transaction_type = request.form['type']
         category_id = int(request.form['category_id']) if request.form['category_id'] else None
         description = request.form['description']
+        goal_id = int(request.form['goal_id']) if request.form.get('goal_id') else None
         
         conn.execute('''
             UPDATE transactions 
-            SET date = ?, amount = ?, type = ?, category_id = ?, description = ?
+            SET date = ?, amount_cents = ?, type = ?, category_id = ?, description = ?
             WHERE id = ? AND user_id = ?
-        ''', (date_str, amount, transaction_type, category_id, description, transaction_id, user_id))
+        ''', (date_str, db.to_cents(amount), transaction_type, category_id, description,
+              transaction_id, user_id))
+        goals.link(conn, user_id, transaction_id, goal_id)
         conn.commit()
         conn.close()
+        invalidate_cache(user_id)
         
         flash('Transaction updated successfully!', 'success')
         return redirect(url_for('dashboard'))
     
     # GET request - show form with existing data (only if user owns the transaction)
-    transaction = conn.execute(
-        'SELECT * FROM transactions WHERE id = ? AND user_id = ?', 
-        (transaction_id, user_id)
-    ).fetchone()
-    categories = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    transaction = conn.execute('''
+        SELECT t.*, gc.goal_id
+        FROM transactions t
+        LEFT JOIN goal_contributions gc ON gc.transaction_id = t.id
+        WHERE t.id = ? AND t.user_id = ?
+    ''', (transaction_id, user_id)).fetchone()
+    categories = user_categories(conn, user_id).categories
+    goal_choices = goals.goal_choices(conn, user_id)
     conn.close()
     
     if not transaction:
         flash('Transaction not found.', 'error')
         return redirect(url_for('dashboard'))
     
-    return render_template('add.html', transaction=transaction, categories=categories, edit_mode=True)
+    return render_template('add.html', transaction=transaction, categories=categories,
+                           goals=goal_choices, edit_mode=True)
 
 @app.route('/delete/<int:transaction_id>')
 @login_required
@@ -429,6 +631,7 @@ def delete_transaction(transaction_id):
     )
     conn.commit()
     conn.close()
+    invalidate_cache(user_id)
     
     if result.rowcount > 0:
         flash('Transaction deleted successfully!', 'success')
@@ -443,10 +646,7 @@ def categories():
     """Category management page"""
     user_id = session['user_id']
     conn = get_db_connection()
-    categories_list = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    categories_list = user_categories(conn, user_id).categories
     conn.close()
     
     return render_template('categories.html', categories=categories_list)
@@ -469,6 +669,7 @@ def add_category():
             (name, user_id)
         )
         conn.commit()
+        invalidate_cache(user_id, categories_changed=True)
         flash('Category added successfully!', 'success')
     except sqlite3.IntegrityError:
         flash('Category already exists.', 'error')
@@ -495,6 +696,7 @@ def delete_category(category_id):
     )
     conn.commit()
     conn.close()
+    invalidate_cache(user_id, categories_changed=True)
     
     if result.rowcount > 0:
         flash('Category deleted successfully!', 'success')
@@ -503,6 +705,63 @@ def delete_category(category_id):
     
     return redirect(url_for('categories'))
 
+def get_page_size():
+    """Page size from ?per_page=, bounded by REPORTS_MAX_PAGE_SIZE"""
+    try:
+        per_page = int(request.args.get('per_page', app.config['REPORTS_PAGE_SIZE']))
+    except ValueError:
+        per_page = app.config['REPORTS_PAGE_SIZE']
+    return max(1, min(per_page, app.config['REPORTS_MAX_PAGE_SIZE']))
+
+def fetch_transactions_page(conn, where, params, cursor='', page_size=50):
+    """Fetch one page of filtered transactions, newest first.
+    
+    Pages are keyed on (date, id) rather than OFFSET, so every page is an
+    index seek no matter how deep the user scrolls. The cursor is the
+    "date|id" of the last row of the previous page. Returns the rows and the
+    cursor for the next page (None on the last page).
+    """
+    params = list(params)
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.rsplit('|', 1)
+            cursor_id = int(cursor_id)
+        except ValueError:
+            cursor_date, cursor_id = None, None
+        if cursor_date is not None:
+            where += ' AND (t.date, t.id) < (?, ?)'
+            params.extend([cursor_date, cursor_id])
+    
+    rows = conn.execute(f'''
+        SELECT t.*
+        FROM transactions t
+        WHERE {where}
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT ?
+    ''', params + [page_size + 1]).fetchall()
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = f"{rows[-1]['date']}|{rows[-1]['id']}"
+    return rows, next_cursor
+
+def transactions_summary(conn, where, params):
+    """Income, expense and count over every matching row, without loading them"""
+    return conn.execute(f'''
+        SELECT
+            SUM(CASE WHEN type = 'income' THEN amount_cents ELSE 0 END) / 100.0 as total_income,
+            SUM(CASE WHEN type = 'expense' THEN amount_cents ELSE 0 END) / 100.0 as total_expense,
+            COUNT(*) as total_count
+        FROM transactions t
+        WHERE {where}
+    ''', params).fetchone()
+
+def get_report_filters():
+    """Read the reports/export filter parameters from the query string"""
+    return (request.args.get('type', ''), request.args.get('category', ''),
+            request.args.get('month', ''), request.args.get('year', ''))
+
 @app.route('/reports')
 @login_required
 def reports():
@@ -510,75 +769,31 @@ def reports():
     user_id = session['user_id']
     
     # Get filter parameters
-    filter_type = request.args.get('type', '')
-    filter_category = request.args.get('category', '')
-    filter_month = request.args.get('month', '')
-    filter_year = request.args.get('year', '')
+    filter_type, filter_category, filter_month, filter_year = get_report_filters()
     
     conn = get_db_connection()
     
     # Build query with filters (only for current user)
-    query = '''
-        SELECT t.*, c.name as category_name 
-        FROM transactions t 
-        LEFT JOIN categories c ON t.category_id = c.id 
-        WHERE t.user_id = ?
-    '''
-    params = [user_id]
-    
-    if filter_type:
-        query += ' AND t.type = ?'
-        params.append(filter_type)
-    
-    if filter_category:
-        query += ' AND t.category_id = ?'
-        params.append(filter_category)
-    
-    if filter_month:
-        query += ' AND strftime("%m", t.date) = ?'
-        params.append(filter_month.zfill(2))
-    
-    if filter_year:
-        query += ' AND strftime("%Y", t.date) = ?'
-        params.append(filter_year)
-    
-    query += ' ORDER BY t.date DESC, t.id DESC'
+    where, params = build_transaction_filters(
+        conn, user_id, filter_type, filter_category, filter_month, filter_year
+    )
     
-    transactions = conn.execute(query, params).fetchall()
-    categories_list = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    # Only the first page is rendered; the rest is loaded from /api/reports/transactions
+    transactions, next_cursor = fetch_transactions_page(
+        conn, where, params, request.args.get('cursor', ''), get_page_size()
+    )
+    categories = user_categories(conn, user_id)
+    transactions = categories.attach(transactions)
     
     # Get summary for filtered data (only for current user)
-    summary_query = '''
-        SELECT 
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as total_income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as total_expense
-        FROM transactions t 
-        WHERE t.user_id = ?
-    '''
-    summary_params = [user_id]
-    
-    if filter_type:
-        summary_query += ' AND t.type = ?'
-        summary_params.append(filter_type)
-    if filter_category:
-        summary_query += ' AND t.category_id = ?'
-        summary_params.append(filter_category)
-    if filter_month:
-        summary_query += ' AND strftime("%m", t.date) = ?'
-        summary_params.append(filter_month.zfill(2))
-    if filter_year:
-        summary_query += ' AND strftime("%Y", t.date) = ?'
-        summary_params.append(filter_year)
-    
-    summary = conn.execute(summary_query, summary_params).fetchone()
+    summary = transactions_summary(conn, where, params)
     conn.close()
     
     return render_template('reports.html', 
                          transactions=transactions,
-                         categories=categories_list,
+                         next_cursor=next_cursor,
+                         total_count=summary['total_count'],
+                         categories=categories.categories,
                          filter_type=filter_type,
                          filter_category=filter_category,
                          filter_month=filter_month,
@@ -586,6 +801,40 @@ def reports():
                          total_income=summary['total_income'] or 0,
                          total_expense=summary['total_expense'] or 0)
 
+@app.route('/api/reports/transactions')
+@login_required
+def reports_transactions_api():
+    """JSON page of filtered transactions for infinite scrolling on /reports"""
+    user_id = session['user_id']
+    filter_type, filter_category, filter_month, filter_year = get_report_filters()
+    
+    conn = get_db_connection()
+    where, params = build_transaction_filters(
+        conn, user_id, filter_type, filter_category, filter_month, filter_year
+    )
+    transactions, next_cursor = fetch_transactions_page(
+        conn, where, params, request.args.get('cursor', ''), get_page_size()
+    )
+    transactions = user_categories(conn, user_id).attach(transactions)
+    conn.close()
+    
+    return jsonify({
+        'transactions': [
+            {
+                'id': t['id'],
+                'date': t['date'],
+                'amount': t['amount'],
+                'type': t['type'],
+                'category_name': t['category_name'],
+                'description': t['description'],
+                'edit_url': url_for('edit_transaction', transaction_id=t['id']),
+                'delete_url': url_for('delete_transaction', transaction_id=t['id'])
+            }
+            for t in transactions
+        ],
+        'next_cursor': next_cursor
+    })
+
 @app.route('/budgets')
 @login_required
 def budgets():
@@ -593,8 +842,12 @@ def budgets():
     user_id = session['user_id']
     conn = get_db_connection()
     
-    # Get current month
+    # Get current month, and the month whose status is shown (defaults to current)
     current_month = datetime.now().strftime('%Y-%m')
+    status_month = request.args.get('month', current_month)
+    
+    # Evaluate the shown month's budgets in one query
+    budget_status = budget_engine.budget_status(conn, user_id, status_month, status_month)
     
     # Get all budgets for current user
     budgets = conn.execute('''
@@ -605,40 +858,15 @@ def budgets():
         ORDER BY b.month DESC, c.name
     ''', (user_id,)).fetchall()
     
-    # Get spending data for current month
-    budget_status = []
-    for budget in budgets:
-        if budget['month'] == current_month:
-            spent = conn.execute('''
-                SELECT COALESCE(SUM(amount), 0) as total
-                FROM transactions 
-                WHERE user_id = ? AND type = 'expense' 
-                AND category_id = ? 
-                AND strftime('%Y-%m', date) = ?
-            ''', (user_id, budget['category_id'], current_month)).fetchone()
-            
-            remaining = budget['amount_limit'] - spent['total']
-            percentage = (spent['total'] / budget['amount_limit']) * 100 if budget['amount_limit'] > 0 else 0
-            
-            budget_status.append({
-                'budget': budget,
-                'spent': spent['total'],
-                'remaining': remaining,
-                'percentage': percentage,
-                'over_budget': remaining < 0
-            })
-    
     # Get categories for dropdown
-    categories = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    categories = user_categories(conn, user_id).categories
     
     conn.close()
     
     return render_template('budgets.html', 
                          budgets=budgets,
                          budget_status=budget_status,
+                         status_month=status_month,
                          categories=categories,
                          current_month=current_month)
 
@@ -654,22 +882,23 @@ def add_budget():
     conn = get_db_connection()
     try:
         conn.execute('''
-            INSERT INTO budgets (month, category_id, amount_limit, user_id)
+            INSERT INTO budgets (month, category_id, amount_limit_cents, user_id)
             VALUES (?, ?, ?, ?)
-        ''', (month, category_id, amount_limit, user_id))
+        ''', (month, category_id, db.to_cents(amount_limit), user_id))
         conn.commit()
         flash('Budget added successfully!', 'success')
     except sqlite3.IntegrityError:
         # Update existing budget
         conn.execute('''
             UPDATE budgets 
-            SET amount_limit = ? 
+            SET amount_limit_cents = ? 
             WHERE month = ? AND category_id = ? AND user_id = ?
-        ''', (amount_limit, month, category_id, user_id))
+        ''', (db.to_cents(amount_limit), month, category_id, user_id))
         conn.commit()
         flash('Budget updated successfully!', 'success')
     
     conn.close()
+    invalidate_cache(user_id)
     return redirect(url_for('budgets'))
 
 @app.route('/budgets/delete/<int:budget_id>')
@@ -684,6 +913,7 @@ def delete_budget(budget_id):
     )
     conn.commit()
     conn.close()
+    invalidate_cache(user_id)
     
     if result.rowcount > 0:
         flash('Budget deleted successfully!', 'success')
@@ -692,107 +922,122 @@ def delete_budget(budget_id):
     
     return redirect(url_for('budgets'))
 
+def analytics_data(user_id):
+    """Every insight on the analytics page, computed in one pass"""
+    conn = get_db_connection()
+    result = None
+    store = columnar_store.get_store(app)
+    if store is not None:
+        # None when the user is too light to be worth loading into columns
+        result = store.analytics(conn, user_id, cache.version(conn, user_id), date.today())
+    if result is None:
+        result = analytics_engine.compute(conn, user_id, date.today(),
+                                          user_categories(conn, user_id).names)
+    conn.close()
+    return result
+
+def cached_analytics(user_id):
+    """The user's AnalyticsResult, from the result cache when possible"""
+    # Windows are relative to today, so today's date is part of the cache key
+    conn = get_db_connection()
+    version = cache.version(conn, user_id)
+    conn.close()
+    return cache.get_cache(app).fetch('analytics', user_id, version, date.today().isoformat(),
+                                      lambda: analytics_data(user_id))
+
 @app.route('/analytics')
 @login_required
 def analytics():
     """Advanced analytics page"""
-    user_id = session['user_id']
-    conn = get_db_connection()
-    
-    # Get spending by category (last 6 months)
-    category_spending = conn.execute('''
-        SELECT c.name, SUM(t.amount) as total, COUNT(t.id) as count
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.type = 'expense' AND t.user_id = ?
-        AND date >= date('now', '-6 months')
-        GROUP BY c.id, c.name
-        ORDER BY total DESC
-        LIMIT 10
-    ''', (user_id,)).fetchall()
-    
-    # Get monthly trends (last 12 months)
-    monthly_trends = conn.execute('''
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
-        FROM transactions 
-        WHERE user_id = ?
-        AND date >= date('now', '-12 months')
-        GROUP BY strftime('%Y-%m', date)
-        ORDER BY month DESC
-        LIMIT 12
-    ''', (user_id,)).fetchall()
-    
-    # Get top spending days
-    top_spending_days = conn.execute('''
-        SELECT date, SUM(amount) as daily_expense
-        FROM transactions 
-        WHERE type = 'expense' AND user_id = ?
-        AND date >= date('now', '-3 months')
-        GROUP BY date
-        ORDER BY daily_expense DESC
-        LIMIT 10
-    ''', (user_id,)).fetchall()
+    result = cached_analytics(session['user_id'])
+    return render_template('analytics.html', **result.context())
+
+@app.route('/api/analytics')
+@login_required
+def analytics_api():
+    """The analytics page's data as JSON"""
+    return jsonify(cached_analytics(session['user_id']).to_dict())
+
+def parse_day(value, default):
+    """A 'YYYY-MM-DD' query argument as a date; raises ValueError when malformed"""
+    return date.fromisoformat(value) if value else default
+
+@app.route('/api/balance')
+@login_required
+def balance_api():
+    """Balance at the end of a day (default today)"""
+    try:
+        day = parse_day(request.args.get('date'), date.today())
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
     
-    # Get average spending per category
-    avg_spending = conn.execute('''
-        SELECT 
-            c.name,
-            AVG(t.amount) as avg_amount,
-            MIN(t.amount) as min_amount,
-            MAX(t.amount) as max_amount
-        FROM transactions t
-        JOIN categories c ON t.category_id = c.id
-        WHERE t.type = 'expense' AND t.user_id = ?
-        GROUP BY c.id, c.name
-        HAVING COUNT(t.id) >= 3
-        ORDER BY avg_amount DESC
-    ''', (user_id,)).fetchall()
+    conn = get_db_connection()
+    balance = balances.balance_at(conn, session['user_id'], day.isoformat())
+    conn.close()
+    return jsonify({'date': day.isoformat(), 'balance': balance})
+
+@app.route('/api/balance/history')
+@login_required
+def balance_history_api():
+    """Daily balance series between start and end, with its lowest and highest point"""
+    try:
+        end = parse_day(request.args.get('end'), date.today())
+        start = parse_day(request.args.get('start'),
+                          end - timedelta(days=app.config['BALANCE_HISTORY_DAYS'] - 1))
+    except (ValueError, OverflowError):
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    if (end - start).days >= app.config['BALANCE_HISTORY_MAX_DAYS']:
+        return jsonify({'error': f"at most {app.config['BALANCE_HISTORY_MAX_DAYS']} days per request"}), 400
     
-    # Get savings rate (last 6 months)
-    savings_data = conn.execute('''
-        SELECT 
-            strftime('%Y-%m', date) as month,
-            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
-        FROM transactions 
-        WHERE user_id = ?
-        AND date >= date('now', '-6 months')
-        GROUP BY strftime('%Y-%m', date)
-        ORDER BY month DESC
-    ''', (user_id,)).fetchall()
+    user_id = session['user_id']
+    conn = get_db_connection()
+    series = balances.daily_balances(conn, user_id, start.isoformat(), end.isoformat())
+    extremes = balances.balance_range(conn, user_id, start.isoformat(), end.isoformat())
+    conn.close()
     
-    # Calculate insights
-    total_transactions = conn.execute(
-        'SELECT COUNT(*) as count FROM transactions WHERE user_id = ?', 
-        (user_id,)
-    ).fetchone()['count']
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'balances': [{'date': day, 'balance': balance} for day, balance in series],
+        **extremes,
+    })
+
+@app.route('/api/series')
+@login_required
+def series_api():
+    """Income, expense and net per category and bucket of a granularity between start and end"""
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in timeseries.GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of {', '.join(timeseries.GRANULARITIES)}"}), 400
+    try:
+        end = parse_day(request.args.get('end'), date.today())
+        start = parse_day(request.args.get('start'), None) or timeseries.next_bucket(
+            timeseries.bucket_start(end, granularity), granularity, 1 - app.config['SERIES_DEFAULT_BUCKETS'])
+    except (ValueError, OverflowError):
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'start must not be after end'}), 400
+    if timeseries.count_buckets(start, end, granularity) > app.config['SERIES_MAX_BUCKETS']:
+        return jsonify({'error': f"at most {app.config['SERIES_MAX_BUCKETS']} buckets per request"}), 400
+    try:
+        category_id = int(request.args['category']) if request.args.get('category') else None
+    except ValueError:
+        return jsonify({'error': 'category must be a category id (0 for uncategorized)'}), 400
     
+    user_id = session['user_id']
+    conn = get_db_connection()
+    buckets = timeseries.series(conn, user_id, granularity, start, end,
+                                user_categories(conn, user_id).names, category_id)
     conn.close()
     
-    # Calculate average savings rate
-    avg_savings_rate = 0
-    if savings_data:
-        savings_rates = []
-        for month_data in savings_data:
-            if month_data['income'] > 0:
-                savings = month_data['income'] - month_data['expense']
-                rate = (savings / month_data['income']) * 100
-                savings_rates.append(rate)
-        
-        if savings_rates:
-            avg_savings_rate = sum(savings_rates) / len(savings_rates)
-    
-    return render_template('analytics.html',
-                         category_spending=category_spending,
-                         monthly_trends=monthly_trends,
-                         top_spending_days=top_spending_days,
-                         avg_spending=avg_spending,
-                         savings_data=savings_data,
-                         avg_savings_rate=avg_savings_rate,
-                         total_transactions=total_transactions)
+    return jsonify({
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'buckets': buckets,
+    })
 
 @app.route('/search')
 @login_required
@@ -802,28 +1047,26 @@ def search():
     query = request.args.get('q', '').strip()
     
     if not query:
-        return render_template('search.html', transactions=[], query='')
+        return render_template('search.html', transactions=[], query='', total=0, page=1, has_next=False)
+    
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    per_page = app.config['SEARCH_PAGE_SIZE']
     
     conn = get_db_connection()
     
-    # Search in description and category names
-    transactions = conn.execute('''
-        SELECT t.*, c.name as category_name 
-        FROM transactions t 
-        LEFT JOIN categories c ON t.category_id = c.id 
-        WHERE t.user_id = ? AND (
-            t.description LIKE ? OR 
-            c.name LIKE ? OR
-            t.amount LIKE ? OR
-            t.date LIKE ?
-        )
-        ORDER BY t.date DESC, t.id DESC
-        LIMIT 100
-    ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%')).fetchall()
+    # Ranked full-text search on description and category names; amounts and
+    # dates are matched through their indexes
+    transactions, total = search_index.search(conn, user_id, query, page, per_page)
+    transactions = user_categories(conn, user_id).attach(transactions)
     
     conn.close()
     
-    return render_template('search.html', transactions=transactions, query=query)
+    return render_template('search.html', transactions=transactions, query=query,
+                           total=total, page=page,
+                           has_next=page * per_page < total)
 
 @app.route('/recurring')
 @login_required  
@@ -833,23 +1076,17 @@ def recurring_transactions():
     conn = get_db_connection()
     
     # Get all recurring transactions for current user
-    recurring = conn.execute('''
-        SELECT r.*, c.name as category_name
+    categories = user_categories(conn, user_id)
+    recurring = categories.attach(conn.execute('''
+        SELECT r.*
         FROM recurring_transactions r
-        LEFT JOIN categories c ON r.category_id = c.id
         WHERE r.user_id = ?
         ORDER BY r.next_date ASC
-    ''', (user_id,)).fetchall()
-    
-    # Get categories for form
-    categories = conn.execute(
-        'SELECT * FROM categories WHERE user_id = ? ORDER BY name', 
-        (user_id,)
-    ).fetchall()
+    ''', (user_id,)))
     
     conn.close()
     
-    return render_template('recurring.html', recurring=recurring, categories=categories)
+    return render_template('recurring.html', recurring=recurring, categories=categories.categories)
 
 @app.route('/recurring/add', methods=['POST'])
 @login_required
@@ -873,6 +1110,7 @@ def add_recurring_transaction():
     ''', (title, amount, transaction_type, category_id, frequency, start_date, start_date, description, user_id))
     conn.commit()
     conn.close()
+    invalidate_cache(user_id)
     
     flash('Recurring transaction added successfully!', 'success')
     return redirect(url_for('recurring_transactions'))
@@ -885,90 +1123,160 @@ def execute_recurring_transaction(recurring_id):
     conn = get_db_connection()
     
     # Get the recurring transaction
-    recurring = conn.execute('''
+    recurring_rule = conn.execute('''
         SELECT * FROM recurring_transactions 
         WHERE id = ? AND user_id = ?
     ''', (recurring_id, user_id)).fetchone()
     
-    if not recurring:
+    if not recurring_rule:
         flash('Recurring transaction not found.', 'error')
         return redirect(url_for('recurring_transactions'))
     
-    # Create the actual transaction
-    conn.execute('''
-        INSERT INTO transactions (date, amount, type, category_id, description, user_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (recurring['next_date'], recurring['amount'], recurring['type'], 
-          recurring['category_id'], f"{recurring['title']} (Auto)", user_id))
-    
-    # Calculate next date based on frequency
-    from datetime import datetime, timedelta
-    next_date = datetime.strptime(recurring['next_date'], '%Y-%m-%d')
-    
-    if recurring['frequency'] == 'daily':
-        next_date += timedelta(days=1)
-    elif recurring['frequency'] == 'weekly':
-        next_date += timedelta(weeks=1)
-    elif recurring['frequency'] == 'monthly':
-        if next_date.month == 12:
-            next_date = next_date.replace(year=next_date.year + 1, month=1)
-        else:
-            next_date = next_date.replace(month=next_date.month + 1)
-    elif recurring['frequency'] == 'yearly':
-        next_date = next_date.replace(year=next_date.year + 1)
-    
-    # Update next date
-    conn.execute('''
-        UPDATE recurring_transactions 
-        SET next_date = ?, last_executed = ?
-        WHERE id = ? AND user_id = ?
-    ''', (next_date.strftime('%Y-%m-%d'), recurring['next_date'], recurring_id, user_id))
-    
-    conn.commit()
+    # Create the next occurrence (even if it isn't due yet) and advance the rule
+    result = recurring.catch_up(conn, user_id=user_id, recurring_id=recurring_id, limit=1)
     conn.close()
+    if not result['transactions']:
+        flash(f'Recurring transaction "{recurring_rule["title"]}" could not be executed.', 'error')
+        return redirect(url_for('recurring_transactions'))
+    invalidate_cache(user_id)
     
-    flash(f'Recurring transaction "{recurring["title"]}" executed successfully!', 'success')
+    flash(f'Recurring transaction "{recurring_rule["title"]}" executed successfully!', 'success')
     return redirect(url_for('recurring_transactions'))
 
+@app.route('/recurring/catch-up')
+@login_required
+def catch_up_recurring_transactions():
+    """Create every missed occurrence of the user's due recurring transactions"""
+    user_id = session['user_id']
+    conn = get_db_connection()
+    result = recurring.catch_up(conn, user_id=user_id)
+    conn.close()
+    invalidate_cache(user_id)
+    
+    if result['transactions']:
+        flash(f"Created {result['transactions']} transaction(s) from "
+              f"{result['rules']} recurring transaction(s).", 'success')
+    else:
+        flash('No recurring transactions are due.', 'success')
+    return redirect(request.referrer or url_for('recurring_transactions'))
+
 @app.route('/goals')
 @login_required
-def goals():
+def financial_goals():
     """Financial goals tracking"""
     user_id = session['user_id']
     conn = get_db_connection()
     
-    # Get all goals for current user
-    goals = conn.execute('''
-        SELECT * FROM financial_goals 
-        WHERE user_id = ? 
-        ORDER BY target_date ASC
-    ''', (user_id,)).fetchall()
+    # Progress is kept on each goal row by the goal_contributions triggers
+    user_goals = goals.user_goals(conn, user_id)
+    conn.close()
     
-    # Calculate progress for each goal
+    today = date.today()
     goals_with_progress = []
-    for goal in goals:
-        current_amount = conn.execute('''
-            SELECT COALESCE(SUM(amount), 0) as total
-            FROM transactions 
-            WHERE user_id = ? AND type = 'income' 
-            AND description LIKE ? 
-            AND date >= ?
-        ''', (user_id, f'%{goal["title"]}%', goal['created_at'])).fetchone()['total']
-        
+    for goal in user_goals:
+        current_amount = goal['current_amount']
         progress_percentage = (current_amount / goal['target_amount']) * 100 if goal['target_amount'] > 0 else 0
-        days_left = (datetime.strptime(goal['target_date'], '%Y-%m-%d') - datetime.now()).days
+        days_left = (date.fromisoformat(goal['target_date']) - today).days
         
         goals_with_progress.append({
             'goal': goal,
             'current_amount': current_amount,
-            'progress_percentage': min(progress_percentage, 100),
+            'progress_percentage': max(min(progress_percentage, 100), 0),
             'days_left': max(days_left, 0),
             'completed': current_amount >= goal['target_amount']
         })
     
+    return render_template('goals.html', goals=goals_with_progress)
+
+@app.route('/goals/add', methods=['POST'])
+@login_required
+def add_goal():
+    """Add new financial goal"""
+    user_id = session['user_id']
+    title = request.form['title'].strip()
+    target_amount = float(request.form['target_amount'])
+    target_date = request.form['target_date']
+    description = request.form.get('description', '')
+    
+    if not title or target_amount <= 0:
+        flash('Please enter a title and a target amount greater than 0.', 'error')
+        return redirect(url_for('financial_goals'))
+    
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT INTO financial_goals (title, description, target_cents, target_date, user_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (title, description, db.to_cents(target_amount), target_date, user_id))
+    conn.commit()
     conn.close()
     
-    return render_template('goals.html', goals=goals_with_progress)
+    flash(f'Goal "{title}" added! Link transactions to it when you add or edit them.', 'success')
+    return redirect(url_for('financial_goals'))
+
+@app.route('/goals/delete/<int:goal_id>')
+@login_required
+def delete_goal(goal_id):
+    """Delete financial goal (its transactions are kept)"""
+    user_id = session['user_id']
+    conn = get_db_connection()
+    result = conn.execute(
+        'DELETE FROM financial_goals WHERE id = ? AND user_id = ?', 
+        (goal_id, user_id)
+    )
+    conn.commit()
+    conn.close()
+    
+    if result.rowcount > 0:
+        flash('Goal deleted successfully!', 'success')
+    else:
+        flash('Goal not found.', 'error')
+    
+    return redirect(url_for('financial_goals'))
+
+EXPORT_HEADER = ['Date', 'Amount', 'Type', 'Category', 'Description']
+EXPORT_QUERY = '''
+    SELECT t.date, t.amount, t.type, t.category_id, t.description
+    FROM transactions t
+    WHERE {where}
+    ORDER BY t.date DESC
+'''
+
+def iter_export_csv(cursor, category_names, batch_size=1000):
+    """Yield the export CSV in chunks, one chunk per fetchmany() batch.
+    
+    Only one batch of rows and one chunk of text are held in memory at a
+    time, so memory stays flat no matter how large the export is.
+    category_names maps category ids to names.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    yield output.getvalue()
+    
+    while True:
+        transactions = cursor.fetchmany(batch_size)
+        if not transactions:
+            break
+        output.seek(0)
+        output.truncate(0)
+        for transaction in transactions:
+            writer.writerow([
+                transaction['date'],
+                transaction['amount'],
+                transaction['type'],
+                category_names.get(transaction['category_id']) or 'No Category',
+                transaction['description'] or ''
+            ])
+        yield output.getvalue()
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
 
 @app.route('/export')
 @login_required
@@ -977,63 +1285,210 @@ def export_csv():
     user_id = session['user_id']
     
     # Get same filters as reports
-    filter_type = request.args.get('type', '')
-    filter_category = request.args.get('category', '')
-    filter_month = request.args.get('month', '')
-    filter_year = request.args.get('year', '')
+    filter_type, filter_category, filter_month, filter_year = get_report_filters()
     
     conn = get_db_connection()
     
     # Build query with filters (only for current user)
-    query = '''
-        SELECT t.date, t.amount, t.type, c.name as category_name, t.description 
-        FROM transactions t 
-        LEFT JOIN categories c ON t.category_id = c.id 
-        WHERE t.user_id = ?
-    '''
-    params = [user_id]
+    where, params = build_transaction_filters(
+        conn, user_id, filter_type, filter_category, filter_month, filter_year
+    )
     
-    if filter_type:
-        query += ' AND t.type = ?'
-        params.append(filter_type)
+    # The cursor steps through the result lazily; rows are pulled in
+    # fetchmany() batches while the response is being sent.
+    cursor = conn.execute(EXPORT_QUERY.format(where=where), params)
+    chunks = iter_export_csv(cursor, user_categories(conn, user_id).names,
+                             app.config['EXPORT_BATCH_SIZE'])
     
-    if filter_category:
-        query += ' AND t.category_id = ?'
-        params.append(filter_category)
+    use_gzip = app.config['EXPORT_GZIP'] and request.accept_encodings['gzip'] > 0
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
     
-    if filter_month:
-        query += ' AND strftime("%m", t.date) = ?'
-        params.append(filter_month.zfill(2))
+    # Create streaming response
+    response = Response(stream_with_context(chunks), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=expenses.csv'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
     
-    if filter_year:
-        query += ' AND strftime("%Y", t.date) = ?'
-        params.append(filter_year)
+    return response
+
+@app.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_csv():
+    """Bulk import transactions from a CSV file in the export format"""
+    user_id = session['user_id']
     
-    query += ' ORDER BY t.date DESC'
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import.', 'error')
+            return redirect(url_for('import_csv'))
+        
+        # Large files are imported by a job worker instead of this request
+        if app.config['JOBS_ENABLED'] and (request.content_length or 0) >= app.config['JOB_IMPORT_MIN_BYTES']:
+            # Saved before the job row is written, so no write transaction is
+            # held during the upload, and moved into the job's directory
+            # before the commit, so no worker can claim the job without it
+            staged = jobs.staging_file(app.config['JOBS_DIR'])
+            upload.save(staged)
+            conn = get_db_connection()
+            try:
+                job_id = jobs.enqueue(conn, user_id, 'import', {'filename': upload.filename},
+                                      app.config['JOB_MAX_ATTEMPTS'])
+                os.replace(staged, jobs.job_file(app.config['JOBS_DIR'], job_id, 'upload.csv'))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+                if os.path.exists(staged):
+                    os.remove(staged)
+            flash('Your file is being imported in the background.', 'success')
+            return redirect(url_for('background_jobs'))
+        
+        conn = get_db_connection()
+        started = datetime.now()
+        try:
+            result = importer.import_csv(conn, user_id, importer.open_text(upload.stream),
+                                         app.config['IMPORT_BATCH_SIZE'])
+        except (importer.CSVImportError, UnicodeDecodeError, csv.Error) as e:
+            flash(f'Import failed: {e}', 'error')
+            return redirect(url_for('import_csv'))
+        finally:
+            conn.close()
+        invalidate_cache(user_id, categories_changed=bool(result['created_categories']))
+        
+        result['seconds'] = (datetime.now() - started).total_seconds()
+        flash(f"Imported {result['imported']} of {result['rows']} transaction(s).",
+              'success' if not result['error_count'] else 'error')
+        return render_template('import.html', result=result)
     
-    transactions = conn.execute(query, params).fetchall()
+    return render_template('import.html', result=None)
+
+@jobs.handler('export')
+def export_job(job):
+    """Write the export CSV for the job's filters into its directory"""
+    conn = get_db_connection()
+    where, params = build_transaction_filters(
+        conn, job.user_id, job.params.get('type', ''), job.params.get('category', ''),
+        job.params.get('month', ''), job.params.get('year', '')
+    )
+    total = transactions_summary(conn, where, params)['total_count']
+    job.progress(0, total, force=True)
+    
+    # Job workers don't see the web workers' write versions, so the names
+    # are read here rather than taken from the category directory
+    names = {row['id']: row['name'] for row in conn.execute(
+        'SELECT id, name FROM categories WHERE user_id = ?', (job.user_id,)
+    )}
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    cursor = conn.execute(EXPORT_QUERY.format(where=where), params)
+    path = job.path('expenses.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        # The first chunk is the header, then one chunk per batch of rows
+        for number, chunk in enumerate(iter_export_csv(cursor, names, batch_size)):
+            f.write(chunk)
+            job.progress(min(number * batch_size, total))
     conn.close()
     
-    # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Date', 'Amount', 'Type', 'Category', 'Description'])
-    
-    for transaction in transactions:
-        writer.writerow([
-            transaction['date'],
-            transaction['amount'],
-            transaction['type'],
-            transaction['category_name'] or 'No Category',
-            transaction['description'] or ''
-        ])
-    
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = 'attachment; filename=expenses.csv'
+    job.result_file = path
+    return {'rows': total, 'filename': 'expenses.csv'}
+
+@jobs.handler('import')
+def import_job(job):
+    """Import the CSV file uploaded with the job"""
+    path = job.path('upload.csv')
+    conn = get_db_connection()
     
-    return response
+    def record(result):
+        result['filename'] = job.params.get('filename')
+        job.record(conn, result)
+    
+    try:
+        # The result is recorded in the import's own transaction, so a retry
+        # after the rows committed only redoes the steps below
+        result = job.recorded(conn)
+        if result is None:
+            with open(path, 'rb') as f:
+                result = importer.import_csv(conn, job.user_id, importer.open_text(f),
+                                             app.config['IMPORT_BATCH_SIZE'], progress=job.progress,
+                                             before_commit=record)
+    except (importer.CSVImportError, UnicodeDecodeError, csv.Error) as e:
+        raise jobs.JobFailed(f'Import failed: {e}')
+    finally:
+        conn.close()
+    # Runs in the job worker's process; the write version it bumps is in the
+    # database, so the web workers' caches see the import too
+    invalidate_cache(job.user_id, categories_changed=bool(result['created_categories']))
+    if os.path.exists(path):
+        os.remove(path)
+    
+    return result
+
+@app.route('/jobs')
+@login_required
+def background_jobs():
+    """The user's background exports and imports"""
+    conn = get_db_connection()
+    job_list = [jobs.describe(job) for job in jobs.user_jobs(conn, session['user_id'])]
+    conn.close()
+    return render_template('jobs.html', jobs=job_list)
+
+@app.route('/api/jobs')
+@login_required
+def jobs_api():
+    """Status of the user's recent jobs, polled by the jobs page"""
+    conn = get_db_connection()
+    job_list = [jobs.describe(job) for job in jobs.user_jobs(conn, session['user_id'])]
+    conn.close()
+    return jsonify({'jobs': job_list})
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def job_api(job_id):
+    """Status of one job"""
+    conn = get_db_connection()
+    job = jobs.get_job(conn, session['user_id'], job_id)
+    conn.close()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(jobs.describe(job))
+
+@app.route('/jobs/export', methods=['POST'])
+@login_required
+def enqueue_export():
+    """Queue a CSV export with the reports filters"""
+    user_id = session['user_id']
+    filters = {key: request.form.get(key, '') for key in ('type', 'category', 'month', 'year')}
+    
+    # Without job workers nothing would ever run the job; export in the request instead
+    if not app.config['JOBS_ENABLED']:
+        return redirect(url_for('export_csv', **{key: value for key, value in filters.items() if value}))
+    
+    conn = get_db_connection()
+    jobs.enqueue(conn, user_id, 'export', filters, app.config['JOB_MAX_ATTEMPTS'])
+    conn.commit()
+    conn.close()
+    
+    flash('Your export is being prepared. It will be ready to download here.', 'success')
+    return redirect(url_for('background_jobs'))
+
+@app.route('/jobs/<int:job_id>/download')
+@login_required
+def download_job(job_id):
+    """Download the file a finished job produced"""
+    conn = get_db_connection()
+    job = jobs.get_job(conn, session['user_id'], job_id)
+    conn.close()
+    
+    if not job or job['status'] != 'done' or not job['result_file'] or not os.path.exists(job['result_file']):
+        flash('That file is not available (jobs are kept for a limited time).', 'error')
+        return redirect(url_for('background_jobs'))
+    
+    return send_file(job['result_file'], mimetype='text/csv', as_attachment=True,
+                     download_name=jobs.describe(job)['result']['filename'])
 
 @app.route('/about')
 def about():
@@ -1042,5 +1497,6 @@ def about():
 
 if __name__ == '__main__':
     # Initialize database
-    init_db()
+    with app.app_context():
+        init_db()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Online backups for the Expense Tracker
+Copies tracker.db into a timestamped snapshot with SQLite's online backup
+API while the app keeps running.
+
+The copy is made in steps of a few hundred pages with a short sleep after
+each, so the disk is never saturated. The source connection holds one read
+transaction for the whole copy. In WAL mode that gives the snapshot a single
+consistent point in time and never blocks writers: add_transaction() commits
+into the WAL as usual, and the backup neither restarts nor waits on it.
+
+Each snapshot is written to a .partial file, checked with
+PRAGMA integrity_check, and only then renamed into place. The newest
+--keep snapshots are kept; older ones are deleted.
+
+Run it from cron or a systemd timer, or keep it running on its own:
+    python backup.py                       # one snapshot into database/backups/
+    python backup.py --every 86400         # repeat once a day
+    python backup.py --keep 14 --pages 512 --sleep 0.01
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+BACKUP_DIR = os.path.join(BASE_DIR, 'database', 'backups')
+
+DEFAULT_PAGES_PER_STEP = 256       # 1 MB per step with 4 KB pages
+DEFAULT_STEP_SLEEP = 0.02          # seconds between steps
+DEFAULT_KEEP = 7
+
+SNAPSHOT_PREFIX = 'tracker-'
+SNAPSHOT_SUFFIX = '.db'
+
+
+def snapshot_name(now=None):
+    return f'{SNAPSHOT_PREFIX}{(now or datetime.now()):%Y%m%d-%H%M%S}{SNAPSHOT_SUFFIX}'
+
+
+def snapshots(backup_dir=BACKUP_DIR):
+    """Paths of the finished snapshots in backup_dir, oldest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(name for name in os.listdir(backup_dir)
+                   if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX))
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def verify(path):
+    """PRAGMA integrity_check on a snapshot; returns its result ('ok' when sound)"""
+    # as_uri() escapes '?', '#' and '%' in the path, which would otherwise
+    # be read as the URI's query, fragment or escapes
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        return '; '.join(row[0] for row in conn.execute('PRAGMA integrity_check'))
+    finally:
+        conn.close()
+
+
+def rotate(backup_dir=BACKUP_DIR, keep=DEFAULT_KEEP):
+    """Delete all but the newest `keep` snapshots; returns the deleted paths"""
+    paths = snapshots(backup_dir)
+    removed = paths[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def backup(database_path=DATABASE_PATH, backup_dir=BACKUP_DIR, pages=DEFAULT_PAGES_PER_STEP,
+           sleep=DEFAULT_STEP_SLEEP, keep=DEFAULT_KEEP):
+    """Write, verify and rotate one snapshot of database_path.
+
+    Returns a dict with the snapshot's path, pages copied, steps, size in
+    bytes and seconds taken. Raises RuntimeError (and leaves no snapshot
+    behind) if the copy fails its integrity check.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    path = os.path.join(backup_dir, snapshot_name())
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    started = time.perf_counter()
+    steps = 0
+    page_count = 0
+
+    def step(status, remaining, total):
+        nonlocal steps, page_count
+        steps += 1
+        page_count = total
+
+    source = sqlite3.connect(database_path, timeout=30, isolation_level=None)
+    target = sqlite3.connect(partial, isolation_level=None)
+    try:
+        # Pin one read snapshot of the source for every step of the copy
+        source.execute('BEGIN')
+        source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone()
+        source.backup(target, pages=pages, progress=step, sleep=sleep)
+        source.execute('COMMIT')
+        # The copy inherits WAL mode; a snapshot is easier to move around as one file
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+        source.close()
+
+    integrity = verify(partial)
+    if integrity != 'ok':
+        os.remove(partial)
+        raise RuntimeError(f'Backup of {database_path} failed its integrity check: {integrity}')
+    os.replace(partial, path)
+
+    return {
+        'path': path,
+        'pages': page_count,
+        'steps': steps,
+        'bytes': os.path.getsize(path),
+        'seconds': time.perf_counter() - started,
+        'removed': rotate(backup_dir, keep),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Take online backups of the tracker database')
+    parser.add_argument('--database', default=DATABASE_PATH, help='path to tracker.db')
+    parser.add_argument('--dir', default=BACKUP_DIR, help='directory the snapshots go to')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='snapshots to keep')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES_PER_STEP,
+                        help='pages copied per step')
+    parser.add_argument('--sleep', type=float, default=DEFAULT_STEP_SLEEP,
+                        help='seconds to pause between steps')
+    parser.add_argument('--every', type=int, help='repeat every N seconds instead of running once')
+    args = parser.parse_args()
+
+    while True:
+        result = backup(args.database, args.dir, args.pages, args.sleep, args.keep)
+        print(f"✅ {datetime.now():%Y-%m-%d %H:%M:%S} {os.path.basename(result['path'])}: "
+              f"{result['pages']:,} pages ({result['bytes'] / 1024 / 1024:.1f} MB) in "
+              f"{result['steps']} steps, {result['seconds']:.1f}s, integrity ok")
+        for path in result['removed']:
+            print(f"🗑️ Removed {os.path.basename(path)}")
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == '__main__':
+    main()
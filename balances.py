@@ -0,0 +1,252 @@
+"""
+Running balance checkpoints for the Expense Tracker
+Keeps one row per (user, day with transactions) holding that day's net
+amount and the balance at the end of the day, so the balance at any date is
+one indexed lookup and a balance history is one range scan.
+
+A day's checkpoint is the running sum of every earlier day's net. Like the
+monthly rollups it is maintained by triggers on `transactions`. A write
+dated D adds its amount to D's checkpoint (creating it from the previous
+one if needed) and to every later checkpoint of the user, in one indexed
+range UPDATE. Back-dated edits therefore touch one row per later day with
+transactions, never the transactions themselves. Days without transactions
+have no row; their balance is the last checkpoint before them.
+
+Bulk loads, where a single file may be back-dated row after row, suspend
+the triggers inside their own transaction and repair the checkpoints from
+the earliest date they wrote (see suspend() and resume()).
+
+Run this script directly to rebuild the checkpoints from scratch:
+    python balances.py
+"""
+
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import rollups
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+CHECKPOINT_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS balance_checkpoints (
+        user_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        net_cents INTEGER NOT NULL DEFAULT 0,
+        balance_cents INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, date)
+    ) WITHOUT ROWID
+'''
+
+# Net per day and its running sum; {where} restricts the transactions,
+# and :base is the balance carried into the first day
+BACKFILL_SQL = '''
+    INSERT INTO balance_checkpoints (user_id, date, net_cents, balance_cents, count)
+    SELECT user_id, date, net_cents,
+           :base + SUM(net_cents) OVER (PARTITION BY user_id ORDER BY date), count
+    FROM (
+        SELECT user_id, date,
+               SUM(CASE WHEN type = 'income' THEN amount_cents ELSE -amount_cents END) as net_cents,
+               COUNT(*) as count
+        FROM transactions
+        {where}
+        GROUP BY user_id, date
+    )
+'''
+
+
+def _signed(row):
+    return f"CASE WHEN {row}.type = 'income' THEN {row}.amount_cents ELSE -{row}.amount_cents END"
+
+
+# Statement bodies shared by the triggers
+_ADD_ROW = f'''
+    INSERT INTO balance_checkpoints (user_id, date, net_cents, balance_cents, count)
+    VALUES (NEW.user_id, NEW.date, 0, COALESCE((
+        SELECT balance_cents FROM balance_checkpoints
+        WHERE user_id = NEW.user_id AND date < NEW.date
+        ORDER BY date DESC LIMIT 1), 0), 0)
+    ON CONFLICT (user_id, date) DO NOTHING;
+    UPDATE balance_checkpoints SET
+        balance_cents = balance_cents + ({_signed('NEW')}),
+        net_cents = net_cents + CASE WHEN date = NEW.date THEN {_signed('NEW')} ELSE 0 END,
+        count = count + (date = NEW.date)
+    WHERE user_id = NEW.user_id AND date >= NEW.date;
+'''
+
+_REMOVE_ROW = f'''
+    UPDATE balance_checkpoints SET
+        balance_cents = balance_cents - ({_signed('OLD')}),
+        net_cents = net_cents - CASE WHEN date = OLD.date THEN {_signed('OLD')} ELSE 0 END,
+        count = count - (date = OLD.date)
+    WHERE user_id = OLD.user_id AND date >= OLD.date;
+    DELETE FROM balance_checkpoints
+    WHERE user_id = OLD.user_id AND date = OLD.date AND count <= 0;
+'''
+
+TRIGGERS = {
+    'trg_balances_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_balances_insert
+        AFTER INSERT ON transactions
+        BEGIN {_ADD_ROW} END
+    ''',
+    'trg_balances_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_balances_delete
+        AFTER DELETE ON transactions
+        BEGIN {_REMOVE_ROW} END
+    ''',
+    'trg_balances_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_balances_update
+        AFTER UPDATE OF date, amount_cents, type, user_id ON transactions
+        BEGIN {_REMOVE_ROW} {_ADD_ROW} END
+    ''',
+}
+
+
+def install(conn):
+    """Create the checkpoint table and triggers, backfilling existing databases.
+
+    As with the rollups, the backfill and the triggers are created in one
+    write transaction.
+    """
+    if rollups.table_exists(conn, 'balance_checkpoints'):
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(CHECKPOINT_TABLE_SQL)
+        conn.execute(BACKFILL_SQL.format(where=''), {'base': 0})
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def repair(conn, user_id, since):
+    """Recompute the user's checkpoints from day `since` on.
+
+    Runs inside the caller's transaction; cost is proportional to the
+    user's transactions dated `since` or later.
+    """
+    row = conn.execute('''
+        SELECT balance_cents FROM balance_checkpoints
+        WHERE user_id = ? AND date < ?
+        ORDER BY date DESC LIMIT 1
+    ''', (user_id, since)).fetchone()
+    base = row[0] if row else 0
+    conn.execute('DELETE FROM balance_checkpoints WHERE user_id = ? AND date >= ?', (user_id, since))
+    conn.execute(BACKFILL_SQL.format(where='WHERE user_id = :user_id AND date >= :since'),
+                 {'base': base, 'user_id': user_id, 'since': since})
+
+
+def suspend(conn):
+    """Stop maintaining checkpoints until resume(); call inside a write transaction.
+
+    The triggers are dropped in the caller's transaction, so other
+    connections never see them missing: they either see the commit, with
+    the triggers back, or the state before it.
+    """
+    for name in TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def resume(conn, user_id=None, since=None):
+    """Repair the user's checkpoints from `since` and recreate the triggers"""
+    if user_id is not None and since is not None:
+        repair(conn, user_id, since)
+    for sql in TRIGGERS.values():
+        conn.execute(sql)
+
+
+def rebuild(conn, user_id=None):
+    """Recompute the checkpoints from the transactions table"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if user_id is None:
+            conn.execute('DELETE FROM balance_checkpoints')
+            conn.execute(BACKFILL_SQL.format(where=''), {'base': 0})
+        else:
+            conn.execute('DELETE FROM balance_checkpoints WHERE user_id = ?', (user_id,))
+            conn.execute(BACKFILL_SQL.format(where='WHERE user_id = :user_id'),
+                         {'base': 0, 'user_id': user_id})
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def balance_cents_at(conn, user_id, day):
+    """Balance in cents at the end of `day` ('YYYY-MM-DD')"""
+    row = conn.execute('''
+        SELECT balance_cents FROM balance_checkpoints
+        WHERE user_id = ? AND date <= ?
+        ORDER BY date DESC LIMIT 1
+    ''', (user_id, day)).fetchone()
+    return row[0] if row else 0
+
+
+def balance_at(conn, user_id, day):
+    """Balance at the end of `day` ('YYYY-MM-DD')"""
+    return balance_cents_at(conn, user_id, day) / 100
+
+
+def daily_balances(conn, user_id, start, end):
+    """(date, balance) at the end of every day from start to end, inclusive"""
+    balance = balance_cents_at(conn, user_id, start)
+    changes = dict(conn.execute('''
+        SELECT date, balance_cents FROM balance_checkpoints
+        WHERE user_id = ? AND date > ? AND date <= ?
+    ''', (user_id, start, end)).fetchall())
+
+    series = []
+    first = date.fromisoformat(start)
+    # Counted rather than stepped past `end`, which may be date.max
+    for offset in range((date.fromisoformat(end) - first).days + 1):
+        key = (first + timedelta(days=offset)).isoformat()
+        balance = changes.get(key, balance)
+        series.append((key, balance / 100))
+    return series
+
+
+# End-of-day balances in [start, end]: the one carried into the range, then
+# every checkpoint inside it. SQLite returns the date of the MIN()/MAX() row.
+_RANGE_SQL = '''
+    SELECT date, {aggregate}(balance_cents) FROM (
+        SELECT :start as date, COALESCE((
+            SELECT balance_cents FROM balance_checkpoints
+            WHERE user_id = :user_id AND date <= :start
+            ORDER BY date DESC LIMIT 1), 0) as balance_cents
+        UNION ALL
+        SELECT date, balance_cents FROM balance_checkpoints
+        WHERE user_id = :user_id AND date > :start AND date <= :end
+    )
+'''
+
+
+def balance_range(conn, user_id, start, end):
+    """Lowest and highest end-of-day balance between start and end, with their dates"""
+    params = {'user_id': user_id, 'start': start, 'end': end}
+    low_date, low = conn.execute(_RANGE_SQL.format(aggregate='MIN'), params).fetchone()
+    high_date, high = conn.execute(_RANGE_SQL.format(aggregate='MAX'), params).fetchone()
+    return {
+        'min': low / 100,
+        'min_date': low_date,
+        'max': high / 100,
+        'max_date': high_date,
+    }
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    install(conn)
+    rebuild(conn)
+    rows = conn.execute('SELECT COUNT(*) FROM balance_checkpoints').fetchone()[0]
+    conn.close()
+    print(f"✅ Rebuilt balance checkpoints ({rows} rows)")
@@ -0,0 +1,234 @@
+"""
+Query benchmark suite for the Expense Tracker
+Generates a synthetic database for each scale (see generate_data.py) and
+times two things for one user:
+
+    queries   - the query set behind each route, called directly
+    requests  - the full request through the Flask test client
+
+Results are written as JSON so runs can be compared between releases:
+    python benchmark.py                          # 10k, 100k and 1m rows
+    python benchmark.py --scales 10k,10m --repeat 3 --output bench.json
+
+Generated databases are kept in database/bench/ and reused by later runs
+with the same scale, seed and end date (pass --end to compare runs made on
+different days against identical data). The result cache is turned off so
+every run measures the real queries. The dashboard is read from its stored
+state, so it is timed twice: as a page view reads it (dashboard) and as the
+first view after a write rebuilds it (dashboard_refresh).
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import date
+
+import app as tracker
+import generate_data
+import live_updates
+import search_index
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(BASE_DIR, 'database', 'bench')
+
+DEFAULT_SCALES = '10k,100k,1m'
+DEFAULT_REPEAT = 5
+
+# Routes timed through the test client
+REQUESTS = {
+    'dashboard': '/',
+    'analytics': '/analytics',
+    'reports': '/reports',
+    'reports_filtered': '/reports?type=expense&year={year}',
+    'reports_api_page': '/api/reports/transactions',
+    'budgets': '/budgets',
+    'search_text': '/search?q=grocer',
+    'search_amount': '/search?q=25',
+    'search_date': '/search?q={year}-03',
+    'export': '/export',
+}
+
+
+def dashboard_refresh_queries(user_id):
+    """What the first dashboard view after a write runs: the whole re-evaluation"""
+    conn = tracker.get_db_connection()
+    live_updates.refresh(conn, user_id, tracker.user_categories(conn, user_id).names, publish=False)
+
+
+def reports_queries(user_id, **filters):
+    """What /reports runs: first page, categories and the summary"""
+    conn = tracker.get_db_connection()
+    where, params = tracker.build_transaction_filters(conn, user_id, **filters)
+    transactions, _ = tracker.fetch_transactions_page(conn, where, params, '',
+                                                      tracker.app.config['REPORTS_PAGE_SIZE'])
+    tracker.user_categories(conn, user_id).attach(transactions)
+    tracker.transactions_summary(conn, where, params)
+
+
+def search_queries(user_id, text):
+    conn = tracker.get_db_connection()
+    rows, _ = search_index.search(conn, user_id, text, 1, tracker.app.config['SEARCH_PAGE_SIZE'])
+    tracker.user_categories(conn, user_id).attach(rows)
+
+
+def export_queries(user_id):
+    """What /export runs, formatting every row but discarding the output"""
+    conn = tracker.get_db_connection()
+    where, params = tracker.build_transaction_filters(conn, user_id)
+    cursor = conn.execute(tracker.EXPORT_QUERY.format(where=where), params)
+    names = tracker.user_categories(conn, user_id).names
+    for _ in tracker.iter_export_csv(cursor, names, tracker.app.config['EXPORT_BATCH_SIZE']):
+        pass
+
+
+def query_sets(user_id, year):
+    """Name -> callable running the queries behind one route"""
+    return {
+        'dashboard': lambda: tracker.dashboard_data(user_id),
+        'dashboard_refresh': lambda: dashboard_refresh_queries(user_id),
+        'analytics': lambda: tracker.analytics_data(user_id),
+        'reports': lambda: reports_queries(user_id),
+        'reports_filtered': lambda: reports_queries(user_id, filter_type='expense',
+                                                    filter_year=str(year)),
+        'search_text': lambda: search_queries(user_id, 'grocer'),
+        'search_amount': lambda: search_queries(user_id, '25'),
+        'search_date': lambda: search_queries(user_id, f'{year}-03'),
+        'export': lambda: export_queries(user_id),
+    }
+
+
+def summarize(samples):
+    """Milliseconds statistics for a list of durations in seconds"""
+    samples = sorted(sample * 1000 for sample in samples)
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        'runs': len(samples),
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p95_ms': round(p95, 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+def time_call(function, repeat):
+    """Run function once to warm up, then time it `repeat` times"""
+    function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def database_for(rows, users, seed, end):
+    """Path of the generated database for a scale, generating it if needed"""
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    users = users or max(1, rows // generate_data.ROWS_PER_USER)
+    path = os.path.join(BENCH_DIR, f'bench-{rows}-{users}-{seed}-{end.isoformat()}.db')
+    if os.path.exists(path):
+        return path, None
+    # Generated under a temporary name so an interrupted run is never reused
+    generated = generate_data.generate(path + '.tmp', rows, users, seed=seed, end=end)
+    os.replace(path + '.tmp', path)
+    return path, generated
+
+
+def benchmark_scale(rows, users, repeat, seed, end):
+    path, generated = database_for(rows, users, seed, end)
+    tracker.app.config['DATABASE'] = path
+    tracker.app.config['CACHE_BACKEND'] = None
+
+    conn = sqlite3.connect(path)
+    user_id, user_rows = conn.execute('''
+        SELECT user_id, COUNT(*) FROM transactions
+        GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1
+    ''').fetchone()
+    username = conn.execute('SELECT username FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+    conn.close()
+
+    result = {
+        'rows': rows,
+        'database_bytes': os.path.getsize(path),
+        'generated': generated,
+        'user_rows': user_rows,
+        'queries': {},
+        'requests': {},
+    }
+
+    for name, function in query_sets(user_id, end.year).items():
+        def run(function=function):
+            with tracker.app.app_context():
+                function()
+        result['queries'][name] = time_call(run, repeat)
+
+    client = tracker.app.test_client()
+    client.post('/login', data={'username': username, 'password': generate_data.BENCH_PASSWORD})
+    for name, url in REQUESTS.items():
+        url = url.format(year=end.year)
+
+        def run(url=url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            response.get_data()
+            response.close()
+        result['requests'][name] = time_call(run, repeat)
+
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark route queries at several data scales')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='comma-separated row counts, e.g. 10k,100k,1m,10m')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed runs per item')
+    parser.add_argument('--users', type=int,
+                        help='users per database (default one per 2000 rows; fewer means heavier users)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', help='last day of the generated histories (YYYY-MM-DD, default today)')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write')
+    args = parser.parse_args()
+
+    end = date.fromisoformat(args.end) if args.end else date.today()
+    report = {
+        'revision': git_revision(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'end': end.isoformat(),
+        'scales': [],
+    }
+    for rows in [generate_data.parse_count(scale) for scale in args.scales.split(',')]:
+        print(f"⏱️ Benchmarking {rows} rows …")
+        scale = benchmark_scale(rows, args.users, args.repeat, args.seed, end)
+        report['scales'].append(scale)
+        for kind in ('queries', 'requests'):
+            for name, stats in scale[kind].items():
+                print(f"   {kind:<8} {name:<18} median {stats['median_ms']:>9.2f} ms"
+                      f"   p95 {stats['p95_ms']:>9.2f} ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Budget evaluation for the Expense Tracker
+Computes spent, remaining, percentage and alert level for every budget in a
+month range with a single grouped query against the monthly rollups.
+"""
+
+# Percentage thresholds for budget alerts
+WARNING_THRESHOLD = 80
+DANGER_THRESHOLD = 100
+
+BUDGET_STATUS_QUERY = '''
+    SELECT b.*, c.name as category_name,
+           COALESCE(SUM(r.total_cents), 0) / 100.0 as spent
+    FROM budgets b
+    LEFT JOIN categories c ON b.category_id = c.id
+    LEFT JOIN monthly_rollups r
+        ON r.user_id = b.user_id AND r.month = b.month AND r.type = 'expense'
+        AND r.category_id = b.category_id
+    WHERE b.user_id = ? AND b.month >= ? AND b.month <= ?
+    GROUP BY b.id
+    ORDER BY b.month DESC, c.name
+'''
+
+
+def alert_level(percentage):
+    """Return 'danger', 'warning' or None for a percentage of budget used"""
+    if percentage >= DANGER_THRESHOLD:
+        return 'danger'
+    if percentage >= WARNING_THRESHOLD:
+        return 'warning'
+    return None
+
+
+def budget_status(conn, user_id, start_month='0000-00', end_month='9999-99'):
+    """Evaluate all of a user's budgets for months in [start_month, end_month].
+
+    Months are 'YYYY-MM' strings; pass the same month twice for one month.
+    A budget without a category matches no expenses, so its spent is 0.
+    """
+    statuses = []
+    for budget in conn.execute(BUDGET_STATUS_QUERY, (user_id, start_month, end_month)):
+        spent = budget['spent']
+        limit = budget['amount_limit']
+        remaining = limit - spent
+        percentage = (spent / limit) * 100 if limit > 0 else 0
+        statuses.append({
+            'budget': budget,
+            'month': budget['month'],
+            'spent': spent,
+            'remaining': remaining,
+            'percentage': percentage,
+            'over_budget': remaining < 0,
+            'alert': alert_level(percentage),
+        })
+    return statuses
+
+
+def budget_alerts(statuses):
+    """Turn budget statuses into the alert cards shown on the dashboard"""
+    alerts = []
+    for status in statuses:
+        if status['alert'] == 'danger':
+            message = f'Over budget by €{-status["remaining"]:.2f}'
+        elif status['alert'] == 'warning':
+            message = f'{status["percentage"]:.1f}% of budget used'
+        else:
+            continue
+        alerts.append({
+            'budget_id': status['budget']['id'],
+            'type': status['alert'],
+            'category': status['budget']['category_name'],
+            'message': message,
+            'percentage': status['percentage']
+        })
+    return alerts
@@ -0,0 +1,282 @@
+"""
+Result cache for the Expense Tracker
+Keeps computed dashboard and analytics payloads so repeat page views don't
+run any queries against the tracker database.
+
+Every user has a write version that mutating routes bump. It is kept in
+the tracker database (`write_versions`), so every gunicorn worker and every
+jobs.py worker sees the same version. Entries are keyed by (page, user_id,
+version, period), so a write in any worker makes the user's old entries
+unreachable everywhere; they are then aged out by the LRU bound and the TTL.
+Scripts that write outside the app (recurring.py, jobs.py) bump it too.
+
+Two backends share one interface:
+    MemoryCache  - per-process LRU; each worker computes its own entries
+    SQLiteCache  - a separate SQLite file shared by all gunicorn workers
+
+Run this script directly to print the shared cache's size or clear it:
+    python cache.py
+    python cache.py --clear
+"""
+
+import argparse
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, 'database', 'cache.db')
+
+# Defaults, overridable through app.config
+DEFAULT_BACKEND = 'memory'         # 'memory', 'sqlite' or None to disable
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300                  # seconds
+
+CACHE_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at);
+'''
+
+# Lives in the tracker database, next to the data it versions
+VERSIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS write_versions (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+'''
+
+
+def install(conn):
+    conn.execute(VERSIONS_TABLE_SQL)
+
+
+def version(conn, user_id):
+    """The user's write version, read from the tracker database"""
+    row = conn.execute('SELECT version FROM write_versions WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def bump(conn, user_id):
+    """Increment the user's write version and return the new one.
+
+    Commits, so call it after the write it records has been committed.
+    """
+    new_version = conn.execute('''
+        INSERT INTO write_versions (user_id, version) VALUES (?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+        RETURNING version
+    ''', (user_id,)).fetchone()[0]
+    conn.commit()
+    return new_version
+
+
+class ResultCache:
+    """Common interface; subclasses store the entries"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, name, user_id, version, period, compute):
+        """Return the cached value for this key, computing and storing it on a miss"""
+        key = f'{name}:{user_id}:{version}:{period}'
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def stats(self):
+        return {'backend': type(self).__name__, 'hits': self.hits,
+                'misses': self.misses, 'entries': len(self)}
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class NullCache(ResultCache):
+    """Caching disabled: every fetch computes"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache(ResultCache):
+    """In-process LRU with a TTL"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        super().__init__(max_entries, ttl)
+        self.entries = OrderedDict()    # key -> (expires_at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCache(ResultCache):
+    """Cache in its own SQLite file, shared by every worker on the host.
+
+    Values are pickled, so they must be plain data (dicts and lists, not
+    sqlite3.Row objects).
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self.local = threading.local()
+        self.connection().executescript(CACHE_SCHEMA_SQL)
+
+    def connection(self):
+        """This thread's connection to the cache file (autocommit, WAL)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self.connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?', (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        conn = self.connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + self.ttl, now)
+            )
+            conn.execute('DELETE FROM cache_entries WHERE expires_at < ?', (now,))
+            conn.execute('''
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries
+                    ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        self.connection().execute('DELETE FROM cache_entries')
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(app=None):
+    """Return this worker process's cache for the app, built from its config"""
+    app = app or current_app
+    backend = app.config.get('CACHE_BACKEND', DEFAULT_BACKEND)
+    path = app.config.get('CACHE_PATH', CACHE_PATH)
+    # Keyed on the pid so a forked worker opens its own cache connections,
+    # and on the database so switching databases never serves stale results
+    key = (os.getpid(), app.config['DATABASE'], backend, path)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                max_entries = app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+                ttl = app.config.get('CACHE_TTL', DEFAULT_TTL)
+                if backend == 'memory':
+                    cache = MemoryCache(max_entries, ttl)
+                elif backend == 'sqlite':
+                    cache = SQLiteCache(path, max_entries, ttl)
+                elif not backend:
+                    cache = NullCache(max_entries, ttl)
+                else:
+                    raise ValueError(f'Unknown cache backend: {backend}')
+                _caches[key] = cache
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the shared result cache')
+    parser.add_argument('--path', default=CACHE_PATH, help='path to cache.db')
+    parser.add_argument('--clear', action='store_true', help='drop every cached entry')
+    args = parser.parse_args()
+
+    cache = SQLiteCache(args.path)
+    if args.clear:
+        cache.clear()
+        print("✅ Cleared the result cache")
+    else:
+        print(f"📦 {len(cache)} cached result(s) in {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Category directory for the Expense Tracker
+Keeps each user's categories (id <-> name) in a bounded per-worker LRU, so
+pages fill their category dropdowns and resolve category names in Python
+instead of querying or joining `categories` on every request.
+
+Entries are tagged with the user's write version, which lives in the
+tracker database (see cache.py) and is read on every lookup. A write in
+this worker that leaves categories alone carries the entry over to the new
+version. Adding, deleting or bulk-creating categories drops it. A write in
+any other process (another gunicorn worker, a jobs.py worker) bumps the
+shared version past the entry's, so the next read here reloads the user's
+categories with one indexed query.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+# Defaults, overridable through app.config
+DEFAULT_MAX_USERS = 4096
+
+CATEGORIES_QUERY = 'SELECT id, name, user_id FROM categories WHERE user_id = ? ORDER BY name'
+
+
+class UserCategories:
+    """One user's categories, sorted by name, and an id -> name map"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.categories = [dict(row) for row in rows]
+        self.names = {category['id']: category['name'] for category in self.categories}
+
+    def name(self, category_id):
+        """The category's name, or None if it is unset or not the user's"""
+        return self.names.get(category_id)
+
+    def attach(self, rows, key='category_name'):
+        """Rows as dicts, each with its category's name added under `key`"""
+        names = self.names
+        attached = []
+        for row in rows:
+            row = dict(row)
+            row[key] = names.get(row['category_id'])
+            attached.append(row)
+        return attached
+
+
+class CategoryDirectory:
+    """Per-process LRU of UserCategories, bounded by number of users"""
+
+    def __init__(self, max_users=DEFAULT_MAX_USERS):
+        self.max_users = max_users
+        self.users = OrderedDict()      # user_id -> UserCategories
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conn, user_id, version):
+        """The user's categories at `version` (from cache.version()), loading them on a miss"""
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None and entry.version == version:
+                self.users.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = UserCategories(version, conn.execute(CATEGORIES_QUERY, (user_id,)).fetchall())
+        with self.lock:
+            self.users[user_id] = entry
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        return entry
+
+    def written(self, user_id, version, categories_changed=False):
+        """Record a write that moved the user to `version`.
+
+        The entry is kept only if it was current just before the write and
+        the write didn't change the user's categories.
+        """
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is None:
+                return
+            if not categories_changed and entry.version == version - 1:
+                entry.version = version
+            else:
+                del self.users[user_id]
+
+    def stats(self):
+        with self.lock:
+            return {'users': len(self.users), 'hits': self.hits, 'misses': self.misses}
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def get_directory(app=None):
+    """This worker process's category directory for the app"""
+    app = app or current_app
+    key = (os.getpid(), app.config['DATABASE'])
+    directory = _directories.get(key)
+    if directory is None:
+        with _directories_lock:
+            directory = _directories.get(key)
+            if directory is None:
+                directory = _directories[key] = CategoryDirectory(
+                    app.config.get('CATEGORY_CACHE_MAX_USERS', DEFAULT_MAX_USERS)
+                )
+    return directory
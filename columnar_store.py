@@ -0,0 +1,332 @@
+"""
+Columnar analytics store for the Expense Tracker
+For users with many transactions, building the analytics page from rows is
+dominated by per-row Python work. With COLUMNAR_STORE on (and NumPy
+installed), such a user's transactions are loaded once into NumPy columns:
+    day       int32  days since 1970-01-01
+    month     int32  months since 1970-01
+    cents     int64  amount in cents
+    expense   bool   type == 'expense'
+    category  int32  index into the user's category names (0 = uncategorized)
+and the AnalyticsResult is computed from them with vectorized group-bys
+(np.bincount / np.unique).
+
+Columns are tagged with the user's write version, which lives in the
+tracker database (see cache.py) and is read on every analytics request. A
+transaction added in this worker is appended in place when the columns were
+current before the write; any other write here reloads them on the next
+read. A write in another process (gunicorn or jobs.py worker) bumps the
+shared version past the columns', so they are reloaded too. Loaded users
+share a memory budget (COLUMNAR_MEMORY_MB) and are evicted least recently
+used first.
+
+Users with fewer than COLUMNAR_MIN_ROWS transactions, and every user when
+NumPy is missing, go through analytics_engine instead.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from flask import current_app
+
+import analytics_engine
+import rollups
+from analytics_engine import (AnalyticsResult, CategoryAverage, CategoryTotal,
+                              DaySpending, MonthTotals)
+from recurring import add_months
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Defaults, overridable through app.config
+DEFAULT_MIN_ROWS = 20000
+DEFAULT_MEMORY_MB = 256
+
+INITIAL_CAPACITY = 1024
+
+LOAD_QUERY = '''
+    SELECT CAST(julianday(substr(date, 1, 10)) - 2440587.5 AS INTEGER),
+           amount_cents,
+           type = 'expense', COALESCE(category_id, 0)
+    FROM transactions
+    WHERE user_id = ?
+'''
+
+CATEGORIES_QUERY = 'SELECT id, name FROM categories WHERE user_id = ?'
+
+
+def month_index(month):
+    """'YYYY-MM' -> months since 1970-01"""
+    year, number = month.split('-')
+    return (int(year) - 1970) * 12 + int(number) - 1
+
+
+def month_label(index):
+    return f'{index // 12 + 1970:04d}-{index % 12 + 1:02d}'
+
+
+class UserColumns:
+    """One user's transactions as NumPy columns, with spare capacity for appends"""
+
+    COLUMNS = ('day', 'month', 'cents', 'expense', 'category')
+
+    def __init__(self, version, category_ids, category_names, day, cents, expense, category):
+        self.version = version
+        self.category_codes = {category_id: code for code, category_id in enumerate(category_ids)}
+        self.category_names = category_names      # code -> name; code 0 is uncategorized
+        self.size = len(day)
+        capacity = max(INITIAL_CAPACITY, self.size)
+        self.day = self._column(day, np.int32, capacity)
+        self.month = self._column(
+            day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32), np.int32, capacity
+        )
+        self.cents = self._column(cents, np.int64, capacity)
+        self.expense = self._column(expense, np.bool_, capacity)
+        self.category = self._column(category, np.int32, capacity)
+
+    @staticmethod
+    def _column(values, dtype, capacity):
+        column = np.zeros(capacity, dtype=dtype)
+        column[:len(values)] = values
+        return column
+
+    @classmethod
+    def load(cls, conn, user_id, version):
+        categories = conn.execute(CATEGORIES_QUERY, (user_id,)).fetchall()
+        category_ids = [0] + [row[0] for row in categories]
+        category_names = [None] + [row[1] for row in categories]
+        codes = {category_id: code for code, category_id in enumerate(category_ids)}
+
+        rows = conn.execute(LOAD_QUERY, (user_id,)).fetchall()
+        if rows:
+            days, cents, expense, category = zip(*rows)
+        else:
+            days = cents = expense = category = ()
+        return cls(
+            version, category_ids, category_names,
+            np.array(days, dtype=np.int32),
+            np.array(cents, dtype=np.int64),
+            np.array(expense, dtype=np.bool_),
+            np.array([codes.get(category_id, 0) for category_id in category], dtype=np.int32),
+        )
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.COLUMNS)
+
+    def view(self, name):
+        return getattr(self, name)[:self.size]
+
+    def snapshot(self):
+        """The current rows, to compute from without holding the store's lock"""
+        return Snapshot(self)
+
+    def append(self, transactions):
+        """Add (date, amount_cents, type, category_id) rows; False if a category is unknown"""
+        codes = [self.category_codes.get(category_id or 0) for _, _, _, category_id in transactions]
+        if None in codes:
+            return False
+        days = [np.datetime64(date_str[:10], 'D') for date_str, _, _, _ in transactions]
+        needed = self.size + len(transactions)
+        if needed > len(self.day):
+            capacity = max(needed, len(self.day) * 2)
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        for (_, amount_cents, transaction_type, _), day, code in zip(transactions, days, codes):
+            self.day[self.size] = day.astype(np.int32)
+            self.month[self.size] = day.astype('datetime64[M]').astype(np.int32)
+            self.cents[self.size] = amount_cents
+            self.expense[self.size] = transaction_type == 'expense'
+            self.category[self.size] = code
+            self.size += 1
+        return True
+
+
+class Snapshot:
+    """Fixed-length views of a UserColumns' rows.
+
+    Appends only write past the end of these views, or into grown copies of
+    the columns, so the views never change while compute() reads them.
+    """
+
+    def __init__(self, columns):
+        self.size = columns.size
+        self.category_names = columns.category_names
+        self.columns = {name: columns.view(name) for name in UserColumns.COLUMNS}
+
+    def view(self, name):
+        return self.columns[name]
+
+
+def compute(columns, today):
+    """Build the same AnalyticsResult as analytics_engine.compute from columns"""
+    day = columns.view('day')
+    month = columns.view('month')
+    cents = columns.view('cents')
+    expense = columns.view('expense')
+    category = columns.view('category')
+    names = columns.category_names
+
+    category_since = month_index(add_months(today, -analytics_engine.CATEGORY_WINDOW_MONTHS).strftime('%Y-%m'))
+    trend_since = month_index(add_months(today, -analytics_engine.TREND_WINDOW_MONTHS).strftime('%Y-%m'))
+    savings_since = month_index(add_months(today, -analytics_engine.SAVINGS_WINDOW_MONTHS).strftime('%Y-%m'))
+
+    # Income and expense per month, newest first
+    month_totals = []
+    if columns.size:
+        first = int(month.min())
+        offsets = month - first
+        income = np.bincount(offsets[~expense], weights=cents[~expense], minlength=offsets.max() + 1)
+        spent = np.bincount(offsets[expense], weights=cents[expense], minlength=offsets.max() + 1)
+        present = np.flatnonzero(np.bincount(offsets))
+        month_totals = [MonthTotals(month_label(first + int(offset)),
+                                    int(income[offset]) / 100, int(spent[offset]) / 100)
+                        for offset in present[::-1]]
+    savings_data = [totals for totals in month_totals if month_index(totals.month) >= savings_since]
+
+    # Categorized expenses only
+    categorized = expense & (category > 0)
+    recent = categorized & (month >= category_since)
+    recent_cents = np.bincount(category[recent], weights=cents[recent], minlength=len(names))
+    recent_counts = np.bincount(category[recent], minlength=len(names))
+    category_spending = sorted(
+        (CategoryTotal(names[code], int(recent_cents[code]) / 100, int(recent_counts[code]))
+         for code in np.flatnonzero(recent_counts)),
+        key=lambda total: total.total, reverse=True
+    )[:analytics_engine.TOP_CATEGORIES]
+
+    all_cents = np.bincount(category[categorized], weights=cents[categorized], minlength=len(names))
+    all_counts = np.bincount(category[categorized], minlength=len(names))
+    low = np.full(len(names), np.iinfo(np.int64).max)
+    high = np.full(len(names), np.iinfo(np.int64).min)
+    np.minimum.at(low, category[categorized], cents[categorized])
+    np.maximum.at(high, category[categorized], cents[categorized])
+    avg_spending = sorted(
+        (CategoryAverage(names[code], int(all_cents[code]) / 100 / int(all_counts[code]),
+                         int(low[code]) / 100, int(high[code]) / 100)
+         for code in np.flatnonzero(all_counts >= analytics_engine.MIN_AVERAGE_COUNT)),
+        key=lambda average: average.avg_amount, reverse=True
+    )
+
+    # Expense per day over the top days window
+    since_day = (analytics_engine.months_before(today, analytics_engine.TOP_DAYS_WINDOW_MONTHS) - date(1970, 1, 1)).days
+    window = expense & (day >= since_day)
+    days, inverse = np.unique(day[window], return_inverse=True)
+    daily = np.bincount(inverse, weights=cents[window], minlength=len(days))
+    top = np.argsort(-daily, kind='stable')[:analytics_engine.TOP_DAYS]
+    top_spending_days = [
+        DaySpending(str(np.datetime64(int(days[index]), 'D')), int(daily[index]) / 100)
+        for index in top
+    ]
+
+    return AnalyticsResult(
+        category_spending=category_spending,
+        monthly_trends=[totals for totals in month_totals
+                        if month_index(totals.month) >= trend_since][:analytics_engine.TREND_WINDOW_MONTHS],
+        top_spending_days=top_spending_days,
+        avg_spending=avg_spending,
+        savings_data=savings_data,
+        avg_savings_rate=analytics_engine.savings_rate(savings_data),
+        total_transactions=columns.size,
+    )
+
+
+class ColumnarStore:
+    """Per-process LRU of UserColumns under a memory budget"""
+
+    def __init__(self, memory_budget, min_rows=DEFAULT_MIN_ROWS):
+        self.memory_budget = memory_budget
+        self.min_rows = min_rows
+        self.users = OrderedDict()      # user_id -> UserColumns
+        self.lock = threading.Lock()
+
+    def columns(self, conn, user_id, version):
+        """The user's columns at `version`, loading them if needed; None for light users"""
+        with self.lock:
+            columns = self.users.get(user_id)
+            if columns is not None and columns.version == version:
+                self.users.move_to_end(user_id)
+                return columns
+        if rollups.transaction_count(conn, user_id) < self.min_rows:
+            return None
+        columns = UserColumns.load(conn, user_id, version)
+        with self.lock:
+            self.users[user_id] = columns
+            self.users.move_to_end(user_id)
+            self._evict()
+        return columns
+
+    def analytics(self, conn, user_id, version, today):
+        """AnalyticsResult from the columns, or None if the user isn't worth loading"""
+        columns = self.columns(conn, user_id, version)
+        if columns is None:
+            return None
+        # Only taking the views needs the lock; other users' requests, and
+        # appends, don't wait for the computation
+        with self.lock:
+            snapshot = columns.snapshot()
+        return compute(snapshot, today)
+
+    def written(self, user_id, version, transactions=None):
+        """Record a write that moved the user to `version`.
+
+        The columns are kept, with `transactions` appended, only if they were
+        current just before it; otherwise they are dropped and reloaded on
+        the next read.
+        """
+        with self.lock:
+            columns = self.users.get(user_id)
+            if columns is None:
+                return
+            try:
+                appended = (transactions and columns.version == version - 1
+                            and columns.append(transactions))
+            except ValueError:      # a date NumPy can't parse
+                appended = False
+            if appended:
+                columns.version = version
+                self._evict()
+            else:
+                del self.users[user_id]
+
+    def _evict(self):
+        total = sum(columns.nbytes for columns in self.users.values())
+        # Always keep the most recently used user, even if it alone is over
+        while total > self.memory_budget and len(self.users) > 1:
+            _, columns = self.users.popitem(last=False)
+            total -= columns.nbytes
+
+    def stats(self):
+        with self.lock:
+            return {'users': len(self.users),
+                    'rows': sum(columns.size for columns in self.users.values()),
+                    'bytes': sum(columns.nbytes for columns in self.users.values())}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(app=None):
+    """This worker process's store for the app, or None when disabled or NumPy is missing"""
+    app = app or current_app
+    if not app.config.get('COLUMNAR_STORE') or np is None:
+        return None
+    key = (os.getpid(), app.config['DATABASE'])
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = ColumnarStore(
+                    app.config.get('COLUMNAR_MEMORY_MB', DEFAULT_MEMORY_MB) * 1024 * 1024,
+                    app.config.get('COLUMNAR_MIN_ROWS', DEFAULT_MIN_ROWS),
+                )
+    return store
@@ -0,0 +1,161 @@
+"""
+Database connection management for the Expense Tracker
+Each request borrows one SQLite connection from a small per-worker pool and
+gives it back when the app context is torn down.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+
+from flask import current_app, g
+
+# Defaults, overridable through app.config
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 10          # seconds to wait for a free connection
+DEFAULT_BUSY_TIMEOUT = 5           # seconds to wait on a locked database
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_SIZE_KB = 16 * 1024
+
+
+def to_cents(amount):
+    """Amount in currency units -> integer cents, as stored in the database.
+
+    Half a cent rounds away from zero, exactly as SQLite's ROUND() does, so
+    the app and the cents migration (see migrate_database.py) agree.
+    """
+    cents = float(amount) * 100
+    return int(cents + 0.5) if cents >= 0 else -int(-cents + 0.5)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool.
+
+    Routes still call conn.close() when they are done; the real close only
+    happens when the pool discards the connection.
+    """
+
+    def close(self):
+        pass
+
+    def dispose(self):
+        """Really close the underlying connection"""
+        super().close()
+
+
+def connect(path, factory=sqlite3.Connection, mmap_size=DEFAULT_MMAP_SIZE,
+            cache_size_kb=DEFAULT_CACHE_SIZE_KB, busy_timeout=DEFAULT_BUSY_TIMEOUT,
+            check_same_thread=True):
+    """Open a tuned SQLite connection (WAL, synchronous=NORMAL, mmap, cache)"""
+    conn = sqlite3.connect(path, timeout=busy_timeout, factory=factory,
+                           check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a writer commits; NORMAL is durable
+    # across application crashes in WAL mode and avoids an fsync per commit.
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+    conn.execute(f'PRAGMA cache_size = -{int(cache_size_kb)}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+class ConnectionPool:
+    """Bounded pool of connections to one database file"""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 factory=PooledConnection, **connect_options):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.factory = factory
+        self.connect_options = connect_options
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Borrow a connection, opening one if the pool isn't full yet"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError(f'No database connection available after {self.timeout}s')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            # Connections move between threads of the same worker, but only
+            # ever serve one request at a time.
+            return connect(self.path, factory=self.factory,
+                           check_same_thread=False, **self.connect_options)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except sqlite3.Error:
+            conn.dispose()
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                self._idle.get_nowait().dispose()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(app=None):
+    """Return this worker process's pool for the app's database"""
+    app = app or current_app
+    # Keyed on the pid so a forked gunicorn worker never reuses its parent's
+    # connections.
+    factory = app.config.get('DB_CONNECTION_FACTORY', PooledConnection)
+    key = (os.getpid(), app.config['DATABASE'], factory)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    app.config['DATABASE'],
+                    factory=factory,
+                    size=app.config.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE),
+                    timeout=app.config.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+                    mmap_size=app.config.get('DB_MMAP_SIZE', DEFAULT_MMAP_SIZE),
+                    cache_size_kb=app.config.get('DB_CACHE_SIZE_KB', DEFAULT_CACHE_SIZE_KB),
+                    busy_timeout=app.config.get('DB_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT),
+                )
+                _pools[key] = pool
+    return pool
+
+
+def get_db():
+    """Return the connection bound to the current app context"""
+    if 'db' not in g:
+        g.db_pool = get_pool()
+        g.db = g.db_pool.acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    """Give the context's connection back to its pool"""
+    conn = g.pop('db', None)
+    pool = g.pop('db_pool', None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    """Register the teardown handler on the Flask app"""
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,319 @@
+"""
+Synthetic data generator for the Expense Tracker
+Creates a database with N users and a multi-year history of realistic
+transactions: a monthly salary, rent and subscriptions (with matching
+recurring rules), occasional freelance income, and day-to-day expenses drawn
+from a per-user category mix with log-normal amounts.
+
+The output depends only on the seed and the end date, so two runs with the
+same arguments produce the same database. Rows are written with bulk
+executemany() calls while the rollup, time series, balance and search
+triggers are dropped. The rollups, balance checkpoints and search index are
+rebuilt once at the end.
+
+    python generate_data.py --rows 100000 --users 50
+    python generate_data.py --rows 10m --users 2000 --years 5 --database /tmp/big.db
+
+Every generated user can log in as bench<N> with the password "benchmark".
+"""
+
+import argparse
+import bisect
+import calendar
+import itertools
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import date
+
+import app as tracker
+import db
+import balances
+import rollups
+import search_index
+import timeseries
+from recurring import add_months
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'bench.db')
+
+BENCH_PASSWORD = 'benchmark'
+ROWS_PER_USER = 2000               # default history size, roughly 50 a month for 3 years
+DEFAULT_BATCH_SIZE = 50000
+
+# Same defaults a newly registered user gets
+CATEGORY_NAMES = [
+    'Food & Dining', 'Transportation', 'Shopping', 'Entertainment',
+    'Bills & Utilities', 'Healthcare', 'Travel', 'Education', 'Salary',
+    'Business', 'Other',
+]
+
+# Day-to-day transactions:
+# (category, type, relative frequency, median amount, spread, descriptions)
+VARIABLE_PROFILES = [
+    ('Food & Dining', 'expense', 14, 28, 0.7,
+     ['Grocery shopping', 'Weekly groceries', 'Lunch', 'Restaurant dinner',
+      'Coffee shop', 'Takeaway', 'Bakery', 'Lunch with friends']),
+    ('Transportation', 'expense', 6, 22, 0.8,
+     ['Bus fare', 'Fuel', 'Uber ride', 'Train ticket', 'Parking', 'Taxi']),
+    ('Shopping', 'expense', 3, 60, 1.0,
+     ['Clothing', 'Home supplies', 'Electronics', 'Books', 'Gift', 'Online order']),
+    ('Entertainment', 'expense', 3, 35, 0.8,
+     ['Movie tickets', 'Concert', 'Video game', 'Bowling', 'Museum']),
+    ('Bills & Utilities', 'expense', 1.5, 110, 0.5,
+     ['Electric bill', 'Water bill', 'Internet bill', 'Phone bill', 'Gas bill']),
+    ('Healthcare', 'expense', 0.6, 80, 0.9,
+     ['Pharmacy', 'Doctor visit', 'Dental checkup', 'Eye exam']),
+    ('Travel', 'expense', 0.3, 350, 1.0,
+     ['Weekend trip', 'Flight tickets', 'Hotel', 'Car rental']),
+    ('Education', 'expense', 0.3, 120, 0.9,
+     ['Online course', 'Textbooks', 'Workshop']),
+    ('Other', 'expense', 1, 40, 1.0,
+     ['Miscellaneous', 'Haircut', 'Donation', 'Cash withdrawal']),
+    ('Business', 'income', 0.4, 600, 0.6,
+     ['Freelance project', 'Consulting work', 'Side project']),
+]
+
+# Fixed monthly transactions, also stored as recurring rules:
+# (title, category, type, low amount, high amount)
+FIXED_PROFILES = [
+    ('Monthly salary', 'Salary', 'income', 2500, 7000),
+    ('Rent', 'Bills & Utilities', 'expense', 700, 1800),
+    ('Streaming subscription', 'Entertainment', 'expense', 8, 20),
+]
+
+# Categories that get a monthly budget, at this multiple of typical spending
+BUDGET_CATEGORIES = ('Food & Dining', 'Transportation', 'Shopping', 'Entertainment')
+BUDGET_HEADROOM = 1.1
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (date, amount_cents, type, category_id, description, user_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def parse_count(value):
+    """Parse a row count such as 10000, 10k or 2.5m"""
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def create_schema(path):
+    """Create the app's tables, indexes, rollups and search index"""
+    tracker.app.config['DATABASE'] = path
+    with tracker.app.app_context():
+        tracker.init_db()
+    # Let the bulk load be the only connection to the file
+    db.get_pool(tracker.app).close_all()
+    return tracker.hash_password(BENCH_PASSWORD)
+
+
+def user_profile(rng):
+    """Per-user spending habits: category weights and fixed amounts"""
+    weights = [frequency * rng.uniform(0.3, 1.7) for _, _, frequency, _, _, _ in VARIABLE_PROFILES]
+    fixed = [round(rng.uniform(low, high), 2) for _, _, _, low, high in FIXED_PROFILES]
+    return weights, fixed
+
+
+def month_starts(end, months):
+    """First day of each of the `months` months up to and including end's month"""
+    first = end.replace(day=1)
+    return [add_months(first, -offset) for offset in range(months - 1, -1, -1)]
+
+
+def user_transactions(rng, user_id, categories, rows, end, months):
+    """Yield one user's transactions, oldest month first, about `rows` in total"""
+    weights, fixed = user_profile(rng)
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    starts = month_starts(end, months)
+    fixed_total = min(rows, len(FIXED_PROFILES) * months)
+    variable_total = rows - fixed_total
+    emitted_fixed = 0
+
+    for index, start in enumerate(starts):
+        last_day = calendar.monthrange(start.year, start.month)[1]
+        if start.year == end.year and start.month == end.month:
+            last_day = end.day
+
+        for (title, category, transaction_type, _, _), amount in zip(FIXED_PROFILES, fixed):
+            if emitted_fixed >= fixed_total:
+                break
+            emitted_fixed += 1
+            yield (start.isoformat(), db.to_cents(amount), transaction_type, categories[category],
+                   title, user_id)
+
+        count = variable_total // months + (1 if index < variable_total % months else 0)
+        for _ in range(count):
+            profile = VARIABLE_PROFILES[
+                min(bisect.bisect_right(cumulative, rng.random() * total), len(VARIABLE_PROFILES) - 1)
+            ]
+            category, transaction_type, _, median, spread, descriptions = profile
+            amount = max(round(median * math.exp(rng.gauss(0, spread)), 2), 0.5)
+            day = start.replace(day=rng.randint(1, last_day))
+            yield (day.isoformat(), db.to_cents(amount), transaction_type, categories[category],
+                   rng.choice(descriptions), user_id)
+
+
+def drop_triggers(conn):
+    """Drop the rollup, balance and search triggers for the duration of a bulk load"""
+    for name in (list(rollups.TRIGGERS) + list(timeseries.TRIGGERS) + list(balances.TRIGGERS)
+                 + list(search_index.TRIGGERS)):
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def create_triggers(conn):
+    """Put the rollup, balance and search triggers back"""
+    for sql in (list(rollups.TRIGGERS.values()) + list(timeseries.TRIGGERS.values())
+                + list(balances.TRIGGERS.values()) + list(search_index.TRIGGERS.values())):
+        conn.execute(sql)
+
+
+def generate(path, rows, users=None, years=3, seed=42, end=None, batch_size=DEFAULT_BATCH_SIZE,
+             progress=None):
+    """Fill a fresh database at path; returns a summary dict"""
+    end = end or date.today()
+    users = users or max(1, rows // ROWS_PER_USER)
+    months = max(1, years * 12)
+    started = time.perf_counter()
+
+    password_hash = create_schema(path)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    drop_triggers(conn)
+
+    inserted = 0
+    committed = 0
+    for number in range(1, users + 1):
+        cursor = conn.execute(
+            'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+            (f'bench{number}', f'bench{number}@example.com', password_hash)
+        )
+        user_id = cursor.lastrowid
+        conn.executemany('INSERT INTO categories (name, user_id) VALUES (?, ?)',
+                         [(name, user_id) for name in CATEGORY_NAMES])
+        categories = {
+            row['name']: row['id']
+            for row in conn.execute('SELECT id, name FROM categories WHERE user_id = ?', (user_id,))
+        }
+
+        user_rows = rows // users + (1 if number <= rows % users else 0)
+        # Each user gets its own stream so adding users doesn't reshuffle the others
+        user_rng = random.Random(f'{seed}:{number}')
+        transactions = user_transactions(user_rng, user_id, categories, user_rows, end, months)
+        while True:
+            batch = list(itertools.islice(transactions, batch_size))
+            if not batch:
+                break
+            conn.executemany(INSERT_TRANSACTION_SQL, batch)
+            inserted += len(batch)
+        add_rules_and_budgets(conn, user_rng, user_id, categories, end, months)
+
+        # Commit roughly every batch_size rows, however they are split over users
+        if inserted - committed >= batch_size or number == users:
+            conn.commit()
+            committed = inserted
+            if progress:
+                progress(inserted)
+
+    loaded = time.perf_counter()
+    rollups.rebuild(conn)
+    timeseries.rebuild(conn)
+    balances.rebuild(conn)
+    if search_index.fts5_available(conn):
+        search_index.rebuild(conn)
+    create_triggers(conn)
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+    return {
+        'rows': inserted,
+        'users': users,
+        'months': months,
+        'seed': seed,
+        'end': end.isoformat(),
+        'load_seconds': round(loaded - started, 3),
+        'index_seconds': round(time.perf_counter() - loaded, 3),
+    }
+
+
+def add_rules_and_budgets(conn, rng, user_id, categories, end, months):
+    """Recurring rules for the fixed transactions and budgets for the last year"""
+    start = month_starts(end, months)[0]
+    next_date = add_months(end.replace(day=1), 1)
+    for title, category, transaction_type, low, high in FIXED_PROFILES:
+        conn.execute('''
+            INSERT INTO recurring_transactions
+            (title, amount, type, category_id, frequency, start_date, next_date,
+             last_executed, description, user_id)
+            VALUES (?, ?, ?, ?, 'monthly', ?, ?, ?, ?, ?)
+        ''', (title, round(rng.uniform(low, high), 2), transaction_type, categories[category],
+              start.isoformat(), next_date.isoformat(), end.replace(day=1).isoformat(),
+              title, user_id))
+
+    limits = {
+        row['category_id']: row['total'] / max(row['months'], 1) * BUDGET_HEADROOM
+        for row in conn.execute('''
+            SELECT category_id, SUM(amount_cents) / 100.0 as total, COUNT(DISTINCT month) as months
+            FROM transactions
+            WHERE user_id = ? AND type = 'expense'
+            GROUP BY category_id
+        ''', (user_id,))
+    }
+    budgets = []
+    for offset in range(min(months, 12)):
+        month = add_months(end.replace(day=1), -offset).strftime('%Y-%m')
+        for category in BUDGET_CATEGORIES:
+            limit = limits.get(categories[category])
+            if limit:
+                budgets.append((month, categories[category], db.to_cents(limit), user_id))
+    conn.executemany(
+        'INSERT INTO budgets (month, category_id, amount_limit_cents, user_id) VALUES (?, ?, ?, ?)',
+        budgets
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic expense tracker database')
+    parser.add_argument('--rows', type=parse_count, default=parse_count('100k'),
+                        help='number of transactions, e.g. 10k, 1m, 10m')
+    parser.add_argument('--users', type=int,
+                        help=f'number of users (default one per {ROWS_PER_USER} rows)')
+    parser.add_argument('--years', type=int, default=3, help='length of each history')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', help='last day of the history (YYYY-MM-DD, default today)')
+    parser.add_argument('--database', default=DATABASE_PATH, help='database file to create')
+    parser.add_argument('--force', action='store_true', help='overwrite an existing database')
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f'{args.database} already exists (use --force to overwrite it)')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    end = date.fromisoformat(args.end) if args.end else None
+    result = generate(args.database, args.rows, args.users, args.years, args.seed, end,
+                      progress=lambda rows: print(f"   … {rows} rows written", end='\r'))
+    print()
+    print(f"✅ Generated {result['rows']} transactions for {result['users']} users "
+          f"in {result['load_seconds'] + result['index_seconds']:.1f}s")
+    print(f"🔑 Log in as bench1 … bench{result['users']} with password '{BENCH_PASSWORD}'")
+
+
+if __name__ == '__main__':
+    main()
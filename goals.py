@@ -0,0 +1,224 @@
+"""
+Financial goal progress for the Expense Tracker
+A goal's progress is the sum of the transactions explicitly linked to it in
+`goal_contributions` (income adds to a goal, an expense linked to it draws it
+down). Each goal row carries its running `saved_cents` and
+`contribution_count`, kept up to date by triggers on the link table and on
+`transactions`, so the goals page is one indexed read of `financial_goals`
+however many goals or contributions there are.
+
+Databases that predate the link table are backfilled once with the old
+heuristic: income whose description mentions the goal's title, dated on or
+after the day the goal was created.
+
+Run this script directly to recompute every goal's totals from its links:
+    python goals.py
+"""
+
+import os
+import sqlite3
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+# A transaction's contribution, in cents: positive for income
+SIGNED_CENTS = "(CASE WHEN {row}.type = 'income' THEN 1 ELSE -1 END * {row}.amount_cents)"
+
+# A transaction counts towards at most one goal, so it is the primary key
+CONTRIBUTIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS goal_contributions (
+        transaction_id INTEGER PRIMARY KEY,
+        goal_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        FOREIGN KEY (transaction_id) REFERENCES transactions (id),
+        FOREIGN KEY (goal_id) REFERENCES financial_goals (id)
+    )
+'''
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_goal_contributions_goal ON goal_contributions (goal_id)',
+    'CREATE INDEX IF NOT EXISTS idx_financial_goals_user_target ON financial_goals (user_id, target_date)',
+)
+
+GOAL_COLUMNS = {
+    'saved_cents': 'INTEGER NOT NULL DEFAULT 0',
+    'contribution_count': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+BACKFILL_SQL = f'''
+    INSERT OR IGNORE INTO goal_contributions (transaction_id, goal_id, amount_cents)
+    SELECT t.id, g.id, {SIGNED_CENTS.format(row='t')}
+    FROM financial_goals g
+    JOIN transactions t ON t.user_id = g.user_id
+    WHERE t.type = 'income'
+    AND t.description LIKE '%' || g.title || '%'
+    AND t.date >= date(g.created_at)
+    ORDER BY g.id
+'''
+
+RECOUNT_SQL = '''
+    UPDATE financial_goals SET
+        saved_cents = COALESCE((SELECT SUM(amount_cents) FROM goal_contributions
+                                WHERE goal_id = financial_goals.id), 0),
+        contribution_count = (SELECT COUNT(*) FROM goal_contributions
+                              WHERE goal_id = financial_goals.id)
+'''
+
+TRIGGERS = {
+    'trg_goal_contributions_insert': '''
+        CREATE TRIGGER IF NOT EXISTS trg_goal_contributions_insert
+        AFTER INSERT ON goal_contributions
+        BEGIN
+            UPDATE financial_goals SET
+                saved_cents = saved_cents + NEW.amount_cents,
+                contribution_count = contribution_count + 1
+            WHERE id = NEW.goal_id;
+        END
+    ''',
+    'trg_goal_contributions_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_goal_contributions_delete
+        AFTER DELETE ON goal_contributions
+        BEGIN
+            UPDATE financial_goals SET
+                saved_cents = saved_cents - OLD.amount_cents,
+                contribution_count = contribution_count - 1
+            WHERE id = OLD.goal_id;
+        END
+    ''',
+    'trg_goal_contributions_update': '''
+        CREATE TRIGGER IF NOT EXISTS trg_goal_contributions_update
+        AFTER UPDATE OF goal_id, amount_cents ON goal_contributions
+        BEGIN
+            UPDATE financial_goals SET
+                saved_cents = saved_cents - OLD.amount_cents,
+                contribution_count = contribution_count - 1
+            WHERE id = OLD.goal_id;
+            UPDATE financial_goals SET
+                saved_cents = saved_cents + NEW.amount_cents,
+                contribution_count = contribution_count + 1
+            WHERE id = NEW.goal_id;
+        END
+    ''',
+    # Transaction changes reach the goal through its link row
+    'trg_goal_transactions_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_goal_transactions_update
+        AFTER UPDATE OF amount_cents, type ON transactions
+        BEGIN
+            UPDATE goal_contributions SET amount_cents = {SIGNED_CENTS.format(row='NEW')}
+            WHERE transaction_id = NEW.id;
+        END
+    ''',
+    'trg_goal_transactions_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_goal_transactions_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM goal_contributions WHERE transaction_id = OLD.id;
+        END
+    ''',
+    'trg_goals_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_goals_delete
+        AFTER DELETE ON financial_goals
+        BEGIN
+            DELETE FROM goal_contributions WHERE goal_id = OLD.id;
+        END
+    ''',
+}
+
+
+def table_exists(conn, name):
+    """Check whether a table exists in the database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def install(conn):
+    """Create the link table, goal totals and triggers, backfilling existing databases.
+
+    Like the rollups, the backfill and the triggers are created in one write
+    transaction so no write can be counted twice or missed.
+    """
+    if table_exists(conn, 'goal_contributions'):
+        for sql in INDEXES + tuple(TRIGGERS.values()):
+            conn.execute(sql)
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(financial_goals)')}
+        for column, definition in GOAL_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE financial_goals ADD COLUMN {column} {definition}')
+        conn.execute(CONTRIBUTIONS_TABLE_SQL)
+        for sql in INDEXES:
+            conn.execute(sql)
+        conn.execute(BACKFILL_SQL)
+        conn.execute(RECOUNT_SQL)
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def rebuild(conn):
+    """Recompute every goal's totals from goal_contributions"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(RECOUNT_SQL)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def link(conn, user_id, transaction_id, goal_id):
+    """Make the transaction a contribution to goal_id, or to no goal if None.
+
+    Both rows must belong to user_id; runs inside the caller's transaction.
+    """
+    if goal_id is None:
+        conn.execute('''
+            DELETE FROM goal_contributions
+            WHERE transaction_id = (SELECT id FROM transactions WHERE id = ? AND user_id = ?)
+        ''', (transaction_id, user_id))
+        return
+    conn.execute(f'''
+        INSERT INTO goal_contributions (transaction_id, goal_id, amount_cents)
+        SELECT t.id, g.id, {SIGNED_CENTS.format(row='t')}
+        FROM transactions t
+        JOIN financial_goals g ON g.id = ? AND g.user_id = t.user_id
+        WHERE t.id = ? AND t.user_id = ?
+        ON CONFLICT (transaction_id) DO UPDATE SET goal_id = excluded.goal_id
+    ''', (goal_id, transaction_id, user_id))
+
+
+def user_goals(conn, user_id):
+    """The user's goals with their saved amount, soonest target first"""
+    return conn.execute('''
+        SELECT id, title, description, target_amount, target_date, created_at,
+               saved_cents / 100.0 as current_amount, contribution_count
+        FROM financial_goals
+        WHERE user_id = ?
+        ORDER BY target_date ASC
+    ''', (user_id,)).fetchall()
+
+
+def goal_choices(conn, user_id):
+    """(id, title) of the user's goals, for transaction forms"""
+    return conn.execute(
+        'SELECT id, title FROM financial_goals WHERE user_id = ? ORDER BY target_date ASC',
+        (user_id,)
+    ).fetchall()
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    install(conn)
+    rebuild(conn)
+    goals = conn.execute('SELECT COUNT(*) FROM financial_goals').fetchone()[0]
+    links = conn.execute('SELECT COUNT(*) FROM goal_contributions').fetchone()[0]
+    conn.close()
+    print(f"✅ Recomputed {goals} goal(s) from {links} contribution(s)")
@@ -0,0 +1,238 @@
+"""
+Bulk CSV import for the Expense Tracker
+Reads files in the format written by /export (Date, Amount, Type, Category,
+Description) and inserts them in large batches inside a single transaction.
+
+The file is parsed row by row, so memory use doesn't depend on its size.
+Category names are resolved through an in-memory map, and categories that
+don't exist yet are created on demand. Files larger than one batch update
+the balance checkpoints once at the end instead of row by row.
+
+Import a file for a user from the command line:
+    python importer.py bank_history.csv --user 3
+"""
+
+import argparse
+import csv
+import io
+import math
+import os
+import sqlite3
+from datetime import datetime
+
+import balances
+import db
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+MAX_AMOUNT = 1_000_000_000         # per row; keeps cents and their sums well inside 64 bits
+
+# Header names accepted for each field (lower-cased)
+COLUMNS = {
+    'date': ('date',),
+    'amount': ('amount',),
+    'type': ('type',),
+    'category': ('category', 'category_name'),
+    'description': ('description', 'desc', 'memo'),
+}
+REQUIRED_COLUMNS = ('date', 'amount', 'type')
+
+# What /export writes for uncategorized transactions
+NO_CATEGORY_NAMES = {'', 'no category'}
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (date, amount_cents, type, category_id, description, user_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+class CSVImportError(Exception):
+    """Raised when a file can't be imported at all (e.g. missing columns)"""
+
+
+def map_header(header):
+    """Map field names to column positions, raising if a required one is missing"""
+    normalized = [name.strip().lower() for name in header]
+    positions = {}
+    for field, names in COLUMNS.items():
+        for name in names:
+            if name in normalized:
+                positions[field] = normalized.index(name)
+                break
+    missing = [field for field in REQUIRED_COLUMNS if field not in positions]
+    if missing:
+        raise CSVImportError(f"Missing column(s): {', '.join(missing)}")
+    return positions
+
+
+def parse_row(row, positions):
+    """Validate one CSV row, returning (date, amount, type, category, description)"""
+    def field(name):
+        position = positions.get(name)
+        return row[position].strip() if position is not None and position < len(row) else ''
+
+    date_value = field('date')
+    try:
+        date_value = datetime.strptime(date_value[:10], '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError(f'invalid date "{date_value}"')
+
+    amount_value = field('amount')
+    try:
+        amount = round(float(amount_value.replace(',', '')), 2)
+    except ValueError:
+        raise ValueError(f'invalid amount "{amount_value}"')
+    # float() also accepts "nan", "inf" and "1e400"
+    if not math.isfinite(amount):
+        raise ValueError(f'invalid amount "{amount_value}"')
+    if amount <= 0:
+        raise ValueError(f'amount must be positive, got {amount_value}')
+    if amount > MAX_AMOUNT:
+        raise ValueError(f'amount must be at most {MAX_AMOUNT:,}, got {amount_value}')
+
+    transaction_type = field('type').lower()
+    if transaction_type not in ('income', 'expense'):
+        raise ValueError(f'type must be income or expense, got "{transaction_type}"')
+
+    return date_value, amount, transaction_type, field('category'), field('description')
+
+
+class CategoryMap:
+    """Category name -> id for one user, creating missing categories on demand"""
+
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+        self.created = []
+        self.ids = {}
+        for category in conn.execute(
+            'SELECT id, name FROM categories WHERE user_id = ?', (user_id,)
+        ):
+            self.ids[category['name'].casefold()] = category['id']
+
+    def resolve(self, name):
+        if name.casefold() in NO_CATEGORY_NAMES:
+            return None
+        key = name.casefold()
+        category_id = self.ids.get(key)
+        if category_id is None:
+            cursor = self.conn.execute(
+                'INSERT INTO categories (name, user_id) VALUES (?, ?)', (name, self.user_id)
+            )
+            category_id = self.ids[key] = cursor.lastrowid
+            self.created.append(name)
+        return category_id
+
+
+def import_csv(conn, user_id, stream, batch_size=DEFAULT_BATCH_SIZE, progress=None,
+               before_commit=None):
+    """Import a CSV text stream for a user.
+
+    Everything is inserted in one transaction: either the whole file (minus
+    the rows reported as errors) is imported, or nothing is. progress, if
+    given, is called with the number of rows read after every batch.
+    before_commit, if given, is called with the result inside the
+    transaction, so whatever it writes commits together with the rows.
+
+    Returns a dict with rows, imported, created_categories, error_count and
+    the first MAX_REPORTED_ERRORS errors as (line number, message) pairs.
+    """
+    reader = csv.reader(stream)
+    try:
+        positions = map_header(next(reader))
+    except StopIteration:
+        raise CSVImportError('The file is empty')
+
+    result = {'rows': 0, 'imported': 0, 'created_categories': [], 'error_count': 0, 'errors': []}
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        categories = CategoryMap(conn, user_id)
+        batch = []
+        earliest = None
+        balances_suspended = False
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            result['rows'] += 1
+            try:
+                date_value, amount, transaction_type, category, description = parse_row(row, positions)
+            except ValueError as e:
+                result['error_count'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append((reader.line_num, str(e)))
+                continue
+
+            batch.append((date_value, db.to_cents(amount), transaction_type,
+                          categories.resolve(category), description, user_id))
+            earliest = min(earliest or date_value, date_value)
+            if len(batch) >= batch_size:
+                if not balances_suspended:
+                    # Files are often newest first; past one batch, repairing
+                    # the balance checkpoints once is cheaper than updating
+                    # every later checkpoint for each back-dated row
+                    balances.suspend(conn)
+                    balances_suspended = True
+                conn.executemany(INSERT_TRANSACTION_SQL, batch)
+                result['imported'] += len(batch)
+                batch = []
+                if progress:
+                    progress(result['rows'])
+
+        if batch:
+            conn.executemany(INSERT_TRANSACTION_SQL, batch)
+            result['imported'] += len(batch)
+        if balances_suspended:
+            balances.resume(conn, user_id, earliest)
+        if progress:
+            progress(result['rows'])
+        result['created_categories'] = categories.created
+        if before_commit:
+            before_commit(result)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    return result
+
+
+def open_text(binary_stream):
+    """Wrap an uploaded binary file for incremental CSV parsing"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import transactions from a CSV file')
+    parser.add_argument('file', help='CSV file in the /export format')
+    parser.add_argument('--user', type=int, required=True, help='user id to import for')
+    parser.add_argument('--database', default=DATABASE_PATH, help='path to tracker.db')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database, timeout=30)
+    conn.row_factory = sqlite3.Row
+    started = datetime.now()
+    try:
+        with open(args.file, 'rb') as f:
+            result = import_csv(conn, args.user, open_text(f), args.batch_size,
+                                progress=lambda rows: print(f"   … {rows} rows read", end='\r'))
+    finally:
+        conn.close()
+
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"✅ Imported {result['imported']} of {result['rows']} rows in {elapsed:.1f}s")
+    if result['created_categories']:
+        print(f"🏷️ Created categories: {', '.join(result['created_categories'])}")
+    for line, message in result['errors']:
+        print(f"   ❌ line {line}: {message}")
+    if result['error_count'] > len(result['errors']):
+        print(f"   … and {result['error_count'] - len(result['errors'])} more errors")
+
+
+if __name__ == '__main__':
+    main()
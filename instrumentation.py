@@ -0,0 +1,305 @@
+"""
+SQL and request instrumentation for the Expense Tracker
+When INSTRUMENTATION is on, pooled connections are opened as
+InstrumentedConnection. That records every statement's time (execute plus
+fetching) and row count, along with the route that ran it. Each request gets
+its total DB time and query count in a Server-Timing header and in the
+metrics, so N+1 loops show up as a high queries-per-request count.
+
+Statements slower than SLOW_QUERY_MS are logged with their EXPLAIN QUERY
+PLAN to the "tracker.slow_queries" logger (and to SLOW_QUERY_LOG if set).
+/metrics serves the counters and histograms in Prometheus text format.
+
+With INSTRUMENTATION off, connections are plain PooledConnections and no
+hooks are registered, so there is no overhead.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from flask import Response, abort, current_app, g, has_request_context, request
+
+import db
+
+# Defaults, overridable through app.config
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_METRICS_ALLOWED_ADDRS = ('127.0.0.1', '::1')
+
+# Histogram upper bounds
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Longest statement text used as a metric label
+STATEMENT_LABEL_LENGTH = 160
+
+slow_query_logger = logging.getLogger('tracker.slow_queries')
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class QueryRecord:
+    """One statement run during a request"""
+
+    __slots__ = ('sql', 'parameters', 'seconds', 'rows', 'many')
+
+    def __init__(self, sql, parameters, many=False):
+        self.sql = sql
+        self.parameters = parameters
+        self.seconds = 0.0
+        self.rows = 0
+        self.many = many
+
+
+def _start_record(sql, parameters, many=False):
+    record = QueryRecord(sql, parameters, many)
+    if has_request_context():
+        g.setdefault('query_records', []).append(record)
+    return record
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that adds execute and fetch time and rows to its QueryRecord"""
+
+    record = None
+
+    def execute(self, sql, parameters=()):
+        self.record = _start_record(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.record.seconds += time.perf_counter() - started
+            if self.rowcount > 0:
+                self.record.rows += self.rowcount
+
+    def executemany(self, sql, seq_of_parameters):
+        self.record = _start_record(sql, None, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.record.seconds += time.perf_counter() - started
+            if self.rowcount > 0:
+                self.record.rows += self.rowcount
+
+    def _fetched(self, started, rows):
+        if self.record is not None:
+            self.record.seconds += time.perf_counter() - started
+            self.record.rows += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0)
+            raise
+        self._fetched(started, 1)
+        return row
+
+
+class InstrumentedConnection(db.PooledConnection):
+    """Pooled connection whose statements all go through InstrumentedCursor"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class Metrics:
+    """Process-wide Prometheus counters and histograms, keyed by label values"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> value
+        self.histograms = {}    # (name, labels) -> [buckets, bucket counts, sum, count]
+        self.help = {}
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][index] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (value[0], list(value[1]), value[2], value[3]))
+                                for key, value in self.histograms.items())
+        described = set()
+
+        def header(name):
+            if name not in described and name in self.help:
+                kind, text = self.help[name]
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{_labels(labels)} {value}')
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f'{name}_bucket{_labels(labels + (("le", repr(float(bound))),))} {bucket_count}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    """Format label pairs as {key="value",...}, escaping backslashes and quotes"""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+metrics = Metrics()
+metrics.describe('tracker_http_requests_total', 'counter', 'HTTP requests by route and status')
+metrics.describe('tracker_http_request_duration_seconds', 'histogram', 'Request wall time by route')
+metrics.describe('tracker_db_request_seconds', 'histogram', 'DB time per request by route')
+metrics.describe('tracker_db_queries_per_request', 'histogram', 'Statements per request by route')
+metrics.describe('tracker_db_query_duration_seconds', 'histogram', 'Statement time by route')
+metrics.describe('tracker_db_statement_seconds_total', 'counter', 'Time spent in each statement')
+metrics.describe('tracker_db_statement_calls_total', 'counter', 'Calls of each statement')
+metrics.describe('tracker_db_statement_rows_total', 'counter', 'Rows returned or changed by each statement')
+metrics.describe('tracker_slow_queries_total', 'counter', 'Statements over the slow query threshold')
+
+
+def statement_label(sql):
+    """Whitespace-collapsed, length-capped statement text for a label"""
+    return WHITESPACE.sub(' ', sql).strip()[:STATEMENT_LABEL_LENGTH]
+
+
+def query_plan(conn, record):
+    """EXPLAIN QUERY PLAN lines for a recorded statement, if it can be explained"""
+    if record.many or not record.sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        return []
+    try:
+        # Straight to sqlite3 so the EXPLAIN itself isn't recorded
+        rows = db.PooledConnection.execute(conn, 'EXPLAIN QUERY PLAN ' + record.sql,
+                                           record.parameters or ()).fetchall()
+    except Exception:
+        return []
+    return [row[3] for row in rows]
+
+
+def before_request():
+    g.request_started = time.perf_counter()
+
+
+def after_request(response):
+    g.response_status = response.status_code
+    records = g.get('query_records', ())
+    db_ms = sum(record.seconds for record in records) * 1000
+    response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{len(records)} queries"')
+    return response
+
+
+def teardown_request(exc=None):
+    """Fold this request's statements into the metrics and the slow query log"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    route = request.endpoint or 'unmatched'
+    status = 500 if exc is not None else g.pop('response_status', 500)
+    records = g.pop('query_records', [])
+    route_labels = (('route', route),)
+
+    metrics.inc('tracker_http_requests_total',
+                (('route', route), ('method', request.method), ('status', str(status))))
+    metrics.observe('tracker_http_request_duration_seconds', route_labels,
+                    time.perf_counter() - started, SECONDS_BUCKETS)
+    metrics.observe('tracker_db_request_seconds', route_labels,
+                    sum(record.seconds for record in records), SECONDS_BUCKETS)
+    metrics.observe('tracker_db_queries_per_request', route_labels, len(records),
+                    QUERY_COUNT_BUCKETS)
+
+    slow_seconds = current_app.config.get('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS) / 1000
+    for record in records:
+        statement = (('route', route), ('statement', statement_label(record.sql)))
+        metrics.observe('tracker_db_query_duration_seconds', route_labels, record.seconds,
+                        SECONDS_BUCKETS)
+        metrics.inc('tracker_db_statement_seconds_total', statement, record.seconds)
+        metrics.inc('tracker_db_statement_calls_total', statement)
+        metrics.inc('tracker_db_statement_rows_total', statement, record.rows)
+        if record.seconds >= slow_seconds:
+            metrics.inc('tracker_slow_queries_total', route_labels)
+            plan = query_plan(g.db, record) if 'db' in g else []
+            slow_query_logger.warning(
+                'slow query on %s: %.1f ms, %d rows\n    %s%s',
+                route, record.seconds * 1000, record.rows, WHITESPACE.sub(' ', record.sql).strip(),
+                ''.join(f'\n    plan: {line}' for line in plan)
+            )
+
+
+def init_app(app):
+    """Turn instrumentation on for the app if INSTRUMENTATION is set"""
+    if not app.config.get('INSTRUMENTATION'):
+        return
+    app.config['DB_CONNECTION_FACTORY'] = InstrumentedConnection
+
+    if app.config.get('SLOW_QUERY_LOG'):
+        handler = logging.FileHandler(app.config['SLOW_QUERY_LOG'])
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Counters and histograms in Prometheus text format (local scrapers only)"""
+        allowed = app.config.get('METRICS_ALLOWED_ADDRS', DEFAULT_METRICS_ALLOWED_ADDRS)
+        if allowed and request.remote_addr not in allowed:
+            abort(403)
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,391 @@
+"""
+Background jobs for the Expense Tracker
+Long operations (full-history exports, large imports) are queued in the
+`jobs` table and run by a separate pool of worker processes, so they never
+hold up a gunicorn worker that should be serving pages.
+
+A job is claimed with one UPDATE ... RETURNING, so two workers can never run
+the same job, and no user has more than JOB_MAX_PER_USER jobs running at
+once. A failing job is retried JOB_MAX_ATTEMPTS times with a doubling
+delay; handlers raise JobFailed for errors a retry can't fix, and record
+their result in the transaction that commits their work (Job.record), so a
+retry after that commit doesn't repeat it. A job whose worker process died
+is picked up again. Result files live in JOBS_DIR/<id>/
+and are deleted, with the job, JOB_RESULT_TTL seconds after it finished.
+
+Handlers are registered by app.py with @jobs.handler(kind) and run inside
+the app context. Start the workers next to the web server:
+    python jobs.py                  # JOB_WORKERS processes
+    python jobs.py --workers 4
+    python jobs.py --once           # run what is queued, then exit
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+JOBS_DIR = os.path.join(BASE_DIR, 'database', 'jobs')
+
+# Defaults, overridable through app.config
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 30           # seconds before the first retry; doubles after
+DEFAULT_MAX_PER_USER = 1           # running jobs per user
+DEFAULT_RESULT_TTL = 24 * 3600     # seconds a finished job and its files are kept
+DEFAULT_POLL_INTERVAL = 1.0        # seconds an idle worker waits between claims
+
+PROGRESS_INTERVAL = 0.5            # seconds between progress writes
+
+JOBS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        params TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued'
+            CHECK (status IN ('queued', 'running', 'done', 'failed')),
+        progress INTEGER NOT NULL DEFAULT 0,
+        total INTEGER,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        error TEXT,
+        result TEXT,
+        result_file TEXT,
+        worker_pid INTEGER,
+        created_at REAL NOT NULL,
+        run_after REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        expires_at REAL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs (status, run_after)',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_user_status ON jobs (user_id, status)',
+)
+
+# The oldest due job whose user is under the running limit
+CLAIM_SQL = '''
+    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                    worker_pid = ?, started_at = ?
+    WHERE id = (
+        SELECT j.id FROM jobs j
+        WHERE j.status = 'queued' AND j.run_after <= ?
+        AND (SELECT COUNT(*) FROM jobs r
+             WHERE r.user_id = j.user_id AND r.status = 'running') < ?
+        ORDER BY j.run_after, j.id
+        LIMIT 1
+    )
+    RETURNING *
+'''
+
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    """Raised by a handler for errors that retrying won't fix"""
+
+
+def handler(kind):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def install(conn):
+    conn.execute(JOBS_TABLE_SQL)
+    for sql in INDEXES:
+        conn.execute(sql)
+
+
+def job_dir(jobs_dir, job_id):
+    return os.path.join(jobs_dir, str(int(job_id)))
+
+
+def job_file(jobs_dir, job_id, name):
+    """Path of a file in the job's directory, which is created if needed"""
+    directory = job_dir(jobs_dir, job_id)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def staging_file(jobs_dir):
+    """A new empty file in jobs_dir, for an upload saved before its job exists"""
+    os.makedirs(jobs_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='upload-', suffix='.tmp', dir=jobs_dir)
+    os.close(fd)
+    return path
+
+
+def enqueue(conn, user_id, kind, params=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job and return its id; runs inside the caller's transaction"""
+    now = time.time()
+    return conn.execute('''
+        INSERT INTO jobs (user_id, kind, params, max_attempts, created_at, run_after)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (user_id, kind, json.dumps(params or {}), max_attempts, now, now)).lastrowid
+
+
+def get_job(conn, user_id, job_id):
+    return conn.execute('SELECT * FROM jobs WHERE id = ? AND user_id = ?',
+                        (job_id, user_id)).fetchone()
+
+
+def user_jobs(conn, user_id, limit=20):
+    """The user's most recent jobs, newest first"""
+    return conn.execute('SELECT * FROM jobs WHERE user_id = ? ORDER BY id DESC LIMIT ?',
+                        (user_id, limit)).fetchall()
+
+
+def describe(job):
+    """A job row as plain data for templates and JSON"""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total'],
+        'attempts': job['attempts'],
+        'error': job['error'],
+        'result': json.loads(job['result']) if job['result'] else None,
+        'has_file': bool(job['result_file']),
+        'created_at': job['created_at'],
+        'finished_at': job['finished_at'],
+    }
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """What a handler gets: the job's parameters, its directory and a progress reporter"""
+
+    def __init__(self, row, conn, jobs_dir):
+        self.id = row['id']
+        self.user_id = row['user_id']
+        self.kind = row['kind']
+        self.params = json.loads(row['params'])
+        self.attempt = row['attempts']
+        self.jobs_dir = jobs_dir
+        self.result_file = None
+        self._conn = conn
+        self._reported = 0
+
+    def path(self, name):
+        """Path of a file in the job's directory"""
+        return job_file(self.jobs_dir, self.id, name)
+
+    def record(self, conn, result):
+        """Store the job's result within the handler's own write transaction on conn.
+
+        A handler whose work commits in one transaction records its result
+        in it; if the job is retried afterwards, recorded() returns the
+        result and the handler skips the work instead of doing it twice.
+        """
+        conn.execute('UPDATE jobs SET result = ? WHERE id = ?', (json.dumps(result), self.id))
+
+    def recorded(self, conn):
+        """The result stored by record(), or None if the work never committed"""
+        row = conn.execute('SELECT result FROM jobs WHERE id = ?', (self.id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def progress(self, done, total=None, force=False):
+        """Record progress; throttled, and skipped while the database is busy"""
+        now = time.monotonic()
+        if not force and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        try:
+            self._conn.execute('UPDATE jobs SET progress = ?, total = COALESCE(?, total) WHERE id = ?',
+                               (done, total, self.id))
+        except sqlite3.OperationalError:
+            pass  # e.g. the handler itself holds the write lock
+
+
+class Worker:
+    """Claims and runs jobs against one database, in the current process"""
+
+    def __init__(self, app, handlers=None, max_per_user=None, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.app = app
+        self.handlers = HANDLERS if handlers is None else handlers
+        self.jobs_dir = app.config.get('JOBS_DIR', JOBS_DIR)
+        self.max_per_user = max_per_user or app.config.get('JOB_MAX_PER_USER', DEFAULT_MAX_PER_USER)
+        self.retry_delay = app.config.get('JOB_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+        self.result_ttl = app.config.get('JOB_RESULT_TTL', DEFAULT_RESULT_TTL)
+        self.poll_interval = poll_interval
+        self.conn = sqlite3.connect(app.config['DATABASE'], timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # Progress writes must never wait behind the handler's own transaction
+        self.progress_conn = sqlite3.connect(app.config['DATABASE'], timeout=0, isolation_level=None)
+
+    def claim(self):
+        """Requeue jobs whose worker died, then take the next due job (or None)"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            for job in self.conn.execute(
+                "SELECT id, worker_pid, attempts, max_attempts FROM jobs WHERE status = 'running'"
+            ).fetchall():
+                if not process_alive(job['worker_pid']):
+                    self._finish_failed(job, 'The worker running this job stopped', now)
+            row = self.conn.execute(CLAIM_SQL, (os.getpid(), now, now, self.max_per_user)).fetchone()
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _finish_failed(self, job, error, now, permanent=False):
+        """Queue a retry if attempts are left, otherwise mark the job failed"""
+        if not permanent and job['attempts'] < job['max_attempts']:
+            delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+            self.conn.execute('''
+                UPDATE jobs SET status = 'queued', error = ?, worker_pid = NULL, run_after = ?
+                WHERE id = ?
+            ''', (error, now + delay, job['id']))
+        else:
+            self.conn.execute('''
+                UPDATE jobs SET status = 'failed', error = ?, worker_pid = NULL,
+                                finished_at = ?, expires_at = ?
+                WHERE id = ?
+            ''', (error, now, now + self.result_ttl, job['id']))
+
+    def run(self, row):
+        """Run a claimed job and record how it ended"""
+        job = Job(row, self.progress_conn, self.jobs_dir)
+        function = self.handlers.get(job.kind)
+        try:
+            if function is None:
+                raise JobFailed(f'Unknown job kind: {job.kind}')
+            with self.app.app_context():
+                result = function(job)
+        except Exception as e:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._finish_failed(row, str(e) or type(e).__name__, time.time(),
+                                    permanent=isinstance(e, JobFailed))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return False
+
+        now = time.time()
+        self.conn.execute('''
+            UPDATE jobs SET status = 'done', result = ?, result_file = ?, error = NULL,
+                            progress = COALESCE(total, progress), worker_pid = NULL,
+                            finished_at = ?, expires_at = ?
+            WHERE id = ?
+        ''', (json.dumps(result) if result is not None else None, job.result_file,
+              now, now + self.result_ttl, job.id))
+        return True
+
+    def expire(self):
+        """Delete finished jobs past their expiry, with their files"""
+        expired = [row[0] for row in self.conn.execute(
+            "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND expires_at < ?",
+            (time.time(),)
+        )]
+        for job_id in expired:
+            shutil.rmtree(job_dir(self.jobs_dir, job_id), ignore_errors=True)
+            self.conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return len(expired)
+
+    def run_pending(self):
+        """Run jobs until none is due; returns how many ran"""
+        count = 0
+        while True:
+            row = self.claim()
+            if row is None:
+                return count
+            self.run(row)
+            count += 1
+
+    def loop(self):
+        while True:
+            if not self.run_pending():
+                self.expire()
+                time.sleep(self.poll_interval)
+
+    def close(self):
+        self.conn.close()
+        self.progress_conn.close()
+
+
+def load_app(database):
+    """The Flask app pointed at database, and the job handlers it registered"""
+    import app as tracker
+    # Run as a script, this module is __main__; app.py registers its
+    # handlers with the importable `jobs` module, so use that registry
+    import jobs as registry
+    tracker.app.config['DATABASE'] = database
+    with tracker.app.app_context():
+        tracker.init_db()
+    return tracker.app, registry.HANDLERS
+
+
+def work(database, once=False):
+    """Entry point of one worker process"""
+    app, handlers = load_app(database)
+    worker = Worker(app, handlers)
+    try:
+        if once:
+            worker.run_pending()
+            worker.expire()
+        else:
+            worker.loop()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background jobs for the expense tracker')
+    parser.add_argument('--database', default=os.environ.get('EXPENSE_TRACKER_DATABASE', DATABASE_PATH),
+                        help='path to tracker.db')
+    parser.add_argument('--workers', type=int, help='worker processes (default JOB_WORKERS)')
+    parser.add_argument('--once', action='store_true', help='run the queued jobs, then exit')
+    args = parser.parse_args()
+
+    if args.once:
+        work(args.database, once=True)
+        print("✅ Queue drained")
+        return
+
+    count = args.workers or load_app(args.database)[0].config.get('JOB_WORKERS', DEFAULT_WORKERS)
+    processes = [multiprocessing.Process(target=work, args=(args.database,), daemon=True)
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    print(f"🔄 {count} job worker(s) running on {args.database} (Ctrl+C to stop)")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        print("🛑 Stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Live dashboard updates for the Expense Tracker
+Keeps each user's dashboard in a `dashboard_state` row that is recomputed
+once per write, and streams what changed to the user's open dashboards as
+Server-Sent Events.
+
+refresh() evaluates the dashboard once: totals and the monthly chart from
+the rollups, the recent transactions, budget alerts and due recurring
+items. With live updates on it runs after every write (see
+invalidate_cache() in app.py), diffs the result against the stored state
+and appends an event for each part that changed:
+    totals       income, expense, balance and the monthly chart data
+    transaction  a transaction that is new in the recent list
+    recent       the whole recent list, when rows were edited or removed
+    alerts       the budget alerts, with the ones newly past 80% or 100%
+    recurring    the due recurring items, with the ones that just fell due
+The dashboard page is rendered from the stored state, so budgets are no
+longer evaluated per page view. Each state records the user's write version
+(see cache.py) it was built at; a state from an older version, an earlier
+day, or older than max_age is refreshed on read. With live updates off,
+writes only bump the version and the state is rebuilt by the next view.
+
+The events table is the broker: every gunicorn worker appends to it and
+every open stream polls it by (user_id, id), so a write in one worker
+reaches dashboards served by any other. Streams in the worker that
+published are woken at once. Events carry whole values rather than
+increments, so a page that sees one twice, or replays them after
+reconnecting with Last-Event-ID, stays correct.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import budget_engine
+import cache
+import db
+import rollups
+
+# Defaults, overridable through app.config
+DEFAULT_POLL_INTERVAL = 1.0        # seconds between checks of the events table
+DEFAULT_STREAM_SECONDS = 300       # a stream then ends; EventSource reconnects
+DEFAULT_EVENT_TTL = 3600           # seconds events are kept for reconnecting pages
+DEFAULT_MAX_AGE = 300              # seconds a state is trusted without a write
+
+KEEPALIVE_INTERVAL = 15            # seconds between comments on an idle stream
+RETRY_MS = 3000                    # browser reconnect delay
+RECENT_LIMIT = 10
+RECURRING_LIMIT = 5
+
+EVENTS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+'''
+
+STATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS dashboard_state (
+        user_id INTEGER PRIMARY KEY,
+        day TEXT NOT NULL,
+        data TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+'''
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_events_user_id ON events (user_id, id)',
+)
+
+ALERT_RANK = {None: 0, 'warning': 1, 'danger': 2}
+
+
+def install(conn):
+    conn.execute(EVENTS_TABLE_SQL)
+    conn.execute(STATE_TABLE_SQL)
+    for sql in INDEXES:
+        conn.execute(sql)
+
+
+def snapshot(conn, user_id, today, category_names):
+    """Everything the dashboard shows, evaluated now, as JSON-ready data"""
+    total_income, total_expense = rollups.type_totals(conn, user_id)
+
+    recent = []
+    for row in conn.execute('''
+        SELECT id, date, description, category_id, type, amount
+        FROM transactions
+        WHERE user_id = ?
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+    ''', (user_id, RECENT_LIMIT)):
+        transaction = dict(row)
+        transaction['category_name'] = category_names.get(transaction.pop('category_id'))
+        recent.append(transaction)
+
+    month = today[:7]
+    alerts = budget_engine.budget_alerts(budget_engine.budget_status(conn, user_id, month, month))
+
+    due = [dict(row) for row in conn.execute('''
+        SELECT id, title, amount, next_date FROM recurring_transactions
+        WHERE user_id = ? AND active = 1 AND next_date <= ?
+        ORDER BY next_date ASC
+    ''', (user_id, today))]
+
+    return {
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': total_income - total_expense,
+        'monthly_data': [dict(row) for row in rollups.monthly_totals(conn, user_id, limit=6)],
+        'recent_transactions': recent,
+        'month': month,
+        'budget_alerts': alerts,
+        'pending_recurring': due[:RECURRING_LIMIT],
+        'pending_recurring_count': len(due),
+        'due_ids': [item['id'] for item in due],
+        'last_event_id': 0,
+    }
+
+
+def changes(old, new):
+    """(kind, data) events that take a page showing `old` to `new`"""
+    events = []
+    if old is None:
+        return events
+
+    totals = ('total_income', 'total_expense', 'balance', 'monthly_data')
+    if any(old[key] != new[key] for key in totals):
+        events.append(('totals', {key: new[key] for key in totals}))
+
+    # Usually rows were only added at the top; the old ones that are still
+    # listed then come first and unchanged
+    old_recent, new_recent = old['recent_transactions'], new['recent_transactions']
+    if old_recent != new_recent:
+        old_ids = {row['id'] for row in old_recent}
+        kept = [row for row in new_recent if row['id'] in old_ids]
+        if kept == old_recent[:len(kept)]:
+            for row in reversed(new_recent):
+                if row['id'] not in old_ids:
+                    events.append(('transaction', {'transaction': row, 'limit': RECENT_LIMIT}))
+        else:
+            events.append(('recent', {'transactions': new_recent}))
+
+    if old['budget_alerts'] != new['budget_alerts']:
+        before = {}
+        if old['month'] == new['month']:
+            before = {alert['budget_id']: alert['type'] for alert in old['budget_alerts']}
+        crossed = [alert['budget_id'] for alert in new['budget_alerts']
+                   if ALERT_RANK[alert['type']] > ALERT_RANK[before.get(alert['budget_id'])]]
+        events.append(('alerts', {'alerts': new['budget_alerts'], 'crossed': crossed}))
+
+    if old['due_ids'] != new['due_ids'] or old['pending_recurring'] != new['pending_recurring']:
+        was_due = set(old['due_ids'])
+        newly_due = [item_id for item_id in new['due_ids'] if item_id not in was_due]
+        events.append(('recurring', {
+            'items': new['pending_recurring'],
+            'count': new['pending_recurring_count'],
+            'new': newly_due,
+        }))
+    return events
+
+
+def refresh(conn, user_id, category_names, today=None, publish=True, event_ttl=DEFAULT_EVENT_TTL):
+    """Re-evaluate the user's dashboard, publish what changed and store it.
+
+    Runs in its own write transaction, so two workers refreshing the same
+    user publish each change once. Returns the new state.
+    """
+    today = today or date.today().isoformat()
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT data FROM dashboard_state WHERE user_id = ?', (user_id,)).fetchone()
+        old = json.loads(row[0]) if row else None
+        state = snapshot(conn, user_id, today, category_names)
+        state['last_event_id'] = old['last_event_id'] if old else 0
+        state['version'] = cache.version(conn, user_id)
+
+        if publish:
+            for kind, data in changes(old, state):
+                state['last_event_id'] = conn.execute(
+                    'INSERT INTO events (user_id, kind, data, created_at) VALUES (?, ?, ?, ?)',
+                    (user_id, kind, json.dumps(data), now)
+                ).lastrowid
+            conn.execute('DELETE FROM events WHERE user_id = ? AND created_at < ?',
+                         (user_id, now - event_ttl))
+
+        conn.execute('''
+            INSERT INTO dashboard_state (user_id, day, data, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                day = excluded.day, data = excluded.data, updated_at = excluded.updated_at
+        ''', (user_id, today, json.dumps(state), now))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    if publish and state['last_event_id'] != (old['last_event_id'] if old else 0):
+        get_notifier().notify()
+    return state
+
+
+def current(conn, user_id, category_names, today=None, max_age=DEFAULT_MAX_AGE, publish=True):
+    """The user's stored dashboard state, refreshed first if it is out of date"""
+    today = today or date.today().isoformat()
+    row = conn.execute('SELECT day, data, updated_at FROM dashboard_state WHERE user_id = ?',
+                       (user_id,)).fetchone()
+    if row and row['day'] == today and time.time() - row['updated_at'] < max_age:
+        state = json.loads(row['data'])
+        if state.get('version') == cache.version(conn, user_id):
+            return state
+    return refresh(conn, user_id, category_names, today, publish)
+
+
+class Notifier:
+    """Wakes this process's streams as soon as one of its writes publishes"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Wait up to timeout for a publish after `generation`; returns the latest one"""
+        with self.condition:
+            if self.generation == generation:
+                self.condition.wait(timeout)
+            return self.generation
+
+
+_notifiers = {}
+_notifiers_lock = threading.Lock()
+
+
+def get_notifier():
+    """This worker process's notifier; a wakeup just makes streams poll early"""
+    key = os.getpid()
+    with _notifiers_lock:
+        notifier = _notifiers.get(key)
+        if notifier is None:
+            notifier = _notifiers[key] = Notifier()
+    return notifier
+
+
+def format_event(event_id, kind, data):
+    """One Server-Sent Events message"""
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+def stream(database, user_id, since, category_names, poll_interval=DEFAULT_POLL_INTERVAL,
+           stream_seconds=DEFAULT_STREAM_SECONDS, max_age=DEFAULT_MAX_AGE):
+    """Yield the user's events after id `since` as SSE text for stream_seconds.
+
+    Uses its own connection rather than one from the request pool, which an
+    open dashboard would otherwise hold for minutes. When the day changes
+    the state is refreshed, so newly due recurring items are pushed without
+    a write; category_names() supplies the names that needs.
+    """
+    conn = db.connect(database, check_same_thread=False)
+    notifier = get_notifier()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        deadline = time.monotonic() + stream_seconds
+        quiet_since = time.monotonic()
+        generation = notifier.generation
+        day = None
+        while time.monotonic() < deadline:
+            today = date.today().isoformat()
+            if today != day:
+                current(conn, user_id, category_names(conn), today, max_age)
+                day = today
+            rows = conn.execute('SELECT id, kind, data FROM events WHERE user_id = ? AND id > ? ORDER BY id',
+                                (user_id, since)).fetchall()
+            for row in rows:
+                yield format_event(row['id'], row['kind'], row['data'])
+                since = row['id']
+            if rows:
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= KEEPALIVE_INTERVAL:
+                yield ': keepalive\n\n'
+                quiet_since = time.monotonic()
+            generation = notifier.wait(generation, poll_interval)
+    finally:
+        conn.close()
@@ -0,0 +1,248 @@
+"""
+HTTP load test for the Expense Tracker
+Logs in many synthetic users through /login and has each of them replay a
+weighted mix of dashboard, add, reports, search and export requests. It does
+this at one or more concurrency levels and reports throughput, p50/p95/p99
+latency and the error rate per route.
+
+Two targets, neither needing network access beyond localhost:
+    python loadtest.py --concurrency 1,8,32            # in-process Flask test client
+    python loadtest.py --url http://127.0.0.1:8000 --concurrency 16,64
+
+To load a local gunicorn with generated data:
+    python generate_data.py --rows 1m --users 500
+    EXPENSE_TRACKER_DATABASE=database/bench.db gunicorn -w 4 -b 127.0.0.1:8000 app:app
+
+Users are bench1, bench2, ... (password "benchmark"). Ones that don't exist
+yet are registered first, so it also runs against an empty database.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+import app as tracker
+import generate_data
+
+DEFAULT_CONCURRENCY = '1,8,32'
+DEFAULT_DURATION = 10              # seconds per concurrency level
+
+# Relative weight of each route in the traffic mix
+TRAFFIC_MIX = {
+    'dashboard': 40,
+    'reports': 20,
+    'search': 15,
+    'add': 15,
+    'export': 5,
+    'analytics': 5,
+}
+
+SEARCH_TERMS = ['grocer', 'rent', 'coffee', 'salary', 'uber', '25', '120.5']
+
+
+class TestClientSession:
+    """One logged-in user talking to the app in-process"""
+
+    def __init__(self):
+        self.client = tracker.app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as they are instead of following them"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession:
+    """One logged-in user talking to a running server over HTTP"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def log_in(session, number):
+    """Log in as bench<number>, registering the user first if needed"""
+    username = f'bench{number}'
+    credentials = {'username': username, 'password': generate_data.BENCH_PASSWORD}
+    if session.request('POST', '/login', credentials) == 302:
+        return
+    session.request('POST', '/register', {
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': generate_data.BENCH_PASSWORD,
+        'confirm_password': generate_data.BENCH_PASSWORD,
+    })
+    if session.request('POST', '/login', credentials) != 302:
+        raise RuntimeError(f'Could not log in as {username}')
+
+
+def next_request(rng):
+    """Pick a route from the traffic mix: (route, method, path, form data)"""
+    route = rng.choices(list(TRAFFIC_MIX), weights=list(TRAFFIC_MIX.values()))[0]
+    if route == 'dashboard':
+        return route, 'GET', '/', None
+    if route == 'analytics':
+        return route, 'GET', '/analytics', None
+    if route == 'reports':
+        if rng.random() < 0.5:
+            return route, 'GET', '/reports', None
+        return route, 'GET', f'/reports?type=expense&year={date.today().year}', None
+    if route == 'search':
+        return route, 'GET', '/search?' + urllib.parse.urlencode({'q': rng.choice(SEARCH_TERMS)}), None
+    if route == 'export':
+        return route, 'GET', '/export', None
+    return route, 'POST', '/add', {
+        'date': (date.today() - timedelta(days=rng.randint(0, 60))).isoformat(),
+        'amount': f'{rng.uniform(1, 150):.2f}',
+        'type': 'expense',
+        'category_id': '',
+        'description': 'Load test purchase',
+    }
+
+
+def virtual_user(make_session, number, deadline, seed, results, lock):
+    """Log in, then send requests until the deadline, recording each one"""
+    rng = random.Random(f'{seed}:{number}')
+    session = make_session()
+    log_in(session, number)
+    samples = []
+    while time.perf_counter() < deadline:
+        route, method, path, data = next_request(rng)
+        started = time.perf_counter()
+        try:
+            status = session.request(method, path, data)
+            failed = status >= 400
+        except Exception:
+            failed = True
+        samples.append((route, time.perf_counter() - started, failed))
+    with lock:
+        results.extend(samples)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles (ms) and error rate for a list of samples"""
+    latencies = sorted(latency * 1000 for _, latency, _ in samples)
+    errors = sum(1 for _, _, failed in samples if failed)
+    if not latencies:
+        return {'requests': 0, 'errors': 0}
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+    }
+
+
+def run_level(make_session, concurrency, duration, seed):
+    """Run `concurrency` virtual users for `duration` seconds"""
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=virtual_user,
+                         args=(make_session, number, deadline, seed, results, lock))
+        for number in range(1, concurrency + 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route in TRAFFIC_MIX:
+        route_samples = [sample for sample in results if sample[0] == route]
+        if route_samples:
+            routes[route] = summarize(route_samples, elapsed)
+    return {'concurrency': concurrency, 'seconds': round(elapsed, 2),
+            'total': summarize(results, elapsed), 'routes': routes}
+
+
+def print_level(level):
+    print(f"👥 {level['concurrency']} concurrent users, {level['seconds']}s")
+    rows = list(level['routes'].items()) + [('TOTAL', level['total'])]
+    for route, stats in rows:
+        if not stats['requests']:
+            continue
+        print(f"   {route:<10} {stats['requests']:>7} req {stats['throughput_rps']:>9.1f} req/s"
+              f"   p50 {stats['p50_ms']:>8.1f}   p95 {stats['p95_ms']:>8.1f}"
+              f"   p99 {stats['p99_ms']:>8.1f} ms   errors {stats['error_rate']:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the expense tracker')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--database', help='database for the in-process target')
+    parser.add_argument('--concurrency', default=DEFAULT_CONCURRENCY,
+                        help='comma-separated numbers of concurrent users')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help='seconds to run each concurrency level')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    if args.url:
+        target = args.url
+        make_session = lambda: HTTPSession(args.url)
+    else:
+        if args.database:
+            tracker.app.config['DATABASE'] = args.database
+        target = f"test client ({tracker.app.config['DATABASE']})"
+        make_session = TestClientSession
+
+    print(f"🎯 Target: {target}")
+    report = {'target': target, 'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'mix': TRAFFIC_MIX, 'levels': []}
+    for concurrency in [int(level) for level in args.concurrency.split(',')]:
+        level = run_level(make_session, concurrency, args.duration, args.seed)
+        report['levels'].append(level)
+        print_level(level)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
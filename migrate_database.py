@@ -1,164 +1,545 @@
 """
 Database Migration Script
-This script migrates the existing expense tracker database to support multiple users.
-Run this script after implementing user authentication.
+Brings an existing expense tracker database up to the current schema.
+
+`PRAGMA user_version` holds the schema version a database is fully
+installed at. init_db() skips all of its DDL when that is SCHEMA_VERSION;
+otherwise it runs the pending migrations below, creates whatever the
+migrations don't cover, and then records SCHEMA_VERSION.
+
+    1  multiple users: a users table, and user_id on categories,
+       transactions and budgets (existing data goes to a "demo" user)
+    2  integer cents: amounts stored as amount_cents, amount_limit_cents
+       and target_cents, with the REAL columns and transactions' month and
+       year generated from them; dates normalized to ISO text. Budgets that
+       share a month and category are all kept and reported
+    3  background jobs table (nothing to copy; init_db() creates it)
+    4  dashboard state and live update events (likewise)
+    5  running balance checkpoints (backfilled by balances.install())
+    6  daily and yearly rollups (backfilled by timeseries.install())
+    7  per-user write versions for the caches (nothing to copy)
+
+A migration copies each table it changes into a shadow table in id order,
+one bounded chunk per short write transaction, so memory use stays flat
+and the app can keep running. Triggers mirror concurrent writes into the
+shadow tables. Progress is checkpointed after every chunk, so an
+interrupted run resumes where it stopped. The shadow tables are swapped
+in, with their indexes and triggers, in one final transaction.
+
+    python migrate_database.py
+    python migrate_database.py --database path/to/tracker.db --chunk-size 20000
 """
 
-import sqlite3
+import argparse
+import hashlib
 import os
-from datetime import datetime
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+import balances
+import goals
+import rollups
+import search_index
+import timeseries
 
 # Get the directory where this script is located
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
 
-def migrate_database():
-    """Migrate existing database to support users"""
-    print("🔄 Starting database migration...")
-    
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
+DEFAULT_CHUNK_SIZE = 50000
+
+# Version of the schema init_db() creates; bump it with every new migration,
+# and whenever init_db() adds a table existing databases need
+SCHEMA_VERSION = 7
+
+# Existing single-user data is given to this account. An existing user
+# with the demo username, or else the demo email, is reused.
+DEMO_USERNAME = 'demo'
+DEMO_EMAIL = 'demo@example.com'
+DEMO_PASSWORD = 'demo123'
+DEMO_USER_ID = (f"(SELECT id FROM users WHERE username = '{DEMO_USERNAME}' OR email = '{DEMO_EMAIL}' "
+                f"ORDER BY username = '{DEMO_USERNAME}' DESC LIMIT 1)")
+
+USERS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        email TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Table definitions by version; {name} is the table being created
+
+CATEGORIES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        UNIQUE(name, user_id)
+    )
+'''
+
+TRANSACTIONS_V1_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+        category_id INTEGER,
+        description TEXT,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+BUDGETS_V1_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL,
+        category_id INTEGER,
+        amount_limit REAL NOT NULL,
+        user_id INTEGER NOT NULL,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+TRANSACTIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+        category_id INTEGER,
+        description TEXT,
+        user_id INTEGER NOT NULL,
+        amount REAL GENERATED ALWAYS AS (amount_cents / 100.0) VIRTUAL,
+        month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+        year INTEGER GENERATED ALWAYS AS (CAST(substr(date, 1, 4) AS INTEGER)) VIRTUAL,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+BUDGETS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL,
+        category_id INTEGER,
+        amount_limit_cents INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        amount_limit REAL GENERATED ALWAYS AS (amount_limit_cents / 100.0) VIRTUAL,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+# Budgets tables created by init_db() have UNIQUE(month, category_id,
+# user_id), but older ones may not, and may hold duplicates. The shadow
+# tables leave the constraint out so every budget is copied; this index puts
+# it back once the copy is swapped in, unless duplicates are present.
+BUDGETS_UNIQUE_INDEX_SQL = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_budgets_month_category_user
+    ON budgets (month, category_id, user_id)
+'''
+
+DUPLICATE_BUDGETS_SQL = '''
+    SELECT user_id, month, category_id, COUNT(*)
+    FROM budgets
+    WHERE category_id IS NOT NULL
+    GROUP BY user_id, month, category_id
+    HAVING COUNT(*) > 1
+    ORDER BY user_id, month, category_id
+'''
+
+GOALS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        target_cents INTEGER NOT NULL,
+        target_date TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        saved_cents INTEGER NOT NULL DEFAULT 0,
+        contribution_count INTEGER NOT NULL DEFAULT 0,
+        target_amount REAL GENERATED ALWAYS AS (target_cents / 100.0) VIRTUAL,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+'''
+
+TRANSACTION_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, id)',
+    'CREATE INDEX IF NOT EXISTS idx_transactions_user_type_date ON transactions (user_id, type, date)',
+    'CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date ON transactions (user_id, category_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_transactions_user_amount ON transactions (user_id, amount_cents)',
+)
+
+PROGRESS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS migration_progress (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+'''
+
+# Tables with triggers on the migrated tables, and those triggers. They are
+# dropped before a swap and recreated against the new columns after it.
+DEPENDENT_TRIGGERS = (
+    ('monthly_rollups', rollups.TRIGGERS),
+    ('transactions_fts', search_index.TRIGGERS),
+    ('goal_contributions', goals.TRIGGERS),
+    ('balance_checkpoints', balances.TRIGGERS),
+    ('daily_rollups', timeseries.TRIGGERS),
+)
+
+
+@dataclass
+class ShadowTable:
+    """A table a migration rebuilds from create_sql.
+
+    converted maps a new column to an expression over the old row, with
+    {row} in front of every old column name; every other column the two
+    definitions share is copied as is.
+    """
+    name: str
+    create_sql: str
+    converted: dict = field(default_factory=dict)
+    indexes: tuple = ()
+
+    @property
+    def shadow(self):
+        return f'{self.name}_shadow'
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    needed: object              # conn -> bool, checked against the schema itself
+    tables: list
+    prepare: object = None      # conn -> None, run in the setup transaction
+    finish: object = None       # conn -> None, run in the swap transaction
+
+
+def columns(conn, table):
+    """Names of a table's columns, generated ones included"""
+    return [row[1] for row in conn.execute(f'PRAGMA table_xinfo({table})')]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def set_schema_version(conn, version):
+    conn.execute(f'PRAGMA user_version = {int(version)}')
+
+
+# Migration 1: multiple users
+
+def duplicate_budgets(conn):
+    """(user_id, month, category_id, count) for budgets sharing a month and category"""
+    if not rollups.table_exists(conn, 'budgets'):
+        return []
+    return conn.execute(DUPLICATE_BUDGETS_SQL).fetchall()
+
+
+def unique_budgets(conn):
+    """Restore the budgets' uniqueness once migrated, if the data allows it"""
+    if rollups.table_exists(conn, 'budgets') and not duplicate_budgets(conn):
+        conn.execute(BUDGETS_UNIQUE_INDEX_SQL)
+
+
+def needs_users(conn):
+    return rollups.table_exists(conn, 'transactions') and 'user_id' not in columns(conn, 'transactions')
+
+
+def create_demo_user(conn):
+    conn.execute(USERS_TABLE_SQL)
+    if demo_user(conn) is None:
+        conn.execute(
+            'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+            (DEMO_USERNAME, DEMO_EMAIL, hashlib.sha256(DEMO_PASSWORD.encode()).hexdigest())
+        )
+
+
+def demo_user(conn):
+    """(id, username, email, password_hash) of the account existing data goes to, or None"""
+    return conn.execute(
+        f'SELECT id, username, email, password_hash FROM users WHERE id = {DEMO_USER_ID}'
+    ).fetchone()
+
+
+# Migration 2: integer cents
+
+def needs_cents_migration(conn):
+    """True while transactions still stores REAL amounts"""
+    return (rollups.table_exists(conn, 'transactions')
+            and 'amount_cents' not in columns(conn, 'transactions'))
+
+
+def finish_cents_migration(conn):
+    unique_budgets(conn)
+    if rollups.table_exists(conn, 'goal_contributions'):
+        for sql in goals.INDEXES:
+            conn.execute(sql)
+        conn.execute(goals.RECOUNT_SQL)
+
+
+def cents(column):
+    return f'CAST(ROUND({{row}}{column} * 100) AS INTEGER)'
+
+
+MIGRATIONS = [
+    Migration(1, 'multiple users', needs_users, [
+        ShadowTable('categories', CATEGORIES_TABLE_SQL, {'user_id': DEMO_USER_ID}),
+        ShadowTable('transactions', TRANSACTIONS_V1_TABLE_SQL, {'user_id': DEMO_USER_ID}),
+        ShadowTable('budgets', BUDGETS_V1_TABLE_SQL, {'user_id': DEMO_USER_ID}),
+    ], prepare=create_demo_user, finish=unique_budgets),
+    Migration(2, 'amounts in integer cents', needs_cents_migration, [
+        ShadowTable('transactions', TRANSACTIONS_TABLE_SQL, {
+            # Unparseable dates are kept as they are
+            'date': 'COALESCE(date({row}date), {row}date)',
+            'amount_cents': cents('amount'),
+        }, TRANSACTION_INDEXES),
+        ShadowTable('budgets', BUDGETS_TABLE_SQL, {'amount_limit_cents': cents('amount_limit')}),
+        ShadowTable('financial_goals', GOALS_TABLE_SQL, {'target_cents': cents('target_amount')}),
+    ], finish=finish_cents_migration),
+]
+
+
+def progress_key(migration, table):
+    return f'{migration.version}:{table.name}'
+
+
+def copied_columns(conn, table):
+    """(column, expression template) for each stored column of the shadow table"""
+    old = set(columns(conn, table.name))
+    return [(row[1], table.converted.get(row[1], '{row}' + row[1]))
+            for row in conn.execute(f'PRAGMA table_xinfo({table.shadow})')
+            if not row[6] and (row[1] in table.converted or row[1] in old)]   # row[6]: generated
+
+
+def mirror_triggers(table, copied):
+    """Triggers keeping rows that were already copied in step with later writes"""
+    names = ', '.join(name for name, _ in copied)
+    values = ', '.join(expression.format(row='NEW.') for _, expression in copied)
+    upsert = f'INSERT OR REPLACE INTO {table.shadow} ({names}) VALUES ({values});'
+    return {
+        f'trg_{table.shadow}_insert':
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table.shadow}_insert AFTER INSERT ON {table.name} '
+            f'BEGIN {upsert} END',
+        f'trg_{table.shadow}_update':
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table.shadow}_update AFTER UPDATE ON {table.name} '
+            f'BEGIN {upsert} END',
+        f'trg_{table.shadow}_delete':
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table.shadow}_delete AFTER DELETE ON {table.name} '
+            f'BEGIN DELETE FROM {table.shadow} WHERE id = OLD.id; END',
+    }
+
+
+def copy_table(conn, migration, table, chunk_size, progress=None):
+    """Copy the rows that existed when the copy started, chunk by chunk.
+
+    Rows written after that are mirrored by the triggers, so the copy only
+    has to reach the id it started at.
+    """
+    copied = copied_columns(conn, table)
+    copy_sql = f'''
+        INSERT OR REPLACE INTO {table.shadow} ({', '.join(name for name, _ in copied)})
+        SELECT {', '.join(expression.format(row='') for _, expression in copied)}
+        FROM {table.name}
+        WHERE id > ? AND id <= ?
+    '''
+    key = progress_key(migration, table)
+    last_id = conn.execute('SELECT last_id FROM migration_progress WHERE name = ?', (key,)).fetchone()[0]
+    max_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table.name}').fetchone()[0]
+    total = conn.execute(f'SELECT COUNT(*) FROM {table.name}').fetchone()[0]
+    done = conn.execute(f'SELECT COUNT(*) FROM {table.shadow}').fetchone()[0]
+    while last_id < max_id:
+        upper = conn.execute(
+            f'SELECT MAX(id) FROM (SELECT id FROM {table.name} WHERE id > ? ORDER BY id LIMIT ?)',
+            (last_id, chunk_size)
+        ).fetchone()[0] or max_id
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            done += conn.execute(copy_sql, (last_id, upper)).rowcount
+            conn.execute('UPDATE migration_progress SET last_id = ? WHERE name = ?', (upper, key))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        last_id = upper
+        if progress:
+            progress(table.name, min(done, total), total)
+
+
+def abandon_copy(conn, migration, tables):
+    """Drop a failed migration's mirror triggers, shadow tables and progress.
+
+    Without the triggers the shadow tables would fall behind the live ones,
+    so the next run starts the copy over.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table in tables:
+            for name in mirror_triggers(table, []):
+                conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+            conn.execute(f'DROP TABLE IF EXISTS {table.shadow}')
+            conn.execute('DELETE FROM migration_progress WHERE name = ?', (progress_key(migration, table),))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def run_migration(conn, migration, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Apply one migration; safe to interrupt and rerun.
+
+    conn must be in autocommit mode (or at least not inside a transaction).
+    Returns False if another process finished it first. If copying fails
+    (rather than being interrupted), the mirror triggers are removed so the
+    live tables keep accepting writes, and the error is raised.
+    """
+    tables = [table for table in migration.tables if rollups.table_exists(conn, table.name)]
+
+    # Shadow tables, progress rows and mirror triggers
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(PROGRESS_TABLE_SQL)
+        if migration.prepare:
+            migration.prepare(conn)
+        for table in tables:
+            conn.execute(table.create_sql.format(name=table.shadow))
+            conn.execute('INSERT OR IGNORE INTO migration_progress VALUES (?, 0)',
+                         (progress_key(migration, table),))
+            for sql in mirror_triggers(table, copied_columns(conn, table)).values():
+                conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
     try:
-        # Check if users table exists
-        cursor.execute('''
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='users'
-        ''')
-        
-        if cursor.fetchone():
-            print("✅ Database already migrated!")
-            return
-        
-        print("📝 Creating backup of current data...")
-        
-        # Backup existing data
-        cursor.execute('SELECT * FROM transactions')
-        old_transactions = cursor.fetchall()
-        
-        cursor.execute('SELECT * FROM categories')
-        old_categories = cursor.fetchall()
-        
-        print(f"📊 Found {len(old_transactions)} transactions and {len(old_categories)} categories")
-        
-        # Drop existing tables
-        print("🗑️ Dropping old tables...")
-        cursor.execute('DROP TABLE IF EXISTS transactions')
-        cursor.execute('DROP TABLE IF EXISTS categories')
-        cursor.execute('DROP TABLE IF EXISTS budgets')
-        
-        # Create new schema with users
-        print("🏗️ Creating new schema...")
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                email TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create categories table (now per user)
-        cursor.execute('''
-            CREATE TABLE categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(name, user_id)
-            )
-        ''')
-        
-        # Create transactions table (now per user)
-        cursor.execute('''
-            CREATE TABLE transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                amount REAL NOT NULL,
-                type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
-                category_id INTEGER,
-                description TEXT,
-                user_id INTEGER NOT NULL,
-                FOREIGN KEY (category_id) REFERENCES categories (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create budgets table (optional, now per user)
-        cursor.execute('''
-            CREATE TABLE budgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                month TEXT NOT NULL,
-                category_id INTEGER,
-                amount_limit REAL NOT NULL,
-                user_id INTEGER NOT NULL,
-                FOREIGN KEY (category_id) REFERENCES categories (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create a default demo user for existing data
-        print("👤 Creating demo user for existing data...")
-        import hashlib
-        demo_password = hashlib.sha256("demo123".encode()).hexdigest()
-        
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash) 
-            VALUES (?, ?, ?)
-        ''', ("demo", "demo@example.com", demo_password))
-        
-        demo_user_id = cursor.lastrowid
-        
-        # Migrate categories
-        print("🏷️ Migrating categories...")
-        category_mapping = {}
-        
-        for old_cat in old_categories:
-            cursor.execute('''
-                INSERT INTO categories (name, user_id) 
-                VALUES (?, ?)
-            ''', (old_cat[1], demo_user_id))  # old_cat[1] is the name
-            
-            new_cat_id = cursor.lastrowid
-            category_mapping[old_cat[0]] = new_cat_id  # Map old ID to new ID
-        
-        # Migrate transactions
-        print("💰 Migrating transactions...")
-        for old_trans in old_transactions:
-            old_category_id = old_trans[4]  # category_id position
-            new_category_id = category_mapping.get(old_category_id) if old_category_id else None
-            
-            cursor.execute('''
-                INSERT INTO transactions (date, amount, type, category_id, description, user_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                old_trans[1],  # date
-                old_trans[2],  # amount  
-                old_trans[3],  # type
-                new_category_id,  # new category_id
-                old_trans[5],  # description
-                demo_user_id   # user_id
-            ))
-        
-        conn.commit()
-        
-        print("✅ Migration completed successfully!")
-        print(f"👤 Demo user created:")
-        print(f"   Username: demo")
-        print(f"   Password: demo123")
-        print(f"   Email: demo@example.com")
-        print(f"📊 Migrated {len(old_transactions)} transactions and {len(old_categories)} categories")
-        print(f"🌐 You can now register new users or login with the demo account")
-        
-    except Exception as e:
-        print(f"❌ Migration failed: {e}")
-        conn.rollback()
+        for table in tables:
+            copy_table(conn, migration, table, chunk_size, progress)
+    except sqlite3.Error:
+        abandon_copy(conn, migration, tables)
         raise
-    finally:
+
+    # Swap every shadow table in at once
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if not migration.needed(conn):
+            conn.execute('ROLLBACK')
+            return False
+        for _, triggers in DEPENDENT_TRIGGERS:
+            for name in triggers:
+                conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        for table in tables:
+            for name in mirror_triggers(table, []):
+                conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+            sequence = conn.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = ?', (table.name,)
+            ).fetchone()
+            conn.execute(f'DROP TABLE {table.name}')
+            conn.execute(f'ALTER TABLE {table.shadow} RENAME TO {table.name}')
+            if sequence:
+                # Never hand out the ids of rows deleted before the migration
+                conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?',
+                             (sequence[0], table.name))
+            for sql in table.indexes:
+                conn.execute(sql)
+            conn.execute('DELETE FROM migration_progress WHERE name = ?',
+                         (progress_key(migration, table),))
+        if not conn.execute('SELECT 1 FROM migration_progress LIMIT 1').fetchone():
+            conn.execute('DROP TABLE migration_progress')
+        if migration.finish:
+            migration.finish(conn)
+        for name, triggers in DEPENDENT_TRIGGERS:
+            if rollups.table_exists(conn, name):
+                for sql in triggers.values():
+                    conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    # Dropping the old tables dropped their planner statistics too
+    if rollups.table_exists(conn, 'sqlite_stat1'):
+        for table in tables:
+            conn.execute(f'ANALYZE {table.name}')
+    return True
+
+
+def migrate(conn, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Run every pending migration in order; returns the ones applied.
+
+    Doesn't set user_version: init_db() does once the rest of the schema is
+    in place, so a run that stops part way is simply picked up again.
+    """
+    applied = []
+    for migration in MIGRATIONS:
+        # Checked one at a time: an earlier migration can make a later one needed
+        if migration.version > schema_version(conn) and migration.needed(conn):
+            run_migration(conn, migration, chunk_size, progress)
+            applied.append(migration)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bring an expense tracker database up to date')
+    parser.add_argument('--database', default=DATABASE_PATH, help='path to tracker.db')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='rows copied per write transaction')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database, timeout=30, isolation_level=None)
+    if schema_version(conn) == SCHEMA_VERSION:
+        print(f"✅ Database already at schema version {SCHEMA_VERSION}!")
         conn.close()
+        return
+
+    def report(table, done, total):
+        print(f"   {table}: {done:,} / {total:,} rows")
+
+    print("🔄 Migrating the database...")
+    started = time.perf_counter()
+    applied = migrate(conn, args.chunk_size, report)
+    for migration in applied:
+        print(f"✅ Migration {migration.version}: {migration.description}")
+    conn.close()
+
+    # The tables, indexes and derived data migrations don't touch, and the
+    # version stamp, come from the app's own schema setup
+    import app as tracker
+    tracker.app.config['DATABASE'] = args.database
+    with tracker.app.app_context():
+        tracker.init_db()
+    print(f"✅ Database at schema version {SCHEMA_VERSION} ({time.perf_counter() - started:.1f}s)")
+
+    conn = sqlite3.connect(args.database)
+    duplicates = duplicate_budgets(conn)
+    conn.close()
+    if duplicates:
+        print("⚠️  These budgets share a month and category; all were kept, so delete the extra ones:")
+        for user_id, month, category_id, count in duplicates:
+            print(f"   user {user_id}, {month}, category {category_id}: {count} budgets")
+
+    if any(migration.version == 1 for migration in applied):
+        conn = sqlite3.connect(args.database)
+        _, username, email, password_hash = demo_user(conn)
+        conn.close()
+        print(f"👤 Existing data belongs to the user:")
+        print(f"   Username: {username}")
+        if password_hash == hashlib.sha256(DEMO_PASSWORD.encode()).hexdigest():
+            print(f"   Password: {DEMO_PASSWORD}")
+        print(f"   Email: {email}")
+
 
 if __name__ == '__main__':
-    migrate_database()
\ No newline at end of file
+    main()
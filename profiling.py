@@ -0,0 +1,222 @@
+"""
+Request profiling for the Expense Tracker
+With PROFILING on, two things happen:
+
+- A PROFILE_SAMPLE_RATE fraction of requests run under cProfile. Each one
+  writes a .pstats file.
+- Every other request is registered with a stack sampler thread. The
+  thread sleeps until a request has run for PROFILE_SLOW_MS, and only then
+  samples that request's stack every PROFILE_INTERVAL_MS until it ends. The
+  samples of a slow request are written as a collapsed-stack .folded file,
+  the format flamegraph.pl and speedscope read. Requests that finish in
+  time are never sampled and never wake the thread.
+
+Files go to PROFILE_DIR/<route>/. Each route keeps at most PROFILE_MAX_FILES
+files, so the feature is safe to leave on in production at a low sample rate.
+
+Summarize what was collected, optionally for one route:
+    python profiling.py
+    python profiling.py --route reports --top 30
+"""
+
+import argparse
+import cProfile
+import collections
+import glob
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+from flask import g, request
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Defaults, overridable through app.config
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_SLOW_MS = 500
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_MAX_FILES = 100
+
+
+def frame_label(frame):
+    """'file.py:function' for a frame"""
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+def collapse(frame):
+    """Stack of a frame as 'outer;...;inner' function labels"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """Background thread that samples request threads once they have run for `delay` seconds"""
+
+    def __init__(self, interval, delay):
+        self.interval = interval
+        self.delay = delay
+        self.active = {}                # thread id -> (deadline, Counter of collapsed stacks)
+        self.condition = threading.Condition()
+        self.wake_at = None             # when the thread next looks; None while there is nothing to do
+        self.thread = None
+
+    def start(self, thread_id):
+        deadline = time.monotonic() + self.delay
+        with self.condition:
+            self.active[thread_id] = (deadline, collections.Counter())
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+                self.thread.start()
+            elif self.wake_at is None or deadline < self.wake_at:
+                self.condition.notify()
+
+    def stop(self, thread_id):
+        """The thread's samples (empty unless it ran past the delay)"""
+        with self.condition:
+            entry = self.active.pop(thread_id, None)
+        return entry[1] if entry else None
+
+    def run(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                due = [(thread_id, stacks) for thread_id, (deadline, stacks) in self.active.items()
+                       if deadline <= now]
+                if due:
+                    frames = sys._current_frames()
+                    for thread_id, stacks in due:
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            stacks[collapse(frame)] += 1
+                    self.wake_at = now + self.interval
+                elif self.active:
+                    # A request that ends before its deadline leaves a
+                    # wakeup that just finds the next one
+                    self.wake_at = min(deadline for deadline, _ in self.active.values())
+                else:
+                    self.wake_at = None
+                self.condition.wait(None if self.wake_at is None else self.wake_at - now)
+
+
+def route_directory(app, route):
+    path = os.path.join(app.config.get('PROFILE_DIR', PROFILE_DIR), route)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def prune(directory, max_files):
+    """Delete the oldest files beyond max_files (names start with time_ns())"""
+    files = sorted(os.listdir(directory))
+    for name in files[:max(len(files) - max_files, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def init_app(app):
+    """Register the profiling hooks if PROFILING is set"""
+    if not app.config.get('PROFILING'):
+        return
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    slow_seconds = app.config.get('PROFILE_SLOW_MS', DEFAULT_SLOW_MS) / 1000
+    max_files = app.config.get('PROFILE_MAX_FILES', DEFAULT_MAX_FILES)
+    sampler = StackSampler(app.config.get('PROFILE_INTERVAL_MS', DEFAULT_INTERVAL_MS) / 1000, slow_seconds)
+
+    @app.before_request
+    def start_profiling():
+        g.profile_started = time.perf_counter()
+        if random.random() < sample_rate:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        else:
+            sampler.start(threading.get_ident())
+
+    @app.teardown_request
+    def finish_profiling(exc=None):
+        started = g.pop('profile_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        profiler = g.pop('profiler', None)
+        stacks = None
+        if profiler is not None:
+            profiler.disable()
+        else:
+            stacks = sampler.stop(threading.get_ident())
+            if elapsed < slow_seconds or not stacks:
+                return
+
+        directory = route_directory(app, request.endpoint or 'unmatched')
+        name = f'{time.time_ns()}-{elapsed * 1000:.0f}ms'
+        if profiler is not None:
+            profiler.dump_stats(os.path.join(directory, name + '.pstats'))
+        else:
+            with open(os.path.join(directory, name + '.folded'), 'w') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+        prune(directory, max_files)
+
+
+def summarize_pstats(paths, top):
+    """Top functions by own time over every .pstats file"""
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    stats.sort_stats('tottime').print_stats(top)
+
+
+def summarize_folded(paths, top):
+    """Top functions by own and inclusive samples over every .folded file"""
+    own = collections.Counter()
+    inclusive = collections.Counter()
+    total = 0
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                count = int(count)
+                labels = stack.split(';')
+                total += count
+                own[labels[-1]] += count
+                for label in set(labels):
+                    inclusive[label] += count
+
+    print(f"{len(paths)} slow request(s), {total} samples")
+    print(f"{'own %':>7} {'incl %':>7}  function")
+    for label, count in own.most_common(top):
+        print(f"{count / total:>7.1%} {inclusive[label] / total:>7.1%}  {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize collected request profiles')
+    parser.add_argument('--dir', default=PROFILE_DIR, help='profile directory')
+    parser.add_argument('--route', default='*', help='only this route (endpoint name)')
+    parser.add_argument('--top', type=int, default=20, help='number of functions to show')
+    args = parser.parse_args()
+
+    pstats_files = sorted(glob.glob(os.path.join(args.dir, args.route, '*.pstats')))
+    folded_files = sorted(glob.glob(os.path.join(args.dir, args.route, '*.folded')))
+    if not pstats_files and not folded_files:
+        print(f"❌ No profiles found in {args.dir}")
+        return
+
+    if pstats_files:
+        print(f"📊 Sampled requests (cProfile, {len(pstats_files)} file(s))")
+        summarize_pstats(pstats_files, args.top)
+    if folded_files:
+        print("🐢 Slow requests (stack samples)")
+        summarize_folded(folded_files, args.top)
+
+
+if __name__ == '__main__':
+    main()
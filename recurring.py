@@ -0,0 +1,197 @@
+"""
+Recurring transaction catch-up for the Expense Tracker
+Finds every active recurring rule that is due and materializes all of its
+missed occurrences in one write transaction, then bumps the write version
+of every user it wrote for so the app's caches pick the new rows up.
+
+Occurrences are computed from the rule's start date, so a monthly rule that
+starts on the 31st lands on the last day of shorter months and goes back to
+the 31st afterwards instead of drifting.
+
+Run it from cron or a systemd timer, or keep it running on its own:
+    python recurring.py                    # catch up every user until today
+    python recurring.py --user 3           # only one user
+    python recurring.py --date 2025-12-31  # catch up until a given date
+    python recurring.py --every 3600       # repeat every hour
+"""
+
+import argparse
+import calendar
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+import cache
+import db
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+# Upper bound of occurrences generated for one rule in one run, so a rule
+# with a start date decades in the past can't flood the table.
+MAX_OCCURRENCES_PER_RULE = 3660
+
+INSERT_TRANSACTION_SQL = '''
+    INSERT INTO transactions (date, amount_cents, type, category_id, description, user_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+UPDATE_RULE_SQL = '''
+    UPDATE recurring_transactions
+    SET next_date = ?, last_executed = ?
+    WHERE id = ? AND user_id = ?
+'''
+
+
+def add_months(day, months):
+    """Shift a date by whole months, clamping to the last day of the month"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return day.replace(year=year, month=month,
+                       day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(start, frequency, index):
+    """Date of the index-th occurrence of a rule (0 is the start date)"""
+    if frequency == 'daily':
+        return start + timedelta(days=index)
+    if frequency == 'weekly':
+        return start + timedelta(weeks=index)
+    if frequency == 'monthly':
+        return add_months(start, index)
+    if frequency == 'yearly':
+        return add_months(start, 12 * index)
+    raise ValueError(f'Unknown frequency: {frequency}')
+
+
+def occurrence_index(start, frequency, day):
+    """Index of the first occurrence on or after a given day"""
+    if day <= start:
+        return 0
+    if frequency == 'daily':
+        index = (day - start).days
+    elif frequency == 'weekly':
+        index = (day - start).days // 7
+    elif frequency == 'monthly':
+        index = (day.year - start.year) * 12 + day.month - start.month
+    elif frequency == 'yearly':
+        index = day.year - start.year
+    else:
+        raise ValueError(f'Unknown frequency: {frequency}')
+    # Step back for clamped dates, then forward to the first one not before day
+    index = max(index - 1, 0)
+    while occurrence(start, frequency, index) < day:
+        index += 1
+    return index
+
+
+def due_occurrences(rule, until, limit=None):
+    """Dates at which a rule is due, from its next_date up to and including until.
+
+    Returns the dates and the next_date the rule should be advanced to.
+    """
+    start = parse_date(rule['start_date'])
+    index = occurrence_index(start, rule['frequency'], parse_date(rule['next_date']))
+    limit = limit or MAX_OCCURRENCES_PER_RULE
+    dates = []
+    while len(dates) < limit:
+        day = occurrence(start, rule['frequency'], index)
+        if day > until:
+            break
+        dates.append(day)
+        index += 1
+    return dates, occurrence(start, rule['frequency'], index)
+
+
+def parse_date(value):
+    """Parse an ISO date string (a time part, if any, is ignored)"""
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def catch_up(conn, until=None, user_id=None, recurring_id=None, limit=None):
+    """Materialize every missed occurrence of due recurring rules.
+
+    Rules are selected by user and/or rule id; until defaults to today. A rule
+    picked by recurring_id runs even if it is paused, and with limit=1 its
+    next occurrence is executed even if it is not due yet, which is what the
+    "Execute Now" button does.
+
+    Returns a summary dict with the number of rules and transactions and the
+    ids of the users that got transactions. The caller bumps their write
+    versions (see cache.py) once this has committed.
+    """
+    until = until or date.today()
+    query = 'SELECT * FROM recurring_transactions WHERE 1 = 1'
+    params = []
+    if user_id is not None:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    if recurring_id is not None:
+        query += ' AND id = ?'
+        params.append(recurring_id)
+    else:
+        query += ' AND active = 1 AND next_date <= ?'
+        params.append(until.isoformat())
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        transactions = []
+        rule_updates = []
+        for rule in conn.execute(query, params).fetchall():
+            if recurring_id is not None and limit == 1:
+                rule_until = max(until, parse_date(rule['next_date']))
+            else:
+                rule_until = until
+            dates, next_date = due_occurrences(rule, rule_until, limit)
+            if not dates:
+                continue
+            transactions.extend(
+                (day.isoformat(), db.to_cents(rule['amount']), rule['type'], rule['category_id'],
+                 f"{rule['title']} (Auto)", rule['user_id'])
+                for day in dates
+            )
+            rule_updates.append((next_date.isoformat(), dates[-1].isoformat(),
+                                 rule['id'], rule['user_id']))
+
+        conn.executemany(INSERT_TRANSACTION_SQL, transactions)
+        conn.executemany(UPDATE_RULE_SQL, rule_updates)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    return {'rules': len(rule_updates), 'transactions': len(transactions),
+            'users': sorted({update[3] for update in rule_updates})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catch up recurring transactions')
+    parser.add_argument('--database', default=DATABASE_PATH, help='path to tracker.db')
+    parser.add_argument('--user', type=int, help='only catch up this user id')
+    parser.add_argument('--date', help='catch up until this date (YYYY-MM-DD, default today)')
+    parser.add_argument('--every', type=int, help='repeat every N seconds instead of running once')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database, timeout=30)
+    conn.row_factory = sqlite3.Row
+    cache.install(conn)
+    try:
+        while True:
+            until = parse_date(args.date) if args.date else date.today()
+            result = catch_up(conn, until=until, user_id=args.user)
+            for user_id in result['users']:
+                cache.bump(conn, user_id)
+            print(f"✅ {datetime.now():%Y-%m-%d %H:%M:%S} created {result['transactions']} "
+                  f"transaction(s) from {result['rules']} recurring rule(s)")
+            if not args.every:
+                break
+            time.sleep(args.every)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Monthly rollups for the Expense Tracker
+Keeps one row per (user, month, category, type) with the sum, count, min and
+max of the matching transactions, so dashboard and analytics charts read a
+handful of rows per month instead of re-aggregating the full history.
+
+The rollup is maintained by triggers on `transactions`, which means every
+write path (forms, recurring execution, category deletion, scripts) updates
+it inside the same database transaction.
+
+Run this script directly to rebuild the rollups from scratch:
+    python rollups.py
+"""
+
+import os
+import sqlite3
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+# Uncategorized transactions are stored under category 0 so the primary key
+# never contains NULL.
+NO_CATEGORY = 0
+
+ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS monthly_rollups (
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        category_id INTEGER NOT NULL DEFAULT 0,
+        type TEXT NOT NULL,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        min_amount REAL,
+        max_amount REAL,
+        PRIMARY KEY (user_id, month, category_id, type)
+    ) WITHOUT ROWID
+'''
+
+BACKFILL_SQL = '''
+    INSERT INTO monthly_rollups
+        (user_id, month, category_id, type, total_cents, count, min_amount, max_amount)
+    SELECT user_id, month, COALESCE(category_id, 0), type,
+           SUM(amount_cents), COUNT(*), MIN(amount), MAX(amount)
+    FROM transactions
+    {where}
+    GROUP BY user_id, month, COALESCE(category_id, 0), type
+'''
+
+# Statement bodies shared by the triggers. {row} is NEW or OLD.
+_ADD_ROW = '''
+    INSERT INTO monthly_rollups
+        (user_id, month, category_id, type, total_cents, count, min_amount, max_amount)
+    VALUES (NEW.user_id, NEW.month, COALESCE(NEW.category_id, 0), NEW.type,
+            NEW.amount_cents, 1, NEW.amount, NEW.amount)
+    ON CONFLICT (user_id, month, category_id, type) DO UPDATE SET
+        total_cents = total_cents + excluded.total_cents,
+        count = count + 1,
+        min_amount = MIN(min_amount, excluded.min_amount),
+        max_amount = MAX(max_amount, excluded.max_amount);
+'''
+
+# Removing a row can only change min/max when it was the extreme value, so
+# the bucket is only rescanned (through the user/category/date index) then.
+_REMOVE_ROW = '''
+    UPDATE monthly_rollups SET
+        total_cents = total_cents - OLD.amount_cents,
+        count = count - 1,
+        min_amount = CASE WHEN OLD.amount > min_amount THEN min_amount ELSE (
+            SELECT MIN(amount) FROM transactions
+            WHERE user_id = OLD.user_id AND category_id IS OLD.category_id
+            AND date >= OLD.month || '-01'
+            AND date < date(OLD.month || '-01', '+1 month')
+            AND type = OLD.type) END,
+        max_amount = CASE WHEN OLD.amount < max_amount THEN max_amount ELSE (
+            SELECT MAX(amount) FROM transactions
+            WHERE user_id = OLD.user_id AND category_id IS OLD.category_id
+            AND date >= OLD.month || '-01'
+            AND date < date(OLD.month || '-01', '+1 month')
+            AND type = OLD.type) END
+    WHERE user_id = OLD.user_id AND month = OLD.month
+    AND category_id = COALESCE(OLD.category_id, 0) AND type = OLD.type;
+    DELETE FROM monthly_rollups
+    WHERE user_id = OLD.user_id AND month = OLD.month
+    AND category_id = COALESCE(OLD.category_id, 0) AND type = OLD.type
+    AND count <= 0;
+'''
+
+TRIGGERS = {
+    'trg_rollups_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_insert
+        AFTER INSERT ON transactions
+        BEGIN {_ADD_ROW} END
+    ''',
+    'trg_rollups_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_delete
+        AFTER DELETE ON transactions
+        BEGIN {_REMOVE_ROW} END
+    ''',
+    'trg_rollups_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollups_update
+        AFTER UPDATE OF date, amount_cents, type, category_id, user_id ON transactions
+        BEGIN {_REMOVE_ROW} {_ADD_ROW} END
+    ''',
+}
+
+
+def table_exists(conn, name):
+    """Check whether a table exists in the database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def install(conn):
+    """Create the rollup table and triggers, backfilling existing databases.
+
+    The backfill and the triggers are created in one write transaction, so no
+    transaction can slip in between and be counted twice or not at all.
+    """
+    if table_exists(conn, 'monthly_rollups'):
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(ROLLUP_TABLE_SQL)
+        conn.execute(BACKFILL_SQL.format(where=''))
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def rebuild(conn, user_id=None):
+    """Recompute the rollups from the transactions table"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if user_id is None:
+            conn.execute('DELETE FROM monthly_rollups')
+            conn.execute(BACKFILL_SQL.format(where=''))
+        else:
+            conn.execute('DELETE FROM monthly_rollups WHERE user_id = ?', (user_id,))
+            conn.execute(BACKFILL_SQL.format(where='WHERE user_id = ?'), (user_id,))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def monthly_totals(conn, user_id, since_month=None, limit=None):
+    """Income and expense per month, newest first"""
+    query = '''
+        SELECT
+            month,
+            SUM(CASE WHEN type = 'income' THEN total_cents ELSE 0 END) / 100.0 as income,
+            SUM(CASE WHEN type = 'expense' THEN total_cents ELSE 0 END) / 100.0 as expense
+        FROM monthly_rollups
+        WHERE user_id = ?
+    '''
+    params = [user_id]
+    if since_month:
+        query += ' AND month >= ?'
+        params.append(since_month)
+    query += ' GROUP BY month ORDER BY month DESC'
+    if limit:
+        query += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def type_totals(conn, user_id):
+    """All-time (income, expense) totals"""
+    row = conn.execute('''
+        SELECT
+            SUM(CASE WHEN type = 'income' THEN total_cents ELSE 0 END) / 100.0,
+            SUM(CASE WHEN type = 'expense' THEN total_cents ELSE 0 END) / 100.0
+        FROM monthly_rollups
+        WHERE user_id = ?
+    ''', (user_id,)).fetchone()
+    return row[0] or 0, row[1] or 0
+
+
+def category_spending(conn, user_id, since_month=None, limit=None):
+    """Expense total and count per category, largest first"""
+    query = '''
+        SELECT c.name, SUM(r.total_cents) / 100.0 as total, SUM(r.count) as count
+        FROM monthly_rollups r
+        JOIN categories c ON r.category_id = c.id
+        WHERE r.user_id = ? AND r.type = 'expense'
+    '''
+    params = [user_id]
+    if since_month:
+        query += ' AND r.month >= ?'
+        params.append(since_month)
+    query += ' GROUP BY c.id, c.name ORDER BY total DESC'
+    if limit:
+        query += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def category_averages(conn, user_id, min_count=3):
+    """All-time average, min and max expense per category"""
+    return conn.execute('''
+        SELECT
+            c.name,
+            SUM(r.total_cents) / 100.0 / SUM(r.count) as avg_amount,
+            MIN(r.min_amount) as min_amount,
+            MAX(r.max_amount) as max_amount
+        FROM monthly_rollups r
+        JOIN categories c ON r.category_id = c.id
+        WHERE r.user_id = ? AND r.type = 'expense'
+        GROUP BY c.id, c.name
+        HAVING SUM(r.count) >= ?
+        ORDER BY avg_amount DESC
+    ''', (user_id, min_count)).fetchall()
+
+
+def transaction_count(conn, user_id):
+    """Number of transactions the user has"""
+    return conn.execute(
+        'SELECT COALESCE(SUM(count), 0) FROM monthly_rollups WHERE user_id = ?',
+        (user_id,)
+    ).fetchone()[0]
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    install(conn)
+    rebuild(conn)
+    rows = conn.execute('SELECT COUNT(*) FROM monthly_rollups').fetchone()[0]
+    conn.close()
+    print(f"✅ Rebuilt monthly rollups ({rows} rows)")
@@ -0,0 +1,260 @@
+"""
+Full-text search for the Expense Tracker
+Indexes transaction descriptions and category names in an FTS5 table that
+triggers keep in sync with `transactions` and `categories`. Numbers and dates
+are not looked up in the text index; they go through the regular indexes.
+
+Run this script directly to rebuild the index from scratch:
+    python search_index.py
+"""
+
+import os
+import re
+import sqlite3
+from datetime import date
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+# The owner is stored as an indexed token ("u42") so a per-user search is an
+# intersection of two posting lists rather than a filter over every match.
+FTS_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description,
+        category_name,
+        owner,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+'''
+
+BACKFILL_SQL = '''
+    INSERT INTO transactions_fts (rowid, description, category_name, owner)
+    SELECT t.id, t.description, c.name, 'u' || t.user_id
+    FROM transactions t
+    LEFT JOIN categories c ON t.category_id = c.id
+'''
+
+TRIGGERS = {
+    'trg_fts_transactions_insert': '''
+        CREATE TRIGGER IF NOT EXISTS trg_fts_transactions_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category_name, owner)
+            VALUES (NEW.id, NEW.description,
+                    (SELECT name FROM categories WHERE id = NEW.category_id),
+                    'u' || NEW.user_id);
+        END
+    ''',
+    'trg_fts_transactions_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_fts_transactions_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM transactions_fts WHERE rowid = OLD.id;
+        END
+    ''',
+    'trg_fts_transactions_update': '''
+        CREATE TRIGGER IF NOT EXISTS trg_fts_transactions_update
+        AFTER UPDATE OF description, category_id, user_id ON transactions
+        BEGIN
+            UPDATE transactions_fts SET
+                description = NEW.description,
+                category_name = (SELECT name FROM categories WHERE id = NEW.category_id),
+                owner = 'u' || NEW.user_id
+            WHERE rowid = NEW.id;
+        END
+    ''',
+    'trg_fts_categories_update': '''
+        CREATE TRIGGER IF NOT EXISTS trg_fts_categories_update
+        AFTER UPDATE OF name ON categories
+        BEGIN
+            UPDATE transactions_fts SET category_name = NEW.name
+            WHERE rowid IN (SELECT id FROM transactions
+                            WHERE user_id = NEW.user_id AND category_id = NEW.id);
+        END
+    ''',
+    'trg_fts_categories_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_fts_categories_delete
+        AFTER DELETE ON categories
+        BEGIN
+            UPDATE transactions_fts SET category_name = NULL
+            WHERE rowid IN (SELECT id FROM transactions
+                            WHERE user_id = OLD.user_id AND category_id = OLD.id);
+        END
+    ''',
+}
+
+AMOUNT_PATTERN = re.compile(r'^\d+(?:[.,](\d{1,2}))?$')
+DATE_PATTERN = re.compile(r'^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?$')
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def fts5_available(conn):
+    """Check whether this SQLite build has the FTS5 extension"""
+    try:
+        conn.execute('CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)')
+        conn.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def install(conn):
+    """Create the FTS table and its triggers, backfilling existing databases"""
+    if not fts5_available(conn):
+        return False
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+    ).fetchone()
+    if exists:
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        return True
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(FTS_TABLE_SQL)
+        conn.execute(BACKFILL_SQL)
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return True
+
+
+def rebuild(conn):
+    """Recreate the index contents from transactions and categories"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM transactions_fts')
+        conn.execute(BACKFILL_SQL)
+        conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('optimize')")
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def fts_query(user_id, text):
+    """Build an FTS5 MATCH expression: every word as a prefix, scoped to the user"""
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    terms = ' AND '.join('"{}"*'.format(word.replace('"', '')) for word in words)
+    return f'owner:u{int(user_id)} AND {{description category_name}}: ({terms})'
+
+
+def date_bounds(text):
+    """Half-open date range for 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD', else None"""
+    match = DATE_PATTERN.match(text)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    try:
+        if day:
+            start = date(int(year), int(month), int(day))
+            return start.isoformat(), date.fromordinal(start.toordinal() + 1).isoformat()
+        if month:
+            start = date(int(year), int(month), 1)
+            end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+            return start.isoformat(), end.isoformat()
+        return date(int(year), 1, 1).isoformat(), date(int(year) + 1, 1, 1).isoformat()
+    except ValueError:
+        return None
+
+
+def amount_bounds(text):
+    """Half-open range in cents matched by a number: '25' finds 25.00-25.99, '25.5' finds 25.50-25.59"""
+    match = AMOUNT_PATTERN.match(text)
+    if not match:
+        return None
+    decimals = match.group(1) or ''
+    cents = int(text[:len(text) - len(decimals)].rstrip('.,')) * 100 + int(decimals.ljust(2, '0'))
+    step = 10 ** (2 - len(decimals))
+    return cents, cents + step
+
+
+def search(conn, user_id, text, page=1, per_page=50):
+    """Search a user's transactions, returning (rows, total).
+
+    Rows are plain transaction rows; category names are filled in by the
+    caller from the category directory.
+    """
+    offset = (max(page, 1) - 1) * per_page
+    fts_join = ''
+
+    # Date and amount searches go through the (user_id, ...) indexes
+    date_range = date_bounds(text)
+    amount_range = amount_bounds(text)
+    if date_range:
+        where = 't.user_id = ? AND t.date >= ? AND t.date < ?'
+        params = [user_id, *date_range]
+        order = 't.date DESC, t.id DESC'
+    elif amount_range:
+        where = 't.user_id = ? AND t.amount_cents >= ? AND t.amount_cents < ?'
+        params = [user_id, *amount_range]
+        order = 't.date DESC, t.id DESC'
+    else:
+        match = fts_query(user_id, text)
+        if match is None:
+            return [], 0
+        # Ranked by bm25 relevance, then newest first
+        fts_join = 'JOIN transactions_fts f ON f.rowid = t.id'
+        where = 'transactions_fts MATCH ? AND t.user_id = ?'
+        params = [match, user_id]
+        order = 'f.rank, t.date DESC, t.id DESC'
+
+    try:
+        total = conn.execute(
+            f'SELECT COUNT(*) FROM transactions t {fts_join} WHERE {where}', params
+        ).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT t.*
+            FROM transactions t
+            {fts_join}
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        ''', params + [per_page, offset]).fetchall()
+    except sqlite3.OperationalError:
+        if not fts_join:
+            raise
+        # No FTS5 in this SQLite build: fall back to a substring scan
+        return like_search(conn, user_id, text, per_page, offset)
+    return rows, total
+
+
+def like_search(conn, user_id, text, limit, offset):
+    """Unindexed LIKE search, used only when FTS5 is unavailable"""
+    pattern = f'%{text}%'
+    where = 't.user_id = ? AND (t.description LIKE ? OR c.name LIKE ?)'
+    params = [user_id, pattern, pattern]
+    total = conn.execute(f'''
+        SELECT COUNT(*) FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE {where}
+    ''', params).fetchone()[0]
+    rows = conn.execute(f'''
+        SELECT t.*
+        FROM transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE {where}
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT ? OFFSET ?
+    ''', params + [limit, offset]).fetchall()
+    return rows, total
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    if not install(conn):
+        print("❌ This SQLite build has no FTS5 support")
+    else:
+        rebuild(conn)
+        rows = conn.execute('SELECT COUNT(*) FROM transactions_fts').fetchone()[0]
+        print(f"✅ Rebuilt search index ({rows} transactions)")
+    conn.close()
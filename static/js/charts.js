@@ -445,6 +445,181 @@ class ExpenseChart {
         const centerY = this.canvas.height / 2;
         this.drawText('No data available', centerX, centerY, 'bold 16px Arial', '#666', 'center');
     }
+
+    // Fetch just the buckets being drawn from /api/series and chart them.
+    // Without start/end the server returns its default window ending today.
+    loadSeries(url, granularity, start, end) {
+        const params = new URLSearchParams({granularity: granularity});
+        if (start) {
+            params.set('start', start);
+        }
+        if (end) {
+            params.set('end', end);
+        }
+        return fetch(url + '?' + params.toString())
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    throw new Error(data.error);
+                }
+                this.drawMonthlyChart(data.buckets.map(bucket => ({
+                    month: bucket.period,
+                    income: bucket.income,
+                    expense: bucket.expense
+                })));
+                return data;
+            });
+    }
+}
+
+// Patches the dashboard in place from the /events stream (see live_updates.py).
+// Every event carries whole values, so applying one twice is harmless.
+class DashboardUpdates {
+    constructor(root, chart) {
+        this.root = root;
+        this.chart = chart;
+    }
+
+    connect() {
+        // EventSource reconnects on its own and resumes from the last event id
+        this.source = new EventSource(this.root.dataset.eventsUrl);
+        this.source.addEventListener('totals', e => this.updateTotals(JSON.parse(e.data)));
+        this.source.addEventListener('transaction', e => this.addTransaction(JSON.parse(e.data)));
+        this.source.addEventListener('recent', e => this.replaceTransactions(JSON.parse(e.data)));
+        this.source.addEventListener('alerts', e => this.updateAlerts(JSON.parse(e.data)));
+        this.source.addEventListener('recurring', e => this.updateRecurring(JSON.parse(e.data)));
+    }
+
+    money(amount) {
+        return `€${Number(amount).toFixed(2)}`;
+    }
+
+    url(name, id) {
+        return this.root.dataset[name].replace(/0$/, id);
+    }
+
+    element(tag, text, className) {
+        const element = document.createElement(tag);
+        if (text !== undefined) {
+            element.textContent = text;
+        }
+        if (className) {
+            element.className = className;
+        }
+        return element;
+    }
+
+    updateTotals(data) {
+        document.getElementById('total-income').textContent = this.money(data.total_income);
+        document.getElementById('total-expense').textContent = this.money(data.total_expense);
+        document.getElementById('balance').textContent = this.money(data.balance);
+
+        // monthlyData is also what the resize handler redraws from
+        monthlyData.splice(0, monthlyData.length, ...data.monthly_data);
+        const overview = document.getElementById('monthly-overview');
+        overview.hidden = monthlyData.length === 0;
+        if (monthlyData.length > 0) {
+            this.chart = this.chart || new ExpenseChart('expenseChart');
+            this.chart.drawMonthlyChart(monthlyData);
+        }
+    }
+
+    transactionRow(transaction) {
+        const row = document.createElement('tr');
+        row.dataset.id = transaction.id;
+        row.dataset.date = transaction.date;
+        row.appendChild(this.element('td', transaction.date));
+        row.appendChild(this.element('td', transaction.description || 'No description'));
+        row.appendChild(this.element('td', transaction.category_name || 'No category'));
+
+        const type = this.element('td');
+        const label = this.element('span', transaction.type === 'income' ? 'Income' : 'Expense');
+        label.style.color = transaction.type === 'income' ? '#2ecc71' : '#e74c3c';
+        type.appendChild(label);
+        row.appendChild(type);
+        row.appendChild(this.element('td', this.money(transaction.amount), `amount-${transaction.type}`));
+
+        const actions = this.element('td');
+        const edit = this.element('a', 'Edit', 'btn btn-small btn-secondary');
+        edit.href = this.url('editUrl', transaction.id);
+        const remove = this.element('a', 'Delete', 'btn btn-small btn-danger');
+        remove.href = this.url('deleteUrl', transaction.id);
+        remove.onclick = () => confirm('Are you sure you want to delete this transaction?');
+        actions.append(edit, ' ', remove);
+        row.appendChild(actions);
+        return row;
+    }
+
+    showTransactions(tbody) {
+        const empty = tbody.children.length === 0;
+        document.getElementById('recent-transactions').hidden = empty;
+        document.getElementById('no-transactions').hidden = !empty;
+    }
+
+    addTransaction(data) {
+        const tbody = document.querySelector('#recent-transactions tbody');
+        const transaction = data.transaction;
+        if (tbody.querySelector(`tr[data-id="${transaction.id}"]`)) {
+            return;
+        }
+        // Rows are ordered newest first: by date, then by id
+        const row = this.transactionRow(transaction);
+        row.classList.add('fade-in');
+        const next = Array.from(tbody.children).find(other =>
+            other.dataset.date < transaction.date ||
+            (other.dataset.date === transaction.date && Number(other.dataset.id) < transaction.id));
+        tbody.insertBefore(row, next || null);
+        while (tbody.children.length > data.limit) {
+            tbody.lastElementChild.remove();
+        }
+        this.showTransactions(tbody);
+    }
+
+    replaceTransactions(data) {
+        const tbody = document.querySelector('#recent-transactions tbody');
+        tbody.replaceChildren(...data.transactions.map(transaction => this.transactionRow(transaction)));
+        this.showTransactions(tbody);
+    }
+
+    updateAlerts(data) {
+        const cards = data.alerts.map(alert => {
+            const card = this.element('div', undefined, `alert-card ${alert.type}`);
+            card.dataset.budgetId = alert.budget_id;
+            if (data.crossed.includes(alert.budget_id)) {
+                card.classList.add('fade-in');
+            }
+            card.appendChild(this.element('div', alert.type === 'danger' ? '🚨' : '⚠️', 'alert-icon'));
+            const content = this.element('div', undefined, 'alert-content');
+            content.append(this.element('strong', alert.category || ''), this.element('div', alert.message));
+            card.appendChild(content);
+            card.appendChild(this.element('div', `${Math.round(alert.percentage)}%`, 'alert-percentage'));
+            return card;
+        });
+        const section = document.getElementById('budget-alerts');
+        section.querySelector('.alerts-grid').replaceChildren(...cards);
+        section.hidden = cards.length === 0;
+    }
+
+    updateRecurring(data) {
+        const items = data.items.map(recurring => {
+            const item = this.element('div', undefined, 'pending-item');
+            item.dataset.recurringId = recurring.id;
+            if (data.new.includes(recurring.id)) {
+                item.classList.add('fade-in');
+            }
+            const info = this.element('div', undefined, 'pending-info');
+            info.append(this.element('strong', recurring.title),
+                        this.element('span', `Due: ${recurring.next_date}`, 'pending-date'));
+            const execute = this.element('a', 'Execute', 'btn btn-small btn-success');
+            execute.href = this.url('executeUrl', recurring.id);
+            item.append(info, this.element('div', this.money(recurring.amount), 'pending-amount'), execute);
+            return item;
+        });
+        const section = document.getElementById('pending-recurring');
+        section.querySelector('.recurring-pending').replaceChildren(...items);
+        document.getElementById('pending-recurring-count').textContent = data.count;
+        section.hidden = items.length === 0;
+    }
 }
 
 // Initialize chart when page loads
@@ -0,0 +1,80 @@
+"""
+Shared fixtures for the Expense Tracker tests
+Every test gets its own database file; the app's per-worker registries
+(connection pool, caches, category directory, column store) are keyed on
+the database path and the process id, so nothing leaks between tests.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as tracker  # noqa: E402
+import db  # noqa: E402
+
+_DEFAULT_CONFIG = dict(tracker.app.config)
+
+
+@pytest.fixture
+def app(tmp_path):
+    tracker.app.config.update(_DEFAULT_CONFIG)
+    tracker.app.config.update(
+        DATABASE=str(tmp_path / 'tracker.db'),
+        TESTING=True,
+        CACHE_PATH=str(tmp_path / 'cache.db'),
+        JOBS_DIR=str(tmp_path / 'jobs'),
+    )
+    tracker._schema_ready = False
+    with tracker.app.app_context():
+        tracker.init_db()
+    yield tracker.app
+    tracker.app.config.update(_DEFAULT_CONFIG)
+
+
+def register(client, username='alice', password='secret1'):
+    client.post('/register', data=dict(username=username, email=f'{username}@example.com',
+                                       password=password, confirm_password=password))
+    client.post('/login', data=dict(username=username, password=password))
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as a fresh user (id 1, default categories)"""
+    client = app.test_client()
+    register(client)
+    return client
+
+
+@pytest.fixture
+def conn(app):
+    """A direct autocommit connection to the test database"""
+    conn = db.connect(app.config['DATABASE'])
+    conn.isolation_level = None
+    yield conn
+    conn.close()
+
+
+def add_transaction(conn, day, amount_cents, type_='expense', category_id=None, user_id=1,
+                    description='test'):
+    return conn.execute(
+        'INSERT INTO transactions (date, amount_cents, type, category_id, description, user_id) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (day, amount_cents, type_, category_id, description, user_id)
+    ).lastrowid
+
+
+@contextmanager
+def other_worker(monkeypatch):
+    """Run the enclosed code as if in another gunicorn worker.
+
+    The per-worker registries are keyed on os.getpid(), so a different pid
+    gives fresh pools, caches, directories and column stores.
+    """
+    real_getpid = os.getpid
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'getpid', lambda: real_getpid() + 100000)
+        yield
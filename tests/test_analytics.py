@@ -0,0 +1,117 @@
+"""Analytics computed from the monthly rollups"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import analytics_engine
+from conftest import add_transaction
+
+# The per-insight queries the analytics page ran before the single-pass
+# engine, with `date('now', ...)` replaced by the engine's windows: rollup
+# windows start on the 1st of the month, the top days window on the day.
+OLD_QUERIES = {
+    'category_spending': '''
+        SELECT c.name, SUM(t.amount) as total, COUNT(t.id) as count
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        WHERE t.type = 'expense' AND t.user_id = :user_id
+        AND date >= date(:today, 'start of month', '-6 months')
+        GROUP BY c.id, c.name
+        ORDER BY total DESC
+        LIMIT 10
+    ''',
+    'monthly_trends': '''
+        SELECT strftime('%Y-%m', date) as month,
+               SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+               SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
+        FROM transactions
+        WHERE user_id = :user_id
+        AND date >= date(:today, 'start of month', '-12 months')
+        GROUP BY strftime('%Y-%m', date)
+        ORDER BY month DESC
+        LIMIT 12
+    ''',
+    'top_spending_days': '''
+        SELECT date, SUM(amount) as daily_expense
+        FROM transactions
+        WHERE type = 'expense' AND user_id = :user_id
+        AND date >= date(:today, '-3 months')
+        GROUP BY date
+        ORDER BY daily_expense DESC
+        LIMIT 10
+    ''',
+    'avg_spending': '''
+        SELECT c.name, AVG(t.amount) as avg_amount, MIN(t.amount) as min_amount,
+               MAX(t.amount) as max_amount
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        WHERE t.type = 'expense' AND t.user_id = :user_id
+        GROUP BY c.id, c.name
+        HAVING COUNT(t.id) >= 3
+        ORDER BY avg_amount DESC
+    ''',
+    'savings_data': '''
+        SELECT strftime('%Y-%m', date) as month,
+               SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+               SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expense
+        FROM transactions
+        WHERE user_id = :user_id
+        AND date >= date(:today, 'start of month', '-6 months')
+        GROUP BY strftime('%Y-%m', date)
+        ORDER BY month DESC
+    ''',
+}
+
+
+def rounded(rows):
+    return [tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in rows]
+
+
+@pytest.mark.parametrize('today', [date(2025, 8, 31), date(2025, 3, 1), date(2024, 2, 29)])
+def test_matches_the_per_insight_queries(client, conn, today):
+    rng = random.Random(today.toordinal())
+    categories = [row[0] for row in conn.execute('SELECT id FROM categories WHERE user_id = 1')] + [None]
+    for _ in range(600):
+        day = today - timedelta(days=rng.randint(-60, 600))
+        # Distinct amounts so no two categories or days tie in the orderings
+        add_transaction(conn, day.isoformat(), rng.randint(100, 50000) * 10 + rng.randint(0, 9),
+                        rng.choice(['income', 'expense', 'expense']), rng.choice(categories),
+                        user_id=rng.choice([1, 1, 1, 2]))
+    names = dict(conn.execute('SELECT id, name FROM categories WHERE user_id = 1').fetchall())
+
+    result = analytics_engine.compute(conn, 1, today, names).to_dict()
+
+    params = {'user_id': 1, 'today': today.isoformat()}
+    for insight, query in OLD_QUERIES.items():
+        expected = rounded(conn.execute(query, params).fetchall())
+        assert rounded(tuple(row.values()) for row in result[insight]) == expected, insight
+    total = conn.execute('SELECT COUNT(*) FROM transactions WHERE user_id = 1').fetchone()[0]
+    assert result['total_transactions'] == total
+    rates = [(income - expense) / income * 100
+             for _, income, expense in conn.execute(OLD_QUERIES['savings_data'], params) if income > 0]
+    assert result['avg_savings_rate'] == pytest.approx(sum(rates) / len(rates))
+
+
+def test_top_days_window_follows_today(client, conn):
+    add_transaction(conn, '2023-12-31', 5000)
+    add_transaction(conn, '2024-02-10', 2000)
+    add_transaction(conn, '2024-03-30', 1000)
+    add_transaction(conn, '2024-04-01', 9000)
+
+    result = analytics_engine.compute(conn, 1, date(2024, 3, 31), {})
+
+    # date('2024-03-31', '-3 months') is 2023-12-31 in SQLite
+    assert [day.date for day in result.top_spending_days] == ['2024-04-01', '2023-12-31',
+                                                               '2024-02-10', '2024-03-30']
+    result = analytics_engine.compute(conn, 1, date(2024, 4, 1), {})
+    assert '2023-12-31' not in [day.date for day in result.top_spending_days]
+
+
+def test_months_before_matches_sqlite(conn):
+    for day in ['2024-03-31', '2024-05-31', '2024-01-15', '2023-02-28', '2024-02-29']:
+        expected = conn.execute("SELECT date(?, '-3 months')", (day,)).fetchone()[0]
+        assert analytics_engine.months_before(date.fromisoformat(day), 3).isoformat() == expected
+
@@ -0,0 +1,90 @@
+"""Running balance checkpoints and the balance APIs"""
+
+import random
+from datetime import date, timedelta
+
+import balances
+from conftest import add_transaction
+
+
+def expected_checkpoints(conn, user_id):
+    expected, running = {}, 0
+    for day, net, count in conn.execute('''
+        SELECT date, SUM(CASE WHEN type = 'income' THEN amount_cents ELSE -amount_cents END), COUNT(*)
+        FROM transactions WHERE user_id = ? GROUP BY date ORDER BY date
+    ''', (user_id,)):
+        running += net
+        expected[day] = (net, running, count)
+    return expected
+
+
+def stored_checkpoints(conn, user_id):
+    return {row[0]: tuple(row[1:]) for row in conn.execute(
+        'SELECT date, net_cents, balance_cents, count FROM balance_checkpoints WHERE user_id = ?', (user_id,))}
+
+
+def test_triggers_follow_random_writes(client, conn):
+    rng = random.Random(5)
+
+    def day():
+        return f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+
+    for _ in range(400):
+        ids = [row[0] for row in conn.execute('SELECT id FROM transactions')]
+        op = rng.random()
+        if op < 0.5 or not ids:
+            add_transaction(conn, day(), rng.randint(1, 10000), rng.choice(['income', 'expense']),
+                            user_id=rng.choice([1, 2]))
+        elif op < 0.85:
+            conn.execute('UPDATE transactions SET date = ?, amount_cents = ?, type = ?, user_id = ? WHERE id = ?',
+                         (day(), rng.randint(1, 10000), rng.choice(['income', 'expense']),
+                          rng.choice([1, 2]), rng.choice(ids)))
+        else:
+            conn.execute('DELETE FROM transactions WHERE id = ?', (rng.choice(ids),))
+
+    for user_id in (1, 2):
+        assert stored_checkpoints(conn, user_id) == expected_checkpoints(conn, user_id)
+
+    before = stored_checkpoints(conn, 1)
+    balances.rebuild(conn)
+    assert stored_checkpoints(conn, 1) == before
+
+
+def test_balance_lookups(client, conn):
+    add_transaction(conn, '2025-01-10', 10000, 'income')
+    add_transaction(conn, '2025-01-15', 2500)
+    add_transaction(conn, '2025-01-05', 500)
+    assert balances.balance_at(conn, 1, '2025-01-04') == 0
+    assert balances.balance_at(conn, 1, '2025-01-12') == 95
+    assert balances.balance_at(conn, 1, '2099-01-01') == 70
+    series = dict(balances.daily_balances(conn, 1, '2025-01-04', '2025-01-16'))
+    assert len(series) == 13 and series['2025-01-09'] == -5 and series['2025-01-16'] == 70
+    assert balances.balance_range(conn, 1, '2025-01-01', '2025-01-31') == {
+        'min': -5, 'min_date': '2025-01-05', 'max': 95, 'max_date': '2025-01-10'}
+
+
+def test_history_api(client, conn):
+    add_transaction(conn, '2025-01-10', 10000, 'income')
+    data = client.get('/api/balance/history?start=2025-01-09&end=2025-01-11').get_json()
+    assert [point['balance'] for point in data['balances']] == [0, 100, 100]
+    assert client.get('/api/balance?date=2025-01-10').get_json()['balance'] == 100
+
+
+def test_history_up_to_the_last_representable_day(client, conn):
+    add_transaction(conn, '9999-12-30', 100, 'income')
+    end = date.max.isoformat()
+    start = (date.max - timedelta(days=3)).isoformat()
+    response = client.get(f'/api/balance/history?start={start}&end={end}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [point['date'] for point in data['balances']][-1] == end
+    assert data['max'] == 1
+    assert client.get(f'/api/balance?date={end}').get_json()['balance'] == 1
+
+
+def test_history_rejects_bad_input(client):
+    assert client.get('/api/balance/history?start=nope').status_code == 400
+    assert client.get('/api/balance/history?start=2025-02-01&end=2025-01-01').status_code == 400
+    assert client.get('/api/balance/history?start=1990-01-01&end=2025-01-01').status_code == 400
+    # The default start would fall before date.min
+    assert client.get('/api/balance/history?end=0001-01-05').status_code == 400
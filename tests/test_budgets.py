@@ -0,0 +1,78 @@
+"""Budget evaluation against the monthly rollups"""
+
+import random
+
+import budget_engine
+from conftest import add_transaction, register
+
+PER_BUDGET_SPENT = '''
+    SELECT COALESCE(SUM(amount_cents), 0) / 100.0 FROM transactions
+    WHERE user_id = ? AND type = 'expense' AND category_id = ?
+      AND strftime('%Y-%m', date) = ?
+'''
+
+
+def add_budget(conn, month, category_id, limit_cents, user_id=1):
+    conn.execute('INSERT INTO budgets (month, category_id, amount_limit_cents, user_id) '
+                 'VALUES (?, ?, ?, ?)', (month, category_id, limit_cents, user_id))
+
+
+def test_grouped_query_matches_per_budget_sums(client, conn):
+    register(client, 'bob')
+    rng = random.Random(4)
+    months = ['2025-01', '2025-02', '2025-03']
+    categories = {user_id: [row[0] for row in conn.execute(
+        'SELECT id FROM categories WHERE user_id = ?', (user_id,))] for user_id in (1, 2)}
+    for _ in range(300):
+        user_id = rng.choice((1, 2))
+        add_transaction(conn, f'{rng.choice(months)}-{rng.randint(1, 28):02d}',
+                        rng.randint(1, 20000), type_=rng.choice(('expense', 'expense', 'income')),
+                        category_id=rng.choice(categories[user_id] + [None]), user_id=user_id)
+    for user_id in (1, 2):
+        for month in months:
+            for category_id in rng.sample(categories[user_id], 3) + [None]:
+                add_budget(conn, month, category_id, rng.randint(1000, 50000), user_id)
+
+    for user_id in (1, 2):
+        statuses = budget_engine.budget_status(conn, user_id)
+        assert len(statuses) == len(months) * 4
+        for status in statuses:
+            budget = status['budget']
+            expected = conn.execute(PER_BUDGET_SPENT, (
+                user_id, budget['category_id'], budget['month'])).fetchone()[0]
+            assert status['spent'] == expected, tuple(budget)
+            assert status['remaining'] == budget['amount_limit'] - expected
+
+
+def test_budget_without_category_counts_nothing(client, conn):
+    add_transaction(conn, '2025-06-01', 5000)
+    add_budget(conn, '2025-06', None, 1000)
+    [status] = budget_engine.budget_status(conn, 1, '2025-06', '2025-06')
+    assert status['spent'] == 0
+    assert status['alert'] is None
+
+
+def test_month_range_selects_budgets(client, conn):
+    category_id = conn.execute('SELECT id FROM categories WHERE user_id = 1').fetchone()[0]
+    for month in ('2025-04', '2025-05', '2025-06'):
+        add_budget(conn, month, category_id, 1000)
+    months = [status['month'] for status in budget_engine.budget_status(conn, 1, '2025-05', '2025-06')]
+    assert months == ['2025-06', '2025-05']
+
+
+def test_budgets_page_evaluates_only_the_shown_month(client, conn, monkeypatch):
+    category_id = conn.execute('SELECT id FROM categories WHERE user_id = 1').fetchone()[0]
+    add_budget(conn, '2025-05', category_id, 1000)
+    add_budget(conn, '2025-06', category_id, 2000)
+    calls = []
+    evaluate = budget_engine.budget_status
+
+    def spy(conn, user_id, *months):
+        calls.append(months)
+        return evaluate(conn, user_id, *months)
+
+    monkeypatch.setattr(budget_engine, 'budget_status', spy)
+    response = client.get('/budgets?month=2025-06')
+    assert response.status_code == 200
+    assert calls == [('2025-06', '2025-06')]
+    assert b'2025-05' in response.data
@@ -0,0 +1,46 @@
+"""Result cache and the per-user write versions it is keyed on"""
+
+from datetime import date
+
+import cache
+from conftest import other_worker
+
+
+def add(client, amount, type_='expense'):
+    return client.post('/add', data=dict(date=date.today().isoformat(), amount=amount, type=type_,
+                                         category_id='', description='test'))
+
+
+def test_write_bumps_version_in_database(app, client, conn):
+    assert cache.version(conn, 1) > 0
+    before = cache.version(conn, 1)
+    add(client, '12.50')
+    assert cache.version(conn, 1) == before + 1
+
+
+def test_repeat_views_hit_the_cache(app, client):
+    client.get('/')
+    result_cache = cache.get_cache(app)
+    hits = result_cache.hits
+    client.get('/')
+    assert result_cache.hits == hits + 1
+
+
+def test_write_in_one_worker_invalidates_another(app, client, monkeypatch):
+    with other_worker(monkeypatch):
+        assert '€0.00' in client.get('/').get_data(as_text=True)
+
+    add(client, '12.50')
+
+    with other_worker(monkeypatch):
+        page = client.get('/').get_data(as_text=True)
+    assert 'id="total-expense">€12.50' in page
+
+
+def test_sqlite_backend_shares_entries(app, client, monkeypatch):
+    app.config['CACHE_BACKEND'] = 'sqlite'
+    client.get('/')
+    with other_worker(monkeypatch):
+        result_cache = cache.get_cache(app)
+        client.get('/')
+        assert result_cache.hits == 1
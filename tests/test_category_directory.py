@@ -0,0 +1,52 @@
+"""Per-worker category directory"""
+
+import app as tracker
+import cache
+import category_directory
+from conftest import other_worker
+
+
+def names(app, conn, user_id=1):
+    with app.app_context():
+        return set(tracker.user_categories(conn, user_id).names.values())
+
+
+def test_lookup_is_cached_until_categories_change(app, client, conn):
+    directory = category_directory.get_directory(app)
+    assert 'Salary' in names(app, conn)
+    misses = directory.misses
+    names(app, conn)
+    assert directory.misses == misses
+
+    client.post('/categories/add', data={'name': 'Garden'})
+    assert 'Garden' in names(app, conn)
+
+
+def test_other_writes_keep_the_entry(app, client, conn):
+    directory = category_directory.get_directory(app)
+    names(app, conn)
+    misses = directory.misses
+    client.post('/add', data=dict(date='2025-01-01', amount='5', type='expense',
+                                  category_id='', description='x'))
+    names(app, conn)
+    assert directory.misses == misses
+
+
+def test_category_added_in_another_worker_is_seen(app, client, conn, monkeypatch):
+    assert 'Garden' not in names(app, conn)
+
+    with other_worker(monkeypatch):
+        client.post('/categories/add', data={'name': 'Garden'})
+
+    assert 'Garden' in names(app, conn)
+    page = client.get('/add').get_data(as_text=True)
+    assert 'Garden' in page
+
+
+def test_entry_follows_the_database_version(app, conn):
+    directory = category_directory.CategoryDirectory()
+    entry = directory.get(conn, 1, cache.version(conn, 1))
+    conn.execute("INSERT INTO categories (name, user_id) VALUES ('Pets', 1)")
+    assert directory.get(conn, 1, cache.version(conn, 1)) is entry
+    cache.bump(conn, 1)
+    assert 'Pets' in directory.get(conn, 1, cache.version(conn, 1)).names.values()
@@ -0,0 +1,98 @@
+"""NumPy column store for heavy users' analytics"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import analytics_engine
+import cache
+import columnar_store
+from conftest import add_transaction, other_worker
+
+pytestmark = pytest.mark.skipif(columnar_store.np is None, reason='NumPy is not installed')
+
+
+@pytest.fixture
+def store_app(app):
+    app.config.update(COLUMNAR_STORE=True, COLUMNAR_MIN_ROWS=1, CACHE_BACKEND=None)
+    return app
+
+
+def fill(conn, count=400, seed=1):
+    rng = random.Random(seed)
+    categories = [row[0] for row in conn.execute('SELECT id FROM categories WHERE user_id = 1')] + [None]
+    for _ in range(count):
+        day = date.today() - timedelta(days=rng.randint(0, 500))
+        add_transaction(conn, day.isoformat(), rng.randint(100, 50000), rng.choice(['income', 'expense']),
+                        rng.choice(categories))
+
+
+def test_matches_analytics_engine(store_app, client, conn):
+    fill(conn)
+    names = dict(conn.execute('SELECT id, name FROM categories WHERE user_id = 1').fetchall())
+    expected = analytics_engine.compute(conn, 1, date.today(), names).to_dict()
+    store = columnar_store.get_store(store_app)
+    assert store.analytics(conn, 1, cache.version(conn, 1), date.today()).to_dict() == expected
+
+
+def test_top_days_match_analytics_engine_on_a_past_day(conn):
+    for day, cents in [('2023-12-31', 5000), ('2024-01-05', 700), ('2024-03-30', 1000)]:
+        add_transaction(conn, day, cents)
+    today = date(2024, 3, 31)
+    columns = columnar_store.UserColumns.load(conn, 1, cache.version(conn, 1))
+    assert (columnar_store.compute(columns, today).top_spending_days
+            == analytics_engine.compute(conn, 1, today, {}).top_spending_days)
+
+
+def test_added_transaction_is_appended(store_app, client, conn):
+    fill(conn, 50)
+    store = columnar_store.get_store(store_app)
+    before = client.get('/api/analytics').get_json()['total_transactions']
+    columns = store.users[1]
+    client.post('/add', data=dict(date=date.today().isoformat(), amount='7.25', type='expense',
+                                  category_id='', description='x'))
+    assert client.get('/api/analytics').get_json()['total_transactions'] == before + 1
+    assert store.users[1] is columns
+
+
+def test_appended_rows_keep_the_stored_cents(store_app, client, conn):
+    fill(conn, 50)
+    store = columnar_store.get_store(store_app)
+    client.get('/api/analytics')
+    client.post('/add', data=dict(date=date.today().isoformat(), amount='1.005', type='expense',
+                                  category_id='', description='x'))
+    columns = store.users[1]
+    stored = conn.execute('SELECT amount_cents FROM transactions ORDER BY id DESC LIMIT 1').fetchone()[0]
+    assert columns.view('cents')[-1] == stored
+
+
+def test_analytics_are_computed_outside_the_store_lock(store_app, client, conn, monkeypatch):
+    fill(conn, 50)
+    store = columnar_store.get_store(store_app)
+    real_compute = columnar_store.compute
+    held = []
+
+    def compute(columns, today):
+        held.append(store.lock.locked())
+        # Rows appended meanwhile don't show up in the snapshot being computed
+        size = len(columns.view('day'))
+        store.users[1].append([(today.isoformat(), 100, 'expense', None)])
+        assert len(columns.view('day')) == size
+        return real_compute(columns, today)
+
+    monkeypatch.setattr(columnar_store, 'compute', compute)
+    client.get('/api/analytics')
+    assert held == [False]
+
+
+def test_write_in_another_worker_reloads_columns(store_app, client, conn, monkeypatch):
+    fill(conn, 50)
+    with other_worker(monkeypatch):
+        before = client.get('/api/analytics').get_json()['total_transactions']
+
+    client.post('/add', data=dict(date=date.today().isoformat(), amount='7.25', type='expense',
+                                  category_id='', description='x'))
+
+    with other_worker(monkeypatch):
+        assert client.get('/api/analytics').get_json()['total_transactions'] == before + 1
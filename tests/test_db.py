@@ -0,0 +1,96 @@
+"""Pooled, tuned SQLite connections"""
+
+import sqlite3
+import threading
+
+import pytest
+
+import db
+from conftest import add_transaction, other_worker
+
+
+def test_connect_tunes_the_connection(tmp_path):
+    conn = db.connect(str(tmp_path / 'tuned.db'), cache_size_kb=2048)
+    try:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1    # NORMAL
+        assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2     # MEMORY
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == -2048
+    finally:
+        conn.close()
+
+
+def test_connections_are_reused(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), size=2)
+    conn = pool.acquire()
+    conn.close()    # what the routes call; the connection must stay open
+    conn.execute('SELECT 1')
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.close_all()
+
+
+def test_release_rolls_back_uncommitted_work(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), size=1)
+    conn = pool.acquire()
+    conn.execute('CREATE TABLE t (x)')
+    conn.commit()
+    conn.execute('INSERT INTO t VALUES (1)')
+    pool.release(conn)
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_pool_is_bounded(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), size=2, timeout=0.05)
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    # A connection released by another thread frees its slot for the waiter
+    pool.timeout = 5
+    threading.Timer(0.05, pool.release, (second,)).start()
+    assert pool.acquire() is second
+    pool.release(first)
+    pool.release(second)
+    pool.close_all()
+
+
+def test_requests_share_one_connection(client, conn):
+    add_transaction(conn, '2025-06-01', 1000)
+    for _ in range(3):
+        assert client.get('/').status_code == 200
+        assert client.get('/reports').status_code == 200
+    pool = db.get_pool(client.application)
+    assert pool._idle.qsize() == 1
+
+
+def test_each_worker_has_its_own_pool(app, monkeypatch):
+    pool = db.get_pool(app)
+    assert db.get_pool(app) is pool
+    with other_worker(monkeypatch):
+        assert db.get_pool(app) is not pool
+
+
+def test_connections_move_between_threads(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    errors = []
+
+    def borrow():
+        try:
+            borrowed = pool.acquire()
+            borrowed.execute('SELECT 1')
+            pool.release(borrowed)
+        except sqlite3.Error as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join()
+    assert errors == []
+    pool.close_all()
@@ -0,0 +1,87 @@
+"""Goal progress from explicit contributions"""
+
+import random
+
+import goals
+from conftest import add_transaction
+
+
+def add_goal(conn, title, user_id=1):
+    return conn.execute(
+        'INSERT INTO financial_goals (title, target_cents, target_date, user_id) VALUES (?, ?, ?, ?)',
+        (title, 100000, '2030-01-01', user_id)
+    ).lastrowid
+
+
+def totals(conn):
+    return {row[0]: (row[1], row[2]) for row in conn.execute(
+        'SELECT id, saved_cents, contribution_count FROM financial_goals')}
+
+
+def expected_totals(conn):
+    expected = {goal_id: (0, 0) for goal_id in totals(conn)}
+    for goal_id, cents, count in conn.execute('''
+        SELECT c.goal_id, SUM(CASE WHEN t.type = 'income' THEN 1 ELSE -1 END * t.amount_cents), COUNT(*)
+        FROM goal_contributions c JOIN transactions t ON t.id = c.transaction_id
+        GROUP BY c.goal_id
+    '''):
+        expected[goal_id] = (cents, count)
+    return expected
+
+
+def test_triggers_follow_random_writes(client, conn):
+    rng = random.Random(7)
+    goal_ids = [add_goal(conn, f'Goal {number}') for number in range(4)]
+
+    for _ in range(300):
+        ids = [row[0] for row in conn.execute('SELECT id FROM transactions')]
+        op = rng.random()
+        if op < 0.35 or not ids:
+            transaction_id = add_transaction(conn, '2025-01-01', rng.randint(1, 10000),
+                                             rng.choice(['income', 'expense']))
+            goals.link(conn, 1, transaction_id, rng.choice(goal_ids))
+        elif op < 0.55:
+            goals.link(conn, 1, rng.choice(ids), rng.choice(goal_ids + [None]))
+        elif op < 0.8:
+            conn.execute('UPDATE transactions SET amount_cents = ?, type = ? WHERE id = ?',
+                         (rng.randint(1, 10000), rng.choice(['income', 'expense']), rng.choice(ids)))
+        elif op < 0.95:
+            conn.execute('DELETE FROM transactions WHERE id = ?', (rng.choice(ids),))
+        else:
+            goal_id = rng.choice(goal_ids)
+            conn.execute('DELETE FROM financial_goals WHERE id = ?', (goal_id,))
+            goal_ids.remove(goal_id)
+            goal_ids.append(add_goal(conn, f'Goal {goal_id + 10}'))
+
+    assert totals(conn) == expected_totals(conn)
+    assert conn.execute('''
+        SELECT COUNT(*) FROM goal_contributions
+        WHERE goal_id NOT IN (SELECT id FROM financial_goals)
+        OR transaction_id NOT IN (SELECT id FROM transactions)
+    ''').fetchone()[0] == 0
+
+    before = totals(conn)
+    goals.rebuild(conn)
+    assert totals(conn) == before
+
+
+def test_link_checks_ownership(client, conn):
+    mine = add_goal(conn, 'Holiday')
+    theirs = add_goal(conn, 'Car', user_id=2)
+    transaction_id = add_transaction(conn, '2025-01-01', 5000, 'income')
+    goals.link(conn, 1, transaction_id, theirs)
+    goals.link(conn, 2, transaction_id, mine)
+    assert totals(conn) == {mine: (0, 0), theirs: (0, 0)}
+
+
+def test_goals_page_follows_the_transaction_form(client, conn):
+    goal_id = add_goal(conn, 'Emergency fund')
+    client.post('/add', data=dict(date='2025-01-05', amount='120.50', type='income', category_id='',
+                                  description='Savings', goal_id=str(goal_id)))
+    assert totals(conn)[goal_id] == (12050, 1)
+    assert '120.50' in client.get('/goals').get_data(as_text=True)
+
+    transaction_id = conn.execute('SELECT id FROM transactions').fetchone()[0]
+    client.post(f'/edit/{transaction_id}', data=dict(date='2025-01-05', amount='20', type='income',
+                                                     category_id='', description='Savings', goal_id=''))
+    assert totals(conn)[goal_id] == (0, 0)
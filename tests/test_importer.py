@@ -0,0 +1,69 @@
+"""Bulk CSV import"""
+
+import io
+import random
+
+import pytest
+
+import balances
+import importer
+
+HEADER = 'Date,Amount,Type,Category,Description\n'
+
+
+def run(conn, body, batch_size=importer.DEFAULT_BATCH_SIZE):
+    return importer.import_csv(conn, 1, io.StringIO(HEADER + body), batch_size)
+
+
+def test_imports_rows_and_creates_categories(client, conn):
+    result = run(conn, '2025-01-02,10.50,expense,Garden,seeds\n'
+                       '2025-01-03,"1,200.00",income,Salary,pay\n'
+                       '2025-01-04,3,expense,No Category,misc\n')
+    assert (result['rows'], result['imported'], result['error_count']) == (3, 3, 0)
+    assert result['created_categories'] == ['Garden']
+    rows = conn.execute('SELECT amount_cents, category_id IS NULL FROM transactions ORDER BY date').fetchall()
+    assert [tuple(row) for row in rows] == [(1050, 0), (120000, 0), (300, 1)]
+
+
+@pytest.mark.parametrize('amount', ['nan', 'NaN', 'inf', '-inf', '1e400', '0', '-5', '2000000000', 'abc'])
+def test_bad_amounts_are_reported_not_fatal(client, conn, amount):
+    result = run(conn, f'2025-01-02,{amount},expense,,bad\n2025-01-03,4.00,expense,,good\n')
+    assert result['imported'] == 1
+    assert result['error_count'] == 1
+    assert result['errors'][0][0] == 2
+    assert conn.execute('SELECT description FROM transactions').fetchall()[0][0] == 'good'
+
+
+def test_bad_amount_through_the_upload_form(client, conn):
+    body = (HEADER + '2025-01-02,nan,expense,,bad\n2025-01-03,4.00,expense,,good\n').encode()
+    response = client.post('/import', data={'file': (io.BytesIO(body), 'data.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 1
+
+
+def test_missing_column_imports_nothing(client, conn):
+    with pytest.raises(importer.CSVImportError):
+        importer.import_csv(conn, 1, io.StringIO('Date,Type\n2025-01-01,expense\n'))
+    assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 0
+
+
+def test_large_newest_first_file_keeps_balances_right(client, conn):
+    rng = random.Random(7)
+    rows = sorted(((f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}', rng.randint(1, 9999) / 100,
+                    rng.choice(['income', 'expense'])) for _ in range(700)), reverse=True)
+    result = run(conn, ''.join(f'{day},{amount},{kind},,imp\n' for day, amount, kind in rows), batch_size=100)
+    assert result['imported'] == 700
+
+    expected = {}
+    running = 0
+    for day, net in conn.execute('''
+        SELECT date, SUM(CASE WHEN type = 'income' THEN amount_cents ELSE -amount_cents END)
+        FROM transactions WHERE user_id = 1 GROUP BY date ORDER BY date
+    '''):
+        running += net
+        expected[day] = running
+    stored = dict(conn.execute('SELECT date, balance_cents FROM balance_checkpoints WHERE user_id = 1'))
+    assert stored == expected
+    triggers = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'trg_balances_%'").fetchone()[0]
+    assert triggers == len(balances.TRIGGERS)
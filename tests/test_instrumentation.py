@@ -0,0 +1,104 @@
+"""SQL and request instrumentation, and /metrics"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from flask import Flask
+
+import db
+import instrumentation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports the app the way a deployment does, with the environment variable set
+INSTRUMENTED_APP = textwrap.dedent('''
+    import json
+    import app as tracker
+
+    with tracker.app.app_context():
+        tracker.init_db()
+    client = tracker.app.test_client()
+    client.post('/register', data=dict(username='alice', email='alice@example.com',
+                                       password='secret1', confirm_password='secret1'))
+    client.post('/login', data=dict(username='alice', password='secret1'))
+    index = client.get('/')
+    metrics = client.get('/metrics')
+    print(json.dumps({
+        'server_timing': index.headers.get('Server-Timing'),
+        'metrics_status': metrics.status_code,
+        'metrics': metrics.get_data(as_text=True),
+    }))
+''')
+
+
+def test_nothing_is_added_when_instrumentation_is_off(client):
+    assert not client.application.config['INSTRUMENTATION']
+    response = client.get('/')
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert client.get('/metrics').status_code == 404
+    pool = db.get_pool(client.application)
+    conn = pool.acquire()
+    assert type(conn) is db.PooledConnection
+    pool.release(conn)
+
+
+def test_instrumented_app_reports_timing_and_metrics(tmp_path):
+    env = dict(os.environ, EXPENSE_TRACKER_INSTRUMENTATION='1',
+               EXPENSE_TRACKER_DATABASE=str(tmp_path / 'tracker.db'))
+    output = subprocess.run([sys.executable, '-c', INSTRUMENTED_APP], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True, timeout=60).stdout
+    result = json.loads(output.splitlines()[-1])
+    assert result['server_timing'].startswith('db;dur=')
+    assert ' queries"' in result['server_timing']
+    assert result['metrics_status'] == 200
+    assert 'tracker_http_requests_total{route="dashboard",method="GET",status="200"} 1' in result['metrics']
+    assert 'tracker_db_queries_per_request_count{route="dashboard"} 1' in result['metrics']
+    assert 'tracker_db_statement_calls_total{route="dashboard",statement="SELECT' in result['metrics']
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    app = Flask(__name__)
+    app.config.update(DATABASE=str(tmp_path / 'metrics.db'), INSTRUMENTATION=True,
+                      SLOW_QUERY_MS=0)
+    db.init_app(app)
+    instrumentation.init_app(app)
+
+    @app.route('/rows')
+    def rows():
+        conn = db.get_db()
+        conn.execute('CREATE TABLE IF NOT EXISTS t (x)')
+        conn.executemany('INSERT INTO t VALUES (?)', [(n,) for n in range(5)])
+        return str(len(conn.execute('SELECT x FROM t WHERE x >= ?', (2,)).fetchall()))
+
+    return app
+
+
+def test_statements_are_counted_per_request(instrumented, caplog):
+    client = instrumented.test_client()
+    client.get('/rows')    # the first request also pays for opening the connection
+    with caplog.at_level(logging.WARNING, logger='tracker.slow_queries'):
+        response = client.get('/rows')
+    assert response.get_data(as_text=True) == '3'
+    assert response.headers['Server-Timing'].endswith('desc="3 queries"')
+
+    rendered = instrumentation.metrics.render()
+    assert 'tracker_db_statement_calls_total{route="rows",statement="SELECT x FROM t WHERE x >= ?"} 2' in rendered
+    assert 'tracker_db_statement_rows_total{route="rows",statement="SELECT x FROM t WHERE x >= ?"} 6' in rendered
+    assert 'tracker_db_statement_rows_total{route="rows",statement="INSERT INTO t VALUES (?)"} 10' in rendered
+    # Everything is slow at SLOW_QUERY_MS = 0; the SELECT is logged with its plan
+    select = [message for message in caplog.messages if 'SELECT x FROM t' in message]
+    assert select and 'plan: SCAN t' in select[0]
+
+
+def test_metrics_are_only_served_to_allowed_addresses(instrumented):
+    client = instrumented.test_client()
+    assert client.get('/metrics').status_code == 200
+    remote = client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'})
+    assert remote.status_code == 403
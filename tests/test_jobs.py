@@ -0,0 +1,167 @@
+"""Background job queue and the export/import handlers"""
+
+import importlib.util
+import io
+import os
+import sqlite3
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as tracker
+import cache
+import jobs
+
+
+@pytest.fixture
+def jobs_app(app):
+    app.config.update(JOBS_ENABLED=True, JOB_IMPORT_MIN_BYTES=100, JOB_RETRY_DELAY=0)
+    return app
+
+
+def add_some(client, count=5):
+    for i in range(count):
+        client.post('/add', data=dict(date=f'2025-03-{i + 1:02d}', amount='3', type='expense',
+                                      category_id='', description=f'row{i}'))
+
+
+def job_rows(conn):
+    return conn.execute('SELECT * FROM jobs ORDER BY id').fetchall()
+
+
+def test_export_job_runs_and_downloads(jobs_app, client, conn):
+    add_some(client)
+    client.post('/jobs/export', data=dict(type='expense'))
+    worker = jobs.Worker(jobs_app)
+    assert worker.run_pending() == 1
+    job = client.get('/api/jobs').get_json()['jobs'][0]
+    assert job['status'] == 'done'
+    lines = client.get(f"/jobs/{job['id']}/download").get_data(as_text=True).splitlines()
+    assert len(lines) == 6
+    worker.close()
+
+
+def test_worker_started_as_script_finds_the_app_handlers(jobs_app, client, conn):
+    # `python jobs.py` runs this module as __main__, a second copy whose own
+    # HANDLERS stays empty; the worker must use the registry app.py filled.
+    # Loaded under another name so its `if __name__ == '__main__'` stays idle.
+    spec = importlib.util.spec_from_file_location('jobs_as_script', jobs.__file__)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    assert script.HANDLERS == {}
+
+    add_some(client)
+    client.post('/jobs/export', data=dict(type='expense'))
+    app, handlers = script.load_app(jobs_app.config['DATABASE'])
+    worker = script.Worker(app, handlers)
+    worker.run_pending()
+    worker.close()
+    assert [row['status'] for row in job_rows(conn)] == ['done']
+
+
+def test_export_without_job_workers_runs_in_the_request(app, client, conn):
+    response = client.post('/jobs/export', data=dict(type='expense', year='2025'))
+    assert response.status_code == 302
+    assert '/export?' in response.location and 'year=2025' in response.location
+    assert job_rows(conn) == []
+
+
+def test_import_job_invalidates_web_workers(jobs_app, client, conn):
+    csv = 'Date,Type,Category,Amount,Description\n' + ''.join(
+        f'2025-04-0{i % 9 + 1},expense,Food & Dining,1.50,imp{i}\n' for i in range(20))
+    client.post('/import', data={'file': (io.BytesIO(csv.encode()), 'big.csv')},
+                content_type='multipart/form-data')
+    version = cache.version(conn, 1)
+    worker = jobs.Worker(jobs_app)
+    worker.run_pending()
+    worker.close()
+    job = client.get('/api/jobs').get_json()['jobs'][0]
+    assert job['status'] == 'done' and job['result']['imported'] == 20
+    assert cache.version(conn, 1) > version
+
+
+def big_import(client, rows=20):
+    csv = 'Date,Type,Category,Amount,Description\n' + ''.join(
+        f'2025-04-0{i % 9 + 1},expense,Food & Dining,1.50,imp{i}\n' for i in range(rows))
+    return client.post('/import', data={'file': (io.BytesIO(csv.encode()), 'big.csv')},
+                       content_type='multipart/form-data')
+
+
+def test_upload_is_saved_before_the_job_row_is_written(jobs_app, client, conn, monkeypatch):
+    real_save = FileStorage.save
+    locked = []
+
+    def save(upload, destination):
+        other = sqlite3.connect(jobs_app.config['DATABASE'], timeout=0)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+        except sqlite3.OperationalError:
+            locked.append(destination)
+        other.close()
+        return real_save(upload, destination)
+
+    monkeypatch.setattr(FileStorage, 'save', save)
+    big_import(client)
+    assert locked == []
+    job_id = job_rows(conn)[0]['id']
+    assert os.listdir(jobs_app.config['JOBS_DIR']) == [str(job_id)]
+    assert os.path.exists(jobs.job_file(jobs_app.config['JOBS_DIR'], job_id, 'upload.csv'))
+
+
+def test_import_retried_after_commit_is_not_repeated(jobs_app, client, conn, monkeypatch):
+    big_import(client)
+    real_invalidate = tracker.invalidate_cache
+    calls = []
+
+    def invalidate_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return real_invalidate(*args, **kwargs)
+
+    monkeypatch.setattr(tracker, 'invalidate_cache', invalidate_once)
+    worker = jobs.Worker(jobs_app)
+    worker.run_pending()
+    worker.close()
+
+    job = job_rows(conn)[0]
+    assert (job['status'], job['attempts']) == ('done', 2)
+    assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 20
+    assert client.get('/api/jobs').get_json()['jobs'][0]['result']['imported'] == 20
+    assert not os.path.exists(jobs.job_file(jobs_app.config['JOBS_DIR'], job['id'], 'upload.csv'))
+
+
+def test_retries_then_fails_permanently(jobs_app, client, conn):
+    calls = []
+
+    def flaky(job):
+        calls.append(job.attempt)
+        if job.attempt < 2:
+            raise RuntimeError('boom')
+        return {'ok': True}
+
+    def broken(job):
+        raise jobs.JobFailed('nope')
+
+    flaky_id = jobs.enqueue(conn, 1, 'flaky', max_attempts=3)
+    broken_id = jobs.enqueue(conn, 1, 'broken', max_attempts=3)
+    unknown_id = jobs.enqueue(conn, 1, 'unknown', max_attempts=3)
+    worker = jobs.Worker(jobs_app, {'flaky': flaky, 'broken': broken})
+    worker.run_pending()
+    worker.close()
+
+    status = {row['id']: (row['status'], row['attempts']) for row in job_rows(conn)}
+    assert status[flaky_id] == ('done', 2)
+    assert status[broken_id] == ('failed', 1)
+    assert status[unknown_id] == ('failed', 1)
+
+
+def test_one_running_job_per_user(jobs_app, conn):
+    jobs.enqueue(conn, 1, 'export')
+    jobs.enqueue(conn, 1, 'export')
+    first, second = jobs.Worker(jobs_app), jobs.Worker(jobs_app)
+    assert first.claim() is not None
+    assert second.claim() is None
+    first.close()
+    second.close()
@@ -0,0 +1,128 @@
+"""Stored dashboard state and the live update events"""
+
+import json
+from datetime import date
+
+import pytest
+
+import cache
+import live_updates
+from conftest import add_transaction
+
+TODAY = '2025-06-15'
+
+
+@pytest.fixture
+def live_app(app):
+    app.config.update(LIVE_UPDATES=True)
+    return app
+
+
+def refresh(conn, publish=True):
+    return live_updates.refresh(conn, 1, {}, today=TODAY, publish=publish)
+
+
+def events(conn):
+    return [(kind, json.loads(data)) for kind, data in
+            conn.execute('SELECT kind, data FROM events WHERE user_id = 1 ORDER BY id')]
+
+
+def test_first_state_publishes_nothing(client, conn):
+    add_transaction(conn, '2025-06-01', 1000)
+    state = refresh(conn)
+    assert state['total_expense'] == 10
+    assert state['last_event_id'] == 0
+    assert events(conn) == []
+
+
+def test_new_rows_are_published_oldest_first(client, conn):
+    add_transaction(conn, '2025-06-01', 1000)
+    refresh(conn)
+    first = add_transaction(conn, '2025-06-02', 200, description='first')
+    second = add_transaction(conn, '2025-06-03', 300, description='second')
+    state = refresh(conn)
+
+    published = events(conn)
+    assert [kind for kind, _ in published] == ['totals', 'transaction', 'transaction']
+    assert published[0][1]['total_expense'] == 15
+    assert [data['transaction']['id'] for _, data in published[1:]] == [first, second]
+    assert state['last_event_id'] == conn.execute('SELECT MAX(id) FROM events').fetchone()[0]
+
+    # Nothing changed: nothing to publish
+    assert refresh(conn)['last_event_id'] == state['last_event_id']
+
+
+def test_edits_republish_the_recent_list(client, conn):
+    transaction_id = add_transaction(conn, '2025-06-01', 1000, description='lunch')
+    refresh(conn)
+    conn.execute("UPDATE transactions SET description = 'dinner' WHERE id = ?", (transaction_id,))
+    refresh(conn)
+    assert events(conn) == [('recent', {'transactions': [
+        {'id': transaction_id, 'date': '2025-06-01', 'description': 'dinner', 'type': 'expense',
+         'amount': 10.0, 'category_name': None}]})]
+
+
+def test_budget_alerts_report_crossed_thresholds(client, conn):
+    category_id = conn.execute('SELECT id FROM categories WHERE user_id = 1').fetchone()[0]
+    budget_id = conn.execute('INSERT INTO budgets (month, category_id, amount_limit_cents, user_id) '
+                             "VALUES ('2025-06', ?, 10000, 1)", (category_id,)).lastrowid
+    add_transaction(conn, '2025-06-01', 5000, category_id=category_id)
+    refresh(conn)
+
+    add_transaction(conn, '2025-06-02', 3500, category_id=category_id)
+    refresh(conn)
+    add_transaction(conn, '2025-06-03', 3000, category_id=category_id)
+    refresh(conn)
+    add_transaction(conn, '2025-06-04', 100, category_id=category_id)
+    refresh(conn)
+
+    alerts = [data for kind, data in events(conn) if kind == 'alerts']
+    assert [(data['alerts'][0]['type'], data['crossed']) for data in alerts] == [
+        ('warning', [budget_id]), ('danger', [budget_id]), ('danger', [])]
+
+
+def test_recurring_items_falling_due(client, conn):
+    refresh(conn)
+    rule_id = conn.execute('''
+        INSERT INTO recurring_transactions (title, amount, type, frequency, start_date, next_date, user_id)
+        VALUES ('Rent', 900, 'expense', 'monthly', '2025-06-15', '2025-06-15', 1)
+    ''').lastrowid
+    refresh(conn)
+    assert events(conn) == [('recurring', {
+        'items': [{'id': rule_id, 'title': 'Rent', 'amount': 900.0, 'next_date': '2025-06-15'}],
+        'count': 1, 'new': [rule_id]})]
+
+
+def test_without_publish_no_events_are_stored(client, conn):
+    refresh(conn, publish=False)
+    add_transaction(conn, '2025-06-01', 1000)
+    refresh(conn, publish=False)
+    assert events(conn) == []
+
+
+def test_writes_without_live_updates_only_mark_the_state_stale(client, conn, monkeypatch):
+    client.get('/')
+    calls = []
+    real_snapshot = live_updates.snapshot
+    monkeypatch.setattr(live_updates, 'snapshot', lambda *args: calls.append(args) or real_snapshot(*args))
+    for amount in ('1.00', '2.00', '3.00'):
+        client.post('/add', data=dict(date=date.today().isoformat(), amount=amount, type='expense',
+                                      category_id='', description='x'))
+    assert calls == []
+    assert '€6.00' in client.get('/').get_data(as_text=True)
+    assert len(calls) == 1
+    assert events(conn) == []
+
+
+def test_writes_with_live_updates_publish_right_away(live_app, client, conn):
+    client.get('/')
+    client.post('/add', data=dict(date=date.today().isoformat(), amount='4.50', type='expense',
+                                  category_id='', description='coffee'))
+    assert [kind for kind, _ in events(conn)] == ['totals', 'transaction']
+
+
+def test_version_bump_from_outside_the_app_refreshes_the_state(client, conn):
+    client.get('/')
+    add_transaction(conn, date.today().isoformat(), 1234)
+    cache.bump(conn, 1)
+    assert '€12.34' in client.get('/').get_data(as_text=True)
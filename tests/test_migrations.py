@@ -0,0 +1,194 @@
+"""Schema migrations run by init_db() and migrate_database.py"""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import app as tracker
+import db
+import migrate_database
+
+BACKUP_DB = os.path.join(os.path.dirname(tracker.__file__), 'database', 'tracker_backup.db')
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+                               amount REAL NOT NULL, type TEXT NOT NULL, category_id INTEGER,
+                               description TEXT);
+    CREATE TABLE budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, month TEXT NOT NULL,
+                          category_id INTEGER, amount_limit REAL NOT NULL);
+    INSERT INTO categories (name) VALUES ('Food'), ('Salary');
+    INSERT INTO transactions (date, amount, type, category_id, description) VALUES
+        ('2025-01-05', 12.34, 'expense', 1, 'lunch'),
+        ('2025-01-31', 2500, 'income', 2, 'pay'),
+        ('2025-02-01', 0.1, 'expense', NULL, 'gum');
+    INSERT INTO budgets (month, category_id, amount_limit) VALUES ('2025-01', 1, 300.5);
+'''
+
+
+# A multi-user database from before integer cents, as the old migration
+# script left it: budgets without a UNIQUE constraint
+V1_SCHEMA = '''
+    CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE,
+                        email TEXT NOT NULL UNIQUE, password_hash TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                             user_id INTEGER NOT NULL, UNIQUE(name, user_id));
+    CREATE TABLE transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+                               amount REAL NOT NULL, type TEXT NOT NULL, category_id INTEGER,
+                               description TEXT, user_id INTEGER NOT NULL);
+    CREATE TABLE budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, month TEXT NOT NULL,
+                          category_id INTEGER, amount_limit REAL NOT NULL, user_id INTEGER NOT NULL);
+    CREATE TABLE financial_goals (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+                                  description TEXT, target_amount REAL NOT NULL,
+                                  target_date TEXT NOT NULL, user_id INTEGER NOT NULL,
+                                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    INSERT INTO users (username, email, password_hash) VALUES ('ann', 'ann@example.com', 'x');
+    INSERT INTO categories (name, user_id) VALUES ('Food', 1);
+    INSERT INTO financial_goals (title, target_amount, target_date, user_id)
+        VALUES ('Car', 5000.005, '2026-01-01', 1);
+'''
+
+AMOUNTS = [0.1, 0.29, 1.005, 2.675, 19.99, 1234.565, 99999.99, 0.005, 3]
+
+
+def v1_database(path, transactions=(), budgets=()):
+    conn = sqlite3.connect(path)
+    conn.executescript(V1_SCHEMA)
+    conn.executemany('INSERT INTO transactions (date, amount, type, category_id, description, user_id) '
+                     "VALUES (?, ?, 'expense', 1, 'x', 1)", transactions)
+    conn.executemany('INSERT INTO budgets (month, category_id, amount_limit, user_id) VALUES (?, ?, ?, 1)',
+                     budgets)
+    conn.commit()
+    conn.close()
+
+
+def migrate(app, path):
+    app.config['DATABASE'] = str(path)
+    with app.app_context():
+        tracker.init_db()
+    return sqlite3.connect(path)
+
+
+def leftover_shadows(conn):
+    return conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%shadow%'").fetchall()
+
+
+def test_legacy_database_goes_to_a_new_demo_user(app, tmp_path):
+    path = tmp_path / 'legacy.db'
+    sqlite3.connect(path).executescript(LEGACY_SCHEMA)
+    conn = migrate(app, path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == migrate_database.SCHEMA_VERSION
+    demo = conn.execute("SELECT id FROM users WHERE username = 'demo'").fetchone()[0]
+    assert conn.execute('SELECT DISTINCT user_id FROM transactions').fetchall() == [(demo,)]
+    assert conn.execute('SELECT SUM(amount_cents) FROM transactions').fetchone()[0] == 1234 + 250000 + 10
+    assert conn.execute('SELECT amount_limit_cents FROM budgets').fetchone()[0] == 30050
+    assert conn.execute('SELECT SUM(total_cents) FROM monthly_rollups').fetchone()[0] == 1234 + 250000 + 10
+    assert leftover_shadows(conn) == []
+
+
+@pytest.mark.skipif(not os.path.exists(BACKUP_DB), reason='no shipped backup database')
+def test_backup_with_demo_email_taken(app, tmp_path):
+    # tracker_backup.db already has demo@example.com under another username
+    path = tmp_path / 'backup.db'
+    shutil.copy(BACKUP_DB, path)
+    conn = migrate(app, path)
+    owner = conn.execute("SELECT id FROM users WHERE email = 'demo@example.com'").fetchone()[0]
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 1
+    assert conn.execute('SELECT DISTINCT user_id FROM transactions').fetchall() == [(owner,)]
+    assert conn.execute('SELECT DISTINCT user_id FROM categories').fetchall() == [(owner,)]
+    assert leftover_shadows(conn) == []
+
+
+def test_failed_copy_leaves_live_tables_writable(app, tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    sqlite3.connect(path).executescript(LEGACY_SCHEMA)
+
+    def fail(*args, **kwargs):
+        raise sqlite3.IntegrityError('NOT NULL constraint failed')
+
+    monkeypatch.setattr(migrate_database, 'copy_table', fail)
+    with pytest.raises(sqlite3.IntegrityError):
+        migrate(app, path)
+
+    conn = sqlite3.connect(path)
+    assert leftover_shadows(conn) == []
+    conn.execute("INSERT INTO transactions (date, amount, type) VALUES ('2025-03-01', 5, 'expense')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.undo()
+    conn = migrate(app, path)
+    assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 4
+    assert conn.execute('SELECT COUNT(DISTINCT user_id) FROM transactions').fetchone()[0] == 1
+
+
+def test_cents_match_what_the_app_stores(app, tmp_path):
+    path = tmp_path / 'v1.db'
+    v1_database(path, [('2025-01-01', amount) for amount in AMOUNTS])
+    conn = migrate(app, path)
+    assert [row[0] for row in conn.execute('SELECT amount_cents FROM transactions ORDER BY id')] == [
+        db.to_cents(amount) for amount in AMOUNTS]
+    assert conn.execute('SELECT target_cents FROM financial_goals').fetchone()[0] == db.to_cents(5000.005)
+
+
+def test_dates_are_normalized(app, tmp_path):
+    path = tmp_path / 'v1.db'
+    raw = ['2025-01-05', '2025-01-05 13:45:00', '2025-01-05T08:00:00', '2025-1-5', 'yesterday']
+    v1_database(path, [(day, 1) for day in raw])
+    conn = migrate(app, path)
+    assert [row[0] for row in conn.execute('SELECT date FROM transactions ORDER BY id')] == [
+        '2025-01-05', '2025-01-05', '2025-01-05', '2025-1-5', 'yesterday']
+
+
+def test_interrupted_copy_resumes_with_concurrent_writes(app, tmp_path):
+    path = tmp_path / 'v1.db'
+    v1_database(path, [(f'2025-01-{day:02d}', day + 0.25) for day in range(1, 21)])
+    migration = migrate_database.MIGRATIONS[1]
+
+    def interrupt(table, done, total):
+        if table == 'transactions' and done >= 6:
+            raise KeyboardInterrupt
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    with pytest.raises(KeyboardInterrupt):
+        migrate_database.run_migration(conn, migration, chunk_size=3, progress=interrupt)
+    assert conn.execute("SELECT last_id FROM migration_progress WHERE name = '2:transactions'").fetchone()[0] == 6
+
+    # The app keeps writing to the old table in between
+    conn.execute('UPDATE transactions SET amount = 99.5 WHERE id IN (2, 15)')
+    conn.execute('DELETE FROM transactions WHERE id IN (3, 16)')
+    conn.execute("INSERT INTO transactions (date, amount, type, user_id) VALUES ('2025-02-01', 7.1, 'income', 1)")
+    expected = {row[0]: db.to_cents(row[1]) for row in conn.execute('SELECT id, amount FROM transactions')}
+
+    copied = []
+    assert migrate_database.run_migration(conn, migration, chunk_size=3,
+                                          progress=lambda *args: copied.append(args))
+    assert {row[0]: row[1] for row in conn.execute('SELECT id, amount_cents FROM transactions')} == expected
+    assert ('transactions', 6, 20) not in copied    # started after the rows already copied
+    assert leftover_shadows(conn) == []
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'migration_progress'").fetchone()
+    conn.close()
+
+
+def test_duplicate_budgets_are_kept(app, tmp_path):
+    path = tmp_path / 'v1.db'
+    v1_database(path, budgets=[('2025-01', 1, 100), ('2025-01', 1, 150), ('2025-01', None, 80),
+                               ('2025-01', None, 90), ('2025-02', 1, 100)])
+    conn = migrate(app, path)
+    assert conn.execute('SELECT month, category_id, amount_limit_cents FROM budgets ORDER BY id').fetchall() == [
+        ('2025-01', 1, 10000), ('2025-01', 1, 15000), ('2025-01', None, 8000),
+        ('2025-01', None, 9000), ('2025-02', 1, 10000)]
+    assert migrate_database.duplicate_budgets(conn) == [(1, '2025-01', 1, 2)]
+
+
+def test_unique_budgets_are_enforced_after_migrating(app, tmp_path):
+    path = tmp_path / 'v1.db'
+    v1_database(path, budgets=[('2025-01', 1, 100), ('2025-02', 1, 100)])
+    conn = migrate(app, path)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO budgets (month, category_id, amount_limit_cents, user_id) "
+                     "VALUES ('2025-01', 1, 5, 1)")
@@ -0,0 +1,36 @@
+"""Stack sampling of slow requests"""
+
+import sys
+import threading
+import time
+
+import profiling
+
+
+def busy(seconds):
+    until = time.monotonic() + seconds
+    while time.monotonic() < until:
+        pass
+
+
+def test_fast_requests_are_never_sampled(monkeypatch):
+    calls = []
+    real = sys._current_frames
+    monkeypatch.setattr(sys, '_current_frames', lambda: calls.append(1) or real())
+    sampler = profiling.StackSampler(interval=0.001, delay=0.2)
+    for _ in range(50):
+        sampler.start(threading.get_ident())
+        assert sampler.stop(threading.get_ident()) == {}
+    time.sleep(0.3)
+    assert calls == []
+
+
+def test_slow_request_is_sampled_after_the_delay():
+    sampler = profiling.StackSampler(interval=0.002, delay=0.05)
+    sampler.start(threading.get_ident())
+    busy(0.04)
+    assert sum(sampler.active[threading.get_ident()][1].values()) == 0
+    busy(0.1)
+    stacks = sampler.stop(threading.get_ident())
+    assert sum(stacks.values()) > 5
+    assert any('test_profiling.py:busy' in stack for stack in stacks)
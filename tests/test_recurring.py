@@ -0,0 +1,77 @@
+"""Recurring transaction catch-up"""
+
+import sys
+from datetime import date
+
+import cache
+import recurring
+
+
+def add_rule(conn, start, frequency='monthly', active=1, user_id=1, next_date=None):
+    return conn.execute('''
+        INSERT INTO recurring_transactions
+            (title, amount, type, frequency, start_date, next_date, user_id, active)
+        VALUES ('Rent', 950.5, 'expense', ?, ?, ?, ?, ?)
+    ''', (frequency, start, next_date or start, user_id, active)).lastrowid
+
+
+def dates(conn):
+    return [row[0] for row in conn.execute('SELECT date FROM transactions ORDER BY date')]
+
+
+def test_month_ends_are_clamped_without_drifting(client, conn):
+    add_rule(conn, '2025-01-31')
+    result = recurring.catch_up(conn, until=date(2025, 5, 30))
+    assert dates(conn) == ['2025-01-31', '2025-02-28', '2025-03-31', '2025-04-30']
+    assert result == {'rules': 1, 'transactions': 4, 'users': [1]}
+    assert conn.execute('SELECT next_date, last_executed FROM recurring_transactions').fetchone()[:] == (
+        '2025-05-31', '2025-04-30')
+
+    add_rule(conn, '2024-02-29', frequency='yearly', user_id=2)
+    recurring.catch_up(conn, until=date(2028, 3, 1), user_id=2)
+    assert [day for day, in conn.execute(
+        'SELECT date FROM transactions WHERE user_id = 2 ORDER BY date')] == [
+        '2024-02-29', '2025-02-28', '2026-02-28', '2027-02-28', '2028-02-29']
+
+
+def test_catch_up_skips_paused_rules(client, conn):
+    add_rule(conn, '2025-01-01', active=0)
+    assert recurring.catch_up(conn, until=date(2025, 3, 1))['transactions'] == 0
+
+
+def test_execute_now_runs_paused_rules(client, conn):
+    rule_id = add_rule(conn, '2030-01-31', active=0)
+    page = client.get(f'/recurring/execute/{rule_id}', follow_redirects=True).get_data(as_text=True)
+    assert 'executed successfully' in page
+    assert dates(conn) == ['2030-01-31']
+    client.get(f'/recurring/execute/{rule_id}')
+    assert dates(conn) == ['2030-01-31', '2030-02-28']
+
+
+def test_execute_now_reports_failure(client, conn):
+    other = add_rule(conn, '2025-01-01', user_id=2)
+    page = client.get(f'/recurring/execute/{other}', follow_redirects=True).get_data(as_text=True)
+    assert 'not found' in page
+
+    # A next_date before the start date leaves nothing to execute until the start
+    rule_id = add_rule(conn, '2999-01-01', next_date='2025-01-01')
+    page = client.get(f'/recurring/execute/{rule_id}', follow_redirects=True).get_data(as_text=True)
+    assert 'could not be executed' in page
+    assert 'executed successfully' not in page
+    assert dates(conn) == []
+
+
+def test_command_line_bumps_write_versions(app, client, conn, monkeypatch, capsys):
+    add_rule(conn, '2025-01-15')
+    add_rule(conn, '2025-01-15', user_id=2, active=0)
+    assert client.get('/api/analytics').get_json()['total_transactions'] == 0
+    before = cache.version(conn, 1)
+
+    monkeypatch.setattr(sys, 'argv', ['recurring.py', '--database', app.config['DATABASE'],
+                                      '--date', '2025-03-20'])
+    recurring.main()
+
+    assert 'created 3 transaction(s) from 1 recurring rule(s)' in capsys.readouterr().out
+    assert cache.version(conn, 1) == before + 1
+    assert cache.version(conn, 2) == 0
+    assert client.get('/api/analytics').get_json()['total_transactions'] == 3
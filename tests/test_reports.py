@@ -0,0 +1,143 @@
+"""Report and export filters, keyset pagination of the reports list, streamed exports"""
+
+import csv
+import gzip
+import io
+
+import pytest
+
+import app as tracker
+from conftest import add_transaction
+
+
+@pytest.fixture
+def history(client, conn):
+    add_transaction(conn, '2024-03-10', 1000, description='march-2024')
+    add_transaction(conn, '2025-03-31', 2000, description='march-2025')
+    add_transaction(conn, '2025-04-01', 4000, description='april-2025')
+    add_transaction(conn, '2025-12-31', 8000, 'income', description='dec-2025')
+    return client
+
+
+def export(client, **filters):
+    return client.get('/export', query_string=dict(filters, gzip='0')).get_data(as_text=True)
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'year': '2025'}, {'march-2025', 'april-2025', 'dec-2025'}),
+    ({'year': '2025', 'month': '3'}, {'march-2025'}),
+    ({'month': '03'}, {'march-2024', 'march-2025'}),
+    ({'month': '12', 'year': '2025'}, {'dec-2025'}),
+    ({'type': 'income'}, {'dec-2025'}),
+])
+def test_filters_select_half_open_ranges(history, filters, expected):
+    body = export(history, **filters)
+    found = {name for name in ('march-2024', 'march-2025', 'april-2025', 'dec-2025') if name in body}
+    assert found == expected
+
+
+@pytest.mark.parametrize('filters', [
+    {'year': '0'}, {'year': '9999'}, {'year': '-5'}, {'year': '99999'},
+    {'year': '9999', 'month': '12'}, {'month': '13'}, {'year': 'abc'},
+])
+def test_out_of_range_filters_match_nothing(history, filters):
+    response = history.get('/reports', query_string=filters)
+    assert response.status_code == 200
+    body = export(history, **filters)
+    assert body.strip().count('\n') == 0
+
+
+def test_month_filter_with_extreme_dates(history, conn):
+    add_transaction(conn, '9999-12-31', 500, description='far-future')
+    assert 'march-2025' in export(history, month='3')
+    assert history.get('/reports', query_string={'month': '12'}).status_code == 200
+    december = export(history, month='12')
+    assert 'far-future' in december and 'dec-2025' in december and 'march-2025' not in december
+
+
+@pytest.fixture
+def many(client, conn):
+    # Several rows per day, so pages split inside a date and only the id breaks ties
+    for n in range(53):
+        add_transaction(conn, f'2025-05-{n % 9 + 1:02d}', 100 + n,
+                        'income' if n % 4 == 0 else 'expense', description=f'row-{n}')
+    add_transaction(conn, '2025-05-01', 100, user_id=2, description='other-user')
+    return client
+
+
+def walk(client, cursor='', **filters):
+    """Follow next_cursor through /api/reports/transactions; returns every page"""
+    pages = []
+    while cursor is not None:
+        data = client.get('/api/reports/transactions',
+                          query_string=dict(filters, cursor=cursor)).get_json()
+        pages.append(data['transactions'])
+        cursor = data['next_cursor']
+    return pages
+
+
+@pytest.mark.parametrize('filters, where', [
+    ({}, ''),
+    ({'type': 'expense'}, " AND type = 'expense'"),
+])
+def test_cursor_round_trip_returns_every_row_once(many, conn, filters, where):
+    expected = [row[0] for row in conn.execute(
+        f'SELECT id FROM transactions WHERE user_id = 1{where} ORDER BY date DESC, id DESC')]
+    pages = walk(many, per_page=7, **filters)
+    assert [len(page) for page in pages[:-1]] == [7] * (len(pages) - 1)
+    assert 0 < len(pages[-1]) <= 7
+    assert [t['id'] for page in pages for t in page] == expected
+
+
+def test_rows_added_while_paging_do_not_shift_pages(many, conn):
+    first = many.get('/api/reports/transactions', query_string={'per_page': 10}).get_json()
+    add_transaction(conn, '2025-06-01', 100, description='newer')
+    rest = walk(many, per_page=10, cursor=first['next_cursor'])
+    ids = [t['id'] for t in first['transactions']] + [t['id'] for page in rest for t in page]
+    assert len(ids) == len(set(ids)) == 53
+
+
+@pytest.mark.parametrize('per_page, expected', [('1000', 5), ('0', 1), ('-3', 1), ('abc', 3)])
+def test_page_size_is_capped(many, per_page, expected):
+    many.application.config.update(REPORTS_PAGE_SIZE=3, REPORTS_MAX_PAGE_SIZE=5)
+    data = many.get('/api/reports/transactions', query_string={'per_page': per_page}).get_json()
+    assert len(data['transactions']) == expected
+    assert data['next_cursor'] is not None
+
+
+def test_malformed_cursor_starts_from_the_top(many):
+    data = many.get('/api/reports/transactions',
+                    query_string={'per_page': 5, 'cursor': 'garbage'}).get_json()
+    top = many.get('/api/reports/transactions', query_string={'per_page': 5}).get_json()
+    assert data == top
+
+
+def test_gzip_export_matches_the_plain_export(many, conn):
+    add_transaction(conn, '2025-05-02', 999, description='Café, "quoted"\nnewline')
+    many.application.config.update(EXPORT_BATCH_SIZE=7)
+    plain = many.get('/export')
+    assert 'Content-Encoding' not in plain.headers
+    body = plain.get_data(as_text=True)
+    compressed = many.get('/export', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()).decode('utf-8') == body
+
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == tracker.EXPORT_HEADER
+    assert len(rows) == 1 + 54
+    assert ['2025-05-02', '9.99', 'expense', 'No Category', 'Café, "quoted"\nnewline'] in rows
+
+
+def test_gzip_can_be_turned_off(many):
+    many.application.config.update(EXPORT_GZIP=False)
+    response = many.get('/export', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data(as_text=True).startswith('Date,Amount')
+
+
+def test_export_is_written_one_chunk_per_batch(many, conn):
+    cursor = conn.execute(tracker.EXPORT_QUERY.format(where='t.user_id = 1'))
+    chunks = list(tracker.iter_export_csv(cursor, {}, batch_size=10))
+    assert len(chunks) == 1 + 6    # header, then 53 rows in batches of 10
+    assert sum(chunk.count('\n') for chunk in chunks[1:]) == 53
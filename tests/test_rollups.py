@@ -0,0 +1,71 @@
+"""Monthly rollups kept in sync by triggers"""
+
+import random
+
+import rollups
+from conftest import add_transaction
+
+EXPECTED_QUERY = '''
+    SELECT user_id, month, COALESCE(category_id, 0), type,
+           SUM(amount_cents), COUNT(*), MIN(amount), MAX(amount)
+    FROM transactions
+    GROUP BY user_id, month, COALESCE(category_id, 0), type
+'''
+
+STORED_QUERY = '''
+    SELECT user_id, month, category_id, type, total_cents, count, min_amount, max_amount
+    FROM monthly_rollups
+'''
+
+
+def rows(conn, query):
+    return sorted(tuple(row) for row in conn.execute(query))
+
+
+def test_triggers_follow_random_writes(client, conn):
+    rng = random.Random(3)
+    categories = [row[0] for row in conn.execute('SELECT id FROM categories')] + [None]
+
+    def day():
+        return f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+
+    for _ in range(400):
+        ids = [row[0] for row in conn.execute('SELECT id FROM transactions')]
+        op = rng.random()
+        if op < 0.5 or not ids:
+            add_transaction(conn, day(), rng.randint(1, 10000), rng.choice(['income', 'expense']),
+                            rng.choice(categories), user_id=rng.choice([1, 2]))
+        elif op < 0.85:
+            conn.execute('UPDATE transactions SET date = ?, amount_cents = ?, type = ?, category_id = ?, '
+                         'user_id = ? WHERE id = ?',
+                         (day(), rng.randint(1, 10000), rng.choice(['income', 'expense']),
+                          rng.choice(categories), rng.choice([1, 2]), rng.choice(ids)))
+        else:
+            conn.execute('DELETE FROM transactions WHERE id = ?', (rng.choice(ids),))
+
+    expected = rows(conn, EXPECTED_QUERY)
+    assert rows(conn, STORED_QUERY) == expected
+
+    rollups.rebuild(conn, 1)
+    assert rows(conn, STORED_QUERY) == expected
+    rollups.rebuild(conn)
+    assert rows(conn, STORED_QUERY) == expected
+
+
+def test_removing_the_extreme_rescans_the_bucket(client, conn):
+    add_transaction(conn, '2025-03-01', 500)
+    low = add_transaction(conn, '2025-03-02', 100)
+    high = add_transaction(conn, '2025-03-03', 900)
+    conn.execute('DELETE FROM transactions WHERE id IN (?, ?)', (low, high))
+    assert tuple(conn.execute('SELECT count, min_amount, max_amount FROM monthly_rollups').fetchone()) == (1, 5, 5)
+
+    conn.execute('DELETE FROM transactions')
+    assert conn.execute('SELECT COUNT(*) FROM monthly_rollups').fetchone()[0] == 0
+
+
+def test_dashboard_totals_come_from_rollups(client, conn):
+    add_transaction(conn, '2025-01-10', 250000, 'income')
+    add_transaction(conn, '2025-01-12', 4250)
+    add_transaction(conn, '2025-02-01', 1000)
+    assert rollups.type_totals(conn, 1) == (2500, 52.5)
+    assert rollups.transaction_count(conn, 1) == 3
@@ -0,0 +1,81 @@
+"""Full-text search index and the /search route"""
+
+import pytest
+
+import search_index
+from conftest import add_transaction
+
+
+@pytest.fixture
+def fts(conn):
+    if not search_index.fts5_available(conn):
+        pytest.skip('This SQLite build has no FTS5 support')
+    return conn
+
+
+def indexed(conn):
+    return {row[0]: tuple(row[1:]) for row in conn.execute(
+        'SELECT rowid, description, category_name, owner FROM transactions_fts')}
+
+
+def expected(conn):
+    return {row[0]: tuple(row[1:]) for row in conn.execute('''
+        SELECT t.id, t.description, c.name, 'u' || t.user_id
+        FROM transactions t LEFT JOIN categories c ON t.category_id = c.id
+    ''')}
+
+
+def found(conn, text, user_id=1):
+    rows, total = search_index.search(conn, user_id, text)
+    assert total == len(rows)
+    return sorted(row['description'] for row in rows)
+
+
+def category_id(conn, name):
+    return conn.execute('SELECT id FROM categories WHERE user_id = 1 AND name = ?', (name,)).fetchone()[0]
+
+
+def test_index_follows_writes(client, fts):
+    food = category_id(fts, 'Food & Dining')
+    coffee = add_transaction(fts, '2025-01-02', 450, category_id=food, description='Morning coffee')
+    rent = add_transaction(fts, '2025-01-03', 90000, description='Rent January')
+    add_transaction(fts, '2025-01-04', 300, description='Coffee beans', user_id=2)
+    assert found(fts, 'coff') == ['Morning coffee']
+    assert found(fts, 'food') == ['Morning coffee']
+
+    fts.execute('UPDATE transactions SET description = ?, category_id = NULL WHERE id = ?', ('Espresso', coffee))
+    assert found(fts, 'coffee') == []
+    assert found(fts, 'food') == []
+    assert found(fts, 'espresso') == ['Espresso']
+
+    fts.execute('UPDATE transactions SET category_id = ? WHERE id = ?', (food, rent))
+    fts.execute('UPDATE categories SET name = ? WHERE id = ?', ('Groceries', food))
+    assert found(fts, 'groceries') == ['Rent January']
+
+    fts.execute('DELETE FROM categories WHERE id = ?', (food,))
+    assert found(fts, 'groceries') == []
+    fts.execute('DELETE FROM transactions WHERE id = ?', (rent,))
+    assert found(fts, 'rent') == []
+    assert indexed(fts) == expected(fts)
+
+    search_index.rebuild(fts)
+    assert indexed(fts) == expected(fts)
+
+
+def test_amount_and_date_searches(client, fts):
+    add_transaction(fts, '2025-02-14', 2550, description='Flowers')
+    add_transaction(fts, '2025-03-01', 2500, description='Books')
+    add_transaction(fts, '2025-03-02', 2600, description='Lunch')
+    assert found(fts, '25') == ['Books', 'Flowers']
+    assert found(fts, '25.5') == ['Flowers']
+    assert found(fts, '2025-03') == ['Books', 'Lunch']
+    assert found(fts, '2025-02-30') == []
+
+
+def test_search_page(client, fts):
+    for number in range(3):
+        add_transaction(fts, f'2025-01-0{number + 1}', 1000, description=f'Taxi ride {number}')
+    page = client.get('/search?q=taxi').get_data(as_text=True)
+    assert '<strong>3</strong> result(s)' in page
+    assert 'Taxi ride 2' in page
+    assert client.get('/search?q=%22').status_code == 200
@@ -0,0 +1,132 @@
+"""Daily/yearly rollups and the multi-granularity /api/series"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import timeseries
+from conftest import add_transaction
+
+
+@pytest.fixture
+def history(client, conn):
+    rng = random.Random(3)
+    categories = [row[0] for row in conn.execute('SELECT id FROM categories WHERE user_id = 1')] + [None]
+
+    def day():
+        return (date(2015, 1, 1) + timedelta(days=rng.randint(0, 3900))).isoformat()
+
+    for i in range(600):
+        ids = [row[0] for row in conn.execute('SELECT id FROM transactions')]
+        op = rng.random()
+        if op < 0.7 or not ids:
+            add_transaction(conn, day(), rng.randint(1, 100000), rng.choice(['income', 'expense']),
+                            rng.choice(categories), user_id=rng.choice([1, 1, 2]))
+        elif op < 0.9:
+            conn.execute('UPDATE transactions SET date = ?, amount_cents = ?, category_id = ? WHERE id = ?',
+                         (day(), rng.randint(1, 100000), rng.choice(categories), rng.choice(ids)))
+        else:
+            conn.execute('DELETE FROM transactions WHERE id = ?', (rng.choice(ids),))
+    return rng, categories
+
+
+def brute_force(conn, granularity, start, end, category_id=None):
+    totals = {}
+    for day, category, kind, cents in conn.execute(
+        'SELECT date, COALESCE(category_id, 0), type, amount_cents FROM transactions '
+        'WHERE user_id = 1 AND date >= ? AND date <= ?', (start.isoformat(), end.isoformat())
+    ):
+        if category_id is not None and category != category_id:
+            continue
+        key = (timeseries.bucket_start(date.fromisoformat(day), granularity).isoformat(), category)
+        income, expense = totals.get(key, (0, 0))
+        totals[key] = (income + cents, expense) if kind == 'income' else (income, expense + cents)
+    return totals
+
+
+def flatten(buckets, granularity):
+    totals = {}
+    for bucket in buckets:
+        start = timeseries.bucket_start(date.fromisoformat(bucket['start']), granularity).isoformat()
+        for category in bucket['categories']:
+            totals[(start, category['category_id'] or 0)] = (round(category['income'] * 100),
+                                                              round(category['expense'] * 100))
+    return totals
+
+
+def test_series_matches_transactions(history, conn):
+    rng, categories = history
+    for _ in range(60):
+        granularity = rng.choice(timeseries.GRANULARITIES)
+        start, end = sorted(date(2015, 1, 1) + timedelta(days=rng.randint(0, 3900)) for _ in range(2))
+        if granularity == 'day':
+            end = min(end, start + timedelta(days=400))
+        category_id = rng.choice([None, 0, categories[0]])
+        buckets = timeseries.series(conn, 1, granularity, start, end, {}, category_id)
+        assert len(buckets) == timeseries.count_buckets(start, end, granularity)
+        assert flatten(buckets, granularity) == brute_force(conn, granularity, start, end, category_id)
+
+
+def test_rebuild_matches_triggers(history, conn):
+    tables = ('daily_rollups', 'yearly_rollups')
+    before = {table: conn.execute(f'SELECT * FROM {table} ORDER BY 1, 2, 3, 4').fetchall() for table in tables}
+    timeseries.rebuild(conn)
+    for table in tables:
+        assert [tuple(row) for row in conn.execute(f'SELECT * FROM {table} ORDER BY 1, 2, 3, 4')] == \
+            [tuple(row) for row in before[table]]
+
+
+def test_long_yearly_series_reads_yearly_rows_only():
+    runs = timeseries.split(date(2015, 1, 1), date(2024, 12, 31), timeseries.LEVELS['year'])
+    assert runs == [('year', date(2015, 1, 1), date(2024, 12, 31))]
+    runs = timeseries.split(date(2015, 3, 15), date(2024, 8, 3), timeseries.LEVELS['year'])
+    assert [level for level, _, _ in runs] == ['day', 'month', 'year', 'month', 'day']
+
+
+def test_edge_buckets_are_clipped(client, conn):
+    add_transaction(conn, '2020-02-09', 100, 'income')
+    add_transaction(conn, '2020-02-10', 200, 'income')
+    data = client.get('/api/series?granularity=quarter&start=2020-02-10&end=2021-01-05').get_json()
+    assert [(b['period'], b['start'], b['end']) for b in data['buckets']][::4] == [
+        ('2020-Q1', '2020-02-10', '2020-03-31'), ('2021-Q1', '2021-01-01', '2021-01-05')]
+    assert data['buckets'][0]['income'] == 2
+
+
+@pytest.mark.parametrize('granularity', timeseries.GRANULARITIES)
+def test_series_reaching_date_max(client, conn, granularity):
+    add_transaction(conn, '9999-12-31', 100, 'income')
+    start = (date.max - timedelta(days=20)).isoformat()
+    response = client.get(f'/api/series?granularity={granularity}&start={start}&end={date.max}')
+    assert response.status_code == 200
+    buckets = response.get_json()['buckets']
+    assert buckets[-1]['end'] == date.max.isoformat()
+    assert sum(bucket['income'] for bucket in buckets) == 1
+
+
+@pytest.mark.parametrize('granularity', timeseries.GRANULARITIES)
+def test_series_from_date_min(client, granularity):
+    response = client.get(f'/api/series?granularity={granularity}&start={date.min}&end=0001-01-20')
+    assert response.status_code == 200
+    assert response.get_json()['buckets'][0]['start'] == date.min.isoformat()
+
+
+@pytest.mark.parametrize('query', [
+    'granularity=hour', 'start=x', 'start=2020-01-02&end=2020-01-01',
+    'granularity=day&start=2000-01-01', 'granularity=year&end=0001-06-01', 'category=abc',
+])
+def test_bad_requests(client, query):
+    response = client.get('/api/series?' + query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_category_filter(client, conn):
+    food = conn.execute("SELECT id FROM categories WHERE name = 'Food & Dining'").fetchone()[0]
+    add_transaction(conn, '2025-05-05', 300, category_id=food)
+    add_transaction(conn, '2025-05-06', 700)
+    data = client.get(f'/api/series?granularity=year&start=2025-01-01&end=2025-12-31&category={food}').get_json()
+    assert data['buckets'][0]['expense'] == 3
+    assert [c['category_name'] for c in data['buckets'][0]['categories']] == ['Food & Dining']
+    data = client.get('/api/series?granularity=year&start=2025-01-01&end=2025-12-31&category=0').get_json()
+    assert data['buckets'][0]['categories'][0]['category_id'] is None
@@ -0,0 +1,342 @@
+"""
+Time series for the Expense Tracker
+Income, expense and net per category at day, week, month, quarter or year
+granularity over any date range, answered from a hierarchy of rollups:
+
+    daily_rollups    (user, day,   category, type)   maintained here
+    monthly_rollups  (user, month, category, type)   see rollups.py
+    yearly_rollups   (user, year,  category, type)   maintained here
+
+All three are kept up to date by triggers on `transactions`. A range is
+split into whole years, then whole months, then the leftover days at its
+edges, using only the levels that fit inside the requested buckets (weeks
+cross month boundaries, so they are built from days). A ten-year yearly
+series therefore reads one row per year, category and type rather than
+every transaction, and a range cut mid-month still adds up exactly.
+
+Run this script directly to rebuild the daily and yearly rollups:
+    python timeseries.py
+"""
+
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import rollups
+from recurring import add_months
+
+# Get the directory where this script is located
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'tracker.db')
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+# Rollup levels each granularity can be assembled from, coarsest first
+LEVELS = {
+    'day': ('day',),
+    'week': ('day',),
+    'month': ('month', 'day'),
+    'quarter': ('month', 'day'),
+    'year': ('year', 'month', 'day'),
+}
+
+DAILY_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS daily_rollups (
+        user_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        category_id INTEGER NOT NULL DEFAULT 0,
+        type TEXT NOT NULL,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, date, category_id, type)
+    ) WITHOUT ROWID
+'''
+
+YEARLY_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS yearly_rollups (
+        user_id INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        category_id INTEGER NOT NULL DEFAULT 0,
+        type TEXT NOT NULL,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, year, category_id, type)
+    ) WITHOUT ROWID
+'''
+
+# {table} and {bucket} name a level's table and the transactions column it
+# groups by
+BACKFILL_SQL = '''
+    INSERT INTO {table} (user_id, {bucket}, category_id, type, total_cents, count)
+    SELECT user_id, {bucket}, COALESCE(category_id, 0), type, SUM(amount_cents), COUNT(*)
+    FROM transactions
+    {where}
+    GROUP BY user_id, {bucket}, COALESCE(category_id, 0), type
+'''
+
+TABLES = (('daily_rollups', 'date'), ('yearly_rollups', 'year'))
+
+
+def _add_row(table, bucket):
+    return f'''
+        INSERT INTO {table} (user_id, {bucket}, category_id, type, total_cents, count)
+        VALUES (NEW.user_id, NEW.{bucket}, COALESCE(NEW.category_id, 0), NEW.type, NEW.amount_cents, 1)
+        ON CONFLICT (user_id, {bucket}, category_id, type) DO UPDATE SET
+            total_cents = total_cents + excluded.total_cents,
+            count = count + 1;
+    '''
+
+
+def _remove_row(table, bucket):
+    return f'''
+        UPDATE {table} SET
+            total_cents = total_cents - OLD.amount_cents,
+            count = count - 1
+        WHERE user_id = OLD.user_id AND {bucket} = OLD.{bucket}
+        AND category_id = COALESCE(OLD.category_id, 0) AND type = OLD.type;
+        DELETE FROM {table}
+        WHERE user_id = OLD.user_id AND {bucket} = OLD.{bucket}
+        AND category_id = COALESCE(OLD.category_id, 0) AND type = OLD.type
+        AND count <= 0;
+    '''
+
+
+_ADD_ROW = ''.join(_add_row(table, bucket) for table, bucket in TABLES)
+_REMOVE_ROW = ''.join(_remove_row(table, bucket) for table, bucket in TABLES)
+
+TRIGGERS = {
+    'trg_timeseries_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_timeseries_insert
+        AFTER INSERT ON transactions
+        BEGIN {_ADD_ROW} END
+    ''',
+    'trg_timeseries_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_timeseries_delete
+        AFTER DELETE ON transactions
+        BEGIN {_REMOVE_ROW} END
+    ''',
+    'trg_timeseries_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_timeseries_update
+        AFTER UPDATE OF date, amount_cents, type, category_id, user_id ON transactions
+        BEGIN {_REMOVE_ROW} {_ADD_ROW} END
+    ''',
+}
+
+# Rows of one level whose bucket falls in [?, ?]; the bucket comes back as
+# its first day
+LEVEL_QUERIES = {
+    'day': 'SELECT date as start, category_id, type, total_cents FROM daily_rollups '
+           'WHERE user_id = ? AND date >= ? AND date <= ?',
+    'month': "SELECT month || '-01' as start, category_id, type, total_cents FROM monthly_rollups "
+             'WHERE user_id = ? AND month >= ? AND month <= ?',
+    'year': "SELECT year || '-01-01' as start, category_id, type, total_cents FROM yearly_rollups "
+            'WHERE user_id = ? AND year >= ? AND year <= ?',
+}
+
+
+def install(conn):
+    """Create the daily and yearly rollups and their triggers, backfilling existing databases.
+
+    As with the monthly rollups, the backfill and the triggers are created
+    in one write transaction.
+    """
+    if rollups.table_exists(conn, 'daily_rollups'):
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(DAILY_TABLE_SQL)
+        conn.execute(YEARLY_TABLE_SQL)
+        for table, bucket in TABLES:
+            conn.execute(BACKFILL_SQL.format(table=table, bucket=bucket, where=''))
+        for sql in TRIGGERS.values():
+            conn.execute(sql)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def rebuild(conn, user_id=None):
+    """Recompute the daily and yearly rollups from the transactions table"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table, bucket in TABLES:
+            if user_id is None:
+                conn.execute(f'DELETE FROM {table}')
+                conn.execute(BACKFILL_SQL.format(table=table, bucket=bucket, where=''))
+            else:
+                conn.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+                conn.execute(BACKFILL_SQL.format(table=table, bucket=bucket, where='WHERE user_id = ?'),
+                             (user_id,))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing `day`"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if granularity == 'year':
+        return date(day.year, 1, 1)
+    return day
+
+
+def next_bucket(start, granularity, count=1):
+    """First day of the bucket `count` after the one starting on `start` (negative goes back)"""
+    if granularity == 'week':
+        return start + timedelta(weeks=count)
+    if granularity == 'month':
+        return add_months(start, count)
+    if granularity == 'quarter':
+        return add_months(start, 3 * count)
+    if granularity == 'year':
+        return add_months(start, 12 * count)
+    return start + timedelta(days=count)
+
+
+def bucket_end(start, granularity):
+    """Last day of the bucket starting on `start`"""
+    try:
+        return next_bucket(start, granularity) - timedelta(days=1)
+    except (ValueError, OverflowError):     # the bucket holding date.max
+        return date.max
+
+
+def bucket_label(start, granularity):
+    """The bucket's name: 2024-03-05, 2024-W10, 2024-03, 2024-Q1 or 2024"""
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    if granularity == 'month':
+        return f'{start:%Y-%m}'
+    if granularity == 'quarter':
+        return f'{start.year}-Q{(start.month - 1) // 3 + 1}'
+    if granularity == 'year':
+        return str(start.year)
+    return start.isoformat()
+
+
+def count_buckets(start, end, granularity):
+    """Number of buckets a series from start to end has"""
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity in ('day', 'week'):
+        return (last - first).days // (7 if granularity == 'week' else 1) + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // {'month': 1, 'quarter': 3, 'year': 12}[granularity] + 1
+
+
+def split(start, end, levels):
+    """Cover [start, end] with (level, first day, last day) runs of whole buckets.
+
+    Each level takes the whole buckets it can; what is left at either edge
+    goes to the next, finer level.
+    """
+    if start > end:
+        return []
+    level, finer = levels[0], levels[1:]
+    if level == 'day':
+        return [('day', start, end)]
+    first = bucket_start(start, level)
+    if first < start:
+        if bucket_end(first, level) >= end:
+            return split(start, end, finer)
+        first = bucket_end(first, level) + timedelta(days=1)
+    last = bucket_end(bucket_start(end, level), level)
+    if last > end:
+        # The bucket holding end is cut short; whole ones stop before it
+        if bucket_start(end, level) <= first:
+            return split(start, end, finer)
+        last = bucket_start(end, level) - timedelta(days=1)
+    runs = [(level, first, last)]
+    if first > start:
+        runs = split(start, first - timedelta(days=1), finer) + runs
+    if last < end:
+        runs += split(last + timedelta(days=1), end, finer)
+    return runs
+
+
+def level_bounds(level, first, last):
+    """The run's bounds in the form its rollup table keys buckets by"""
+    if level == 'month':
+        return f'{first:%Y-%m}', f'{last:%Y-%m}'
+    if level == 'year':
+        return first.year, last.year
+    return first.isoformat(), last.isoformat()
+
+
+def series(conn, user_id, granularity, start, end, category_names, category_id=None):
+    """Income, expense and net per bucket and category between start and end (dates, inclusive).
+
+    Buckets at the edges cover only the part inside the range; their start
+    and end say which days they hold. category_id (0 for uncategorized)
+    keeps a single category.
+    """
+    totals = {}
+    for level, first, last in split(start, end, LEVELS[granularity]):
+        query = LEVEL_QUERIES[level]
+        params = [user_id, *level_bounds(level, first, last)]
+        if category_id is not None:
+            query += ' AND category_id = ?'
+            params.append(category_id)
+        for row in conn.execute(query, params):
+            key = (bucket_start(date.fromisoformat(row[0]), granularity), row[1])
+            income, expense = totals.get(key, (0, 0))
+            if row[2] == 'income':
+                income += row[3]
+            else:
+                expense += row[3]
+            totals[key] = income, expense
+
+    by_bucket = {}
+    for (bucket, category), cents in totals.items():
+        by_bucket.setdefault(bucket, []).append((category, cents))
+
+    buckets = []
+    bucket = bucket_start(start, granularity)
+    while True:
+        last = bucket_end(bucket, granularity)
+        entries = by_bucket.get(bucket, [])
+        income = sum(cents[0] for _, cents in entries)
+        expense = sum(cents[1] for _, cents in entries)
+        categories = [
+            {
+                'category_id': category or None,
+                'category_name': category_names.get(category),
+                'income': category_income / 100,
+                'expense': category_expense / 100,
+                'net': (category_income - category_expense) / 100,
+            }
+            for category, (category_income, category_expense) in entries
+        ]
+        categories.sort(key=lambda item: (item['category_name'] is None, item['category_name'] or ''))
+        buckets.append({
+            'period': bucket_label(bucket, granularity),
+            'start': max(bucket, start).isoformat(),
+            'end': min(last, end).isoformat(),
+            'income': income / 100,
+            'expense': expense / 100,
+            'net': (income - expense) / 100,
+            'categories': categories,
+        })
+        if last >= end:
+            return buckets
+        bucket = last + timedelta(days=1)
+
+
+if __name__ == '__main__':
+    conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+    install(conn)
+    rebuild(conn)
+    days = conn.execute('SELECT COUNT(*) FROM daily_rollups').fetchone()[0]
+    years = conn.execute('SELECT COUNT(*) FROM yearly_rollups').fetchone()[0]
+    conn.close()
+    print(f"✅ Rebuilt daily ({days} rows) and yearly ({years} rows) rollups")